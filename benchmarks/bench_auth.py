@@ -0,0 +1,152 @@
+import argparse
+import base64
+import json
+import os
+import statistics
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.loadgen import run_load
+from flask_app.credentials import CredentialStore
+from tests.httpie_runner import run_httpie
+from tests.local_server import LocalServer
+
+
+def credentials_file(users, iterations):
+    """
+    Write, once per user count and iteration count, a credential file of users
+    'user<i>' with passwords 'password-<i>', and return its path. Hashing is the slow
+    part, so the file is kept in the temp directory between runs.
+    """
+    path = os.path.join(tempfile.gettempdir(), f"flask_app_credentials-{users}-{iterations}.json")
+    if not os.path.exists(path):
+        store = CredentialStore()
+        for i in range(users):
+            store.add_user(f"user{i}", f"password-{i}", iterations=iterations)
+        store.save(path + ".tmp")
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def basic_auth_header(username, password):
+    return "Basic " + base64.b64encode(f"{username}:{password}".encode()).decode()
+
+
+def _post(url):
+    urllib.request.urlopen(urllib.request.Request(url, method="POST")).close()
+
+
+def _summary(durations):
+    durations = sorted(durations)
+    return {
+        "median_ms": round(statistics.median(durations) * 1000, 3),
+        "p90_ms": round(durations[int(len(durations) * 0.9) - 1] * 1000, 3),
+        "max_ms": round(durations[-1] * 1000, 3),
+    }
+
+
+def time_raw_logins(base_url, users):
+    """
+    Send one Basic Auth request per user with urllib and time each.
+
+    Returns:
+        dict: Median, p90 and max milliseconds per request.
+    """
+    durations = []
+    for i in users:
+        request = urllib.request.Request(f"{base_url}/test/basic-auth",
+                                         headers={"Authorization": basic_auth_header(f"user{i}", f"password-{i}")})
+        start = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        durations.append(time.perf_counter() - start)
+    return _summary(durations)
+
+
+def time_httpie_session(base_url, user, iterations, work_dir):
+    """
+    Log in once with `http --session -a`, then repeat requests that take the
+    credentials from the session, as an authenticated HTTPie session does.
+
+    Returns:
+        dict: Milliseconds for the first request, and a summary of the repeats.
+    """
+    session = os.path.join(work_dir, f"auth-session-{user}.json")
+    url = f"{base_url}/test/basic-auth"
+    start = time.perf_counter()
+    run_httpie(["http", "--ignore-stdin", f"--session={session}", "-a", f"user{user}:password-{user}", url],
+               mode="inprocess")
+    first = time.perf_counter() - start
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        stdout, stderr, exit_status = run_httpie(["http", "--ignore-stdin", f"--session={session}", url],
+                                                 mode="inprocess")
+        durations.append(time.perf_counter() - start)
+        if "Basic Auth successful" not in stdout:
+            raise RuntimeError(f"HTTPie session login failed: {stdout} {stderr}")
+    os.remove(session)
+    return {"first_ms": round(first * 1000, 3), "repeat": _summary(durations)}
+
+
+def cache_stats(base_url):
+    with urllib.request.urlopen(f"{base_url}/debug/auth-cache") as response:
+        return json.load(response)
+
+
+def main():
+    """
+    Measure Basic Auth latency against the hashed credential store, cold and warm.
+
+    The server loads a generated file of users with PBKDF2 hashes. After the cache is
+    reset, each of --logins users signs in once (cold: one password hash each) and
+    then again (warm: answered from the cache). The same comparison is made through an
+    HTTPie session holding the credentials. Throughput under load is then measured
+    with the cache on, and again on a server started with the cache disabled. Cache
+    hit and miss counters are reported with each run.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--users", type=int, default=1000, help="Users in the credential store.")
+    parser.add_argument("--hash-iterations", type=int, default=100000, help="PBKDF2 iterations per hash.")
+    parser.add_argument("--logins", type=int, default=50, help="Distinct users signing in.")
+    parser.add_argument("--iterations", type=int, default=10, help="Repeated HTTPie session requests.")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("-n", "--requests", type=int, default=2000)
+    options = parser.parse_args()
+
+    os.environ["FLASK_APP_CREDENTIALS_FILE"] = credentials_file(options.users, options.hash_iterations)
+    users = range(min(options.logins, options.users))
+    load_headers = {"Authorization": basic_auth_header("user0", "password-0")}
+    results = {"users": options.users, "hash_iterations": options.hash_iterations}
+    work_dir = tempfile.mkdtemp(prefix="bench-auth-")
+    try:
+        with LocalServer(mode="process") as server:
+            _post(f"{server.base_url}/debug/auth-cache/reset")
+            results["cold"] = time_raw_logins(server.base_url, users)
+            results["warm"] = time_raw_logins(server.base_url, users)
+            results["login_cache"] = cache_stats(server.base_url)
+            _post(f"{server.base_url}/debug/auth-cache/reset")
+            results["httpie_session"] = time_httpie_session(server.base_url, 0, options.iterations, work_dir)
+            _post(f"{server.base_url}/debug/auth-cache/reset")
+            results["load_cached"] = run_load(f"{server.base_url}/test/basic-auth", concurrency=options.concurrency,
+                                              requests=options.requests, headers=load_headers)
+            results["load_cache"] = cache_stats(server.base_url)
+
+        os.environ["FLASK_APP_AUTH_CACHE_SIZE"] = "0"
+        with LocalServer(mode="process") as server:
+            requests = max(options.requests // 20, options.concurrency)
+            results["load_uncached"] = run_load(f"{server.base_url}/test/basic-auth",
+                                                concurrency=options.concurrency, requests=requests,
+                                                headers=load_headers)
+    finally:
+        os.environ.pop("FLASK_APP_AUTH_CACHE_SIZE", None)
+        os.rmdir(work_dir)
+    for key in ("load_cached", "load_uncached"):
+        results[key] = {name: results[key][name] for name in ("requests", "throughput_rps", "latency_ms", "errors")}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
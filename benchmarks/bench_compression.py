@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import time
+import urllib.request
+
+from flask_app.compression import ENCODINGS
+from flask_app.downloads import files_directory
+from tests.httpie_runner import run_httpie
+from tests.local_server import LocalServer
+from tests.payloads import payloads
+
+
+def wire_size(url, encoding):
+    """
+    Return the number of body bytes sent for `url` with the given Accept-Encoding.
+    """
+    request = urllib.request.Request(url, headers={"Accept-Encoding": encoding})
+    with urllib.request.urlopen(request) as response:
+        return len(response.read())
+
+
+def time_httpie(url, encoding, iterations):
+    """
+    Time full HTTPie requests, including decoding the body, with one Accept-Encoding.
+
+    Returns:
+        dict: Median and minimum milliseconds per request.
+    """
+    args = ["http", "--ignore-stdin", "--print=b", "GET", url, f"Accept-Encoding:{encoding}"]
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        _, stderr, exit_status = run_httpie(args, mode="inprocess")
+        durations.append(time.perf_counter() - start)
+        if exit_status != 0:
+            raise RuntimeError(f"HTTPie exited with status {exit_status} for {url}: {stderr}")
+    return {
+        "median_ms": round(statistics.median(durations) * 1000, 3),
+        "min_ms": round(min(durations) * 1000, 3),
+    }
+
+
+def time_upload(url, path, compressed, iterations):
+    """
+    Time HTTPie uploads of a file to /test/large_payload, optionally compressed.
+
+    Compression is forced with a second --compress: for a file body that does not shrink,
+    a single --compress leaves HTTPie sending no body at all, even though it has
+    already sent the Content-Length.
+
+    Returns:
+        dict: Median milliseconds per upload, the bytes sent, and the server's inflate time.
+    """
+    args = ["http", "--ignore-stdin", "POST", f"{url}/test/large_payload", "stream==1", f"@{path}"]
+    if compressed:
+        args[2:2] = ["--compress", "--compress"]
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        stdout, stderr, exit_status = run_httpie(args, mode="inprocess")
+        durations.append(time.perf_counter() - start)
+        if exit_status != 0:
+            raise RuntimeError(f"HTTPie exited with status {exit_status} uploading {path}: {stderr}")
+    response = json.loads(stdout)
+    encoding = response["request_encoding"] or {}
+    return {
+        "median_ms": round(statistics.median(durations) * 1000, 3),
+        "wire_bytes": encoding.get("compressed_bytes", response["bytes_received"]),
+        "inflate_ms": round(encoding.get("inflate_seconds", 0) * 1000, 3),
+    }
+
+
+def main():
+    """
+    Measure how response compression affects HTTPie's response handling time.
+
+    Each route is requested with every supported content coding and with identity, and
+    the bytes on the wire and HTTPie's time per request are reported. The routes are a
+    streamed JSON body, a CSV file and incompressible generated bytes. Uploads of JSON,
+    CSV and random payloads are then timed with and without `http --compress`, with the
+    bytes sent and the server's inflate time.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--size", type=int, default=2 * 1024 * 1024,
+                        help="Size in bytes of the CSV file and the generated bytes.")
+    options = parser.parse_args()
+
+    csv_name = f"bench-compression-{os.getpid()}.csv"
+    csv_path = os.path.join(files_directory(), csv_name)
+    shutil.copyfile(payloads().path("csv", options.size), csv_path)
+    results = {}
+    try:
+        with LocalServer(mode="process") as server:
+            routes = {
+                "stream": f"{server.base_url}/stream/100",
+                "csv_file": f"{server.base_url}/files/{csv_name}",
+                "bytes": f"{server.base_url}/bytes/{options.size}",
+            }
+            for name, url in routes.items():
+                results[name] = {}
+                for encoding in ("identity",) + ENCODINGS:
+                    time_httpie(url, encoding, 1)  # Warm caches and the server's compressed copies.
+                    results[name][encoding] = {
+                        "wire_bytes": wire_size(url, encoding),
+                        **time_httpie(url, encoding, options.iterations),
+                    }
+            results["uploads"] = {}
+            for kind in ("json", "csv", "random"):
+                path = payloads().path(kind, options.size)
+                results["uploads"][kind] = {
+                    "plain": time_upload(server.base_url, path, False, options.iterations),
+                    "deflate": time_upload(server.base_url, path, True, options.iterations),
+                }
+    finally:
+        os.remove(csv_path)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import urllib.request
+
+from flask_app.downloads import files_directory, iter_pattern, write_pattern_file
+from tests.integrity import digest_chunks, digest_file, download_with_digests
+from tests.local_server import LocalServer
+
+# Size of each read when the raw client drains a response.
+READ_SIZE = 1024 * 1024
+
+_SUFFIXES = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def parse_size(value):
+    """
+    Parse a byte count such as 1048576, 512M or 4G.
+    """
+    value = value.strip().lower().rstrip("b")
+    if value and value[-1] in _SUFFIXES:
+        return int(float(value[:-1]) * _SUFFIXES[value[-1]])
+    return int(value)
+
+
+def raw_download(url):
+    """
+    Drain a response with urllib and discard it, to measure the server on its own.
+
+    Returns:
+        dict: Bytes received, seconds and MB/s.
+    """
+    start = time.perf_counter()
+    received = 0
+    with urllib.request.urlopen(url) as response:
+        while True:
+            block = response.read(READ_SIZE)
+            if not block:
+                break
+            received += len(block)
+    return _throughput(received, time.perf_counter() - start)
+
+
+def httpie_download(url, path, resume=False):
+    """
+    Download `url` to `path` with the `http` CLI, optionally with --continue.
+
+    Returns:
+        dict: Bytes added to the file, seconds and MB/s.
+    """
+    existing = os.path.getsize(path) if resume and os.path.exists(path) else 0
+    args = ["http", "--ignore-stdin", "--download", "-o", path, "GET", url]
+    if resume:
+        args.insert(3, "--continue")
+    start = time.perf_counter()
+    result = subprocess.run(args, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"HTTPie download of {url} failed: {result.stderr}")
+    return _throughput(os.path.getsize(path) - existing, elapsed)
+
+
+def verified_download(url, path, expected):
+    """
+    Download with `http --download` and verify it twice: by hashing the file as it is
+    written, and by hashing the finished file afterwards.
+
+    Returns:
+        dict: Seconds for the download with overlapped hashing, seconds for the separate
+        pass over the finished file, and whether both matched `expected`.
+    """
+    start = time.perf_counter()
+    exit_status, stderr, digests = download_with_digests(url, path)
+    overlapped = time.perf_counter() - start
+    if exit_status != 0:
+        raise RuntimeError(f"HTTPie download of {url} failed: {stderr}")
+    start = time.perf_counter()
+    after = digest_file(path)
+    return {
+        "download_and_hash_seconds": round(overlapped, 3),
+        "hash_after_seconds": round(time.perf_counter() - start, 3),
+        "digests_ok": digests == expected and after == expected,
+    }
+
+
+def _throughput(size, elapsed):
+    return {"bytes": size, "seconds": round(elapsed, 3), "mb_per_s": round(size / elapsed / 1e6, 1)}
+
+
+def main():
+    """
+    Measure download throughput of /bytes/<n> and /files/<name> on a local server, with a
+    raw client and with `http --download`, and check that `--download --continue` resumes
+    a half-written file into a byte-identical copy. Verification hashes MD5, SHA-256 and
+    CRC32 in one pass, once while the file is written and once afterwards.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--size", type=parse_size, default=parse_size("256M"),
+                        help="Download size, e.g. 512M or 4G.")
+    parser.add_argument("--server-mode", choices=("thread", "process"), default="process")
+    parser.add_argument("--skip-httpie", action="store_true", help="Only measure the raw client.")
+    options = parser.parse_args()
+
+    size = options.size
+    work_dir = tempfile.mkdtemp(prefix="bench-downloads-")
+    source = write_pattern_file(os.path.join(files_directory(), f"bench-{os.getpid()}.bin"), size)
+    results = {"size": size}
+    try:
+        with LocalServer(mode=options.server_mode) as server:
+            urls = {
+                "bytes": f"{server.base_url}/bytes/{size}",
+                "files": f"{server.base_url}/files/{os.path.basename(source)}",
+            }
+            expected = digest_chunks(iter_pattern(0, size))
+            for endpoint, url in urls.items():
+                result = {"raw": raw_download(url)}
+                if not options.skip_httpie:
+                    path = os.path.join(work_dir, endpoint)
+                    result["httpie"] = httpie_download(url, path)
+                    os.truncate(path, size // 2)
+                    result["httpie_resume"] = httpie_download(url, path, resume=True)
+                    result["resume_digests_ok"] = digest_file(path) == expected
+                    result["verify"] = verified_download(url, path, expected)
+                    os.remove(path)
+                results[endpoint] = result
+    finally:
+        os.remove(source)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
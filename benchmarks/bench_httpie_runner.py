@@ -0,0 +1,70 @@
+import argparse
+import json
+import statistics
+import time
+
+from tests.httpie_runner import run_httpie
+
+
+def time_invocations(args, mode, iterations):
+    """
+    Run the same HTTPie command repeatedly and record the wall-clock time of each call.
+
+    Returns:
+        list: Per-invocation durations in seconds.
+    """
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        _, stderr, exit_status = run_httpie(args, mode=mode)
+        durations.append(time.perf_counter() - start)
+        if exit_status != 0:
+            raise RuntimeError(f"HTTPie exited with status {exit_status} in {mode} mode: {stderr}")
+    return durations
+
+
+def summarize(durations):
+    """
+    Reduce a list of durations to millisecond statistics.
+    """
+    return {
+        "iterations": len(durations),
+        "mean_ms": round(statistics.mean(durations) * 1000, 3),
+        "median_ms": round(statistics.median(durations) * 1000, 3),
+        "min_ms": round(min(durations) * 1000, 3),
+        "max_ms": round(max(durations) * 1000, 3),
+    }
+
+
+def main():
+    """
+    Compare per-invocation cost of the subprocess and in-process HTTPie runners.
+
+    By default the command uses --offline, so only interpreter start-up, imports and
+    request building are measured; pass --url to include a round-trip to a live server.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--url", default=None, help="Send real requests to this URL instead of --offline.")
+    options = parser.parse_args()
+
+    if options.url:
+        args = ["http", "--ignore-stdin", "GET", options.url]
+    else:
+        args = ["http", "--offline", "--ignore-stdin", "GET", "http://127.0.0.1:5001/status/200"]
+
+    # One untimed in-process call so the comparison excludes the first import.
+    run_httpie(args, mode="inprocess")
+
+    results = {}
+    for mode in ("subprocess", "inprocess"):
+        results[mode] = summarize(time_invocations(args, mode, options.iterations))
+    results["saving_per_invocation_ms"] = round(
+        results["subprocess"]["mean_ms"] - results["inprocess"]["mean_ms"], 3
+    )
+    results["speedup"] = round(results["subprocess"]["mean_ms"] / results["inprocess"]["mean_ms"], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
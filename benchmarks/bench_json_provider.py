@@ -0,0 +1,87 @@
+import argparse
+import json
+import time
+
+from flask_app.app import app
+from flask_app.json_provider import FastJSONProvider, orjson
+
+
+def echo_payloads(rows):
+    """
+    Build response bodies shaped like the echo endpoints' output for the payloads the tests send.
+
+    Args:
+        rows (int): Number of records in the scaled-up JSON and CSV echoes.
+
+    Returns:
+        dict: Shape name -> object passed to jsonify.
+    """
+    json_payload = {"name": "HTTPie", "version": "3.2", "features": ["CLI", "JSON"]}
+    csv_row = {"age": "39", "location": "USA", "name": "Patrick"}
+    xml_payload = {"body": "Don't forget xml!", "from": "Patrick", "heading": "Reminder", "to": "Bob"}
+    html_payload = "<html><body><p>This is a test HTML payload.</p></body></html>\n" * (rows // 4)
+
+    def echo(content_type, data):
+        return {"method": "POST", "Content-Type": content_type, "data": data}
+
+    return {
+        "json_small": echo("application/json", json_payload),
+        "json_large": echo("application/json", [dict(json_payload, id=i) for i in range(rows)]),
+        "csv_rows": echo("text/csv", [dict(csv_row, id=str(i)) for i in range(rows)]),
+        "xml_flat": echo("application/xml", xml_payload),
+        "html_text": echo("text/html", html_payload),
+    }
+
+
+def measure(provider, obj, min_seconds):
+    """
+    Call provider.response(obj) repeatedly for at least `min_seconds`.
+
+    Returns:
+        dict: Calls per second, encoded MB per second and encoded size in bytes.
+    """
+    size = len(provider.response(obj).get_data())
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        provider.response(obj)
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return {
+        "calls_per_s": round(calls / elapsed, 1),
+        "mb_per_s": round(size * calls / elapsed / 1e6, 2),
+        "bytes": size,
+    }
+
+
+def main():
+    """
+    Compare JSON response encoding throughput of the stdlib and orjson backends.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--rows", type=int, default=10000, help="Records in the scaled-up payloads.")
+    parser.add_argument("--seconds", type=float, default=0.5, help="Minimum run time per measurement.")
+    options = parser.parse_args()
+
+    backends = ["stdlib"] + (["orjson"] if orjson is not None else [])
+    results = {}
+    with app.app_context():
+        for shape, obj in echo_payloads(options.rows).items():
+            results[shape] = {}
+            for backend in backends:
+                for compact in (True, False):
+                    provider = FastJSONProvider(app)
+                    provider.backend = backend
+                    provider.compact = compact
+                    layout = "compact" if compact else "indented"
+                    results[shape][f"{backend}_{layout}"] = measure(provider, obj, options.seconds)
+            if "orjson" in backends:
+                results[shape]["compact_speedup"] = round(
+                    results[shape]["orjson_compact"]["mb_per_s"] / results[shape]["stdlib_compact"]["mb_per_s"], 2
+                )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
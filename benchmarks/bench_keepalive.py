@@ -0,0 +1,104 @@
+import argparse
+import json
+import time
+import urllib.request
+
+from benchmarks.loadgen import run_load
+from tests.local_server import LocalServer
+
+# Requests like those HTTPie sends in tests/test_session_management.py: a session's
+# bearer token to /test/headers, and the cookie routes with a stored cookie.
+WORKLOADS = {
+    "headers": ("/test/headers", {"Authorization": "Bearer sampletoken", "Accept": "application/json"}),
+    "set_cookie": ("/set-cookie", {}),
+    "check_cookie": ("/check-cookie", {"Cookie": "test_cookie=cookie_value"}),
+}
+
+CONNECTION_MODES = ("keep-alive", "per-request")
+
+
+def scrape_connections(base_url, settle_timeout=2.0):
+    """
+    Read the server's connection metrics once the benchmark's connections have closed.
+
+    The scrape's own connection is open while /metrics renders, so the server is
+    settled when exactly one connection is open.
+
+    Returns:
+        dict: Connections accepted and closed, requests served on them and total seconds open.
+    """
+    deadline = time.monotonic() + settle_timeout
+    while True:
+        with urllib.request.urlopen(f"{base_url}/metrics") as response:
+            samples = dict(
+                line.rsplit(" ", 1) for line in response.read().decode().splitlines()
+                if line.startswith("flask_app_connection")
+            )
+        if float(samples["flask_app_connections_open"]) <= 1 or time.monotonic() >= deadline:
+            break
+        time.sleep(0.01)
+    return {
+        "accepted": int(samples["flask_app_connections_accepted_total"]),
+        "closed": int(samples["flask_app_connection_requests_count"]),
+        "requests": int(float(samples["flask_app_connection_requests_sum"])),
+        "seconds": float(samples["flask_app_connection_duration_seconds_sum"]),
+    }
+
+
+def run_workload(base_url, path, headers, connections, concurrency, requests):
+    """
+    Drive one route with the raw load generator and pair its report with the server's view
+    of the connections it used.
+
+    Returns:
+        dict: Client throughput and latency, and server-side connection counts.
+    """
+    urllib.request.urlopen(urllib.request.Request(f"{base_url}/metrics/reset", method="POST")).close()
+    report = run_load(base_url + path, concurrency=concurrency, requests=requests,
+                      headers=headers, connections=connections)
+    server = scrape_connections(base_url)
+    # Leave out the reset request's connection, which closes inside the window, and
+    # the scrape's, which is accepted inside it.
+    closed = max(server["closed"] - 1, 1)
+    return {
+        "throughput_rps": report["throughput_rps"],
+        "latency_ms": report["latency_ms"],
+        "errors": report["errors"],
+        "connections_accepted": server["accepted"] - 1,
+        "requests_per_connection": round((server["requests"] - 1) / closed, 1),
+        "ms_per_connection": round(server["seconds"] / max(server["closed"], 1) * 1000, 3),
+    }
+
+
+def main():
+    """
+    Compare keep-alive clients with one-connection-per-request clients on the routes the
+    session tests use. Each workload is run twice with the same request count and
+    concurrency: once with every worker reusing its connection, once opening a new
+    connection per request. The client's throughput and latency are reported next to
+    the server's connection metrics, and the difference in median latency estimates the
+    cost of setting up a connection.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("-n", "--requests", type=int, default=2000)
+    parser.add_argument("--server-mode", choices=("thread", "process"), default="process")
+    options = parser.parse_args()
+
+    results = {}
+    with LocalServer(mode=options.server_mode) as server:
+        for name, (path, headers) in WORKLOADS.items():
+            run_load(server.base_url + path, concurrency=options.concurrency, requests=100, headers=headers)
+            result = {
+                mode: run_workload(server.base_url, path, headers, mode, options.concurrency, options.requests)
+                for mode in CONNECTION_MODES
+            }
+            result["connection_setup_ms"] = round(
+                result["per-request"]["latency_ms"]["p50"] - result["keep-alive"]["latency_ms"]["p50"], 3
+            )
+            results[name] = result
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from httpie.context import Environment
+from httpie.sessions import Session
+
+from tests.httpie_runner import run_httpie
+from tests.local_server import LocalServer
+
+# /set-cookies responses stay under the 100-header limit of http.client.
+MAX_COOKIES_PER_RESPONSE = 90
+
+
+def parse_sizes(value):
+    """
+    Parse a comma-separated list of cookie counts, e.g. 1,10,100.
+    """
+    return [int(size) for size in value.split(",") if size]
+
+
+def _median_ms(durations):
+    return round(statistics.median(durations) * 1000, 3)
+
+
+def build_session(path, base_url, host, cookies, host_cookies, size, paths, domains):
+    """
+    Build an HTTPie session file holding `cookies` cookies.
+
+    Up to `host_cookies` of them are set for the server by /set-cookies through real
+    HTTPie invocations, with the given path spread. The rest belong to `domains` other
+    sites and are added with HTTPie's own Session class, so the file grows the way it
+    does when one session is used against many hosts.
+
+    Returns:
+        list: The /set-cookies query arguments, to repeat on /check-cookies.
+    """
+    spread = [f"size=={size}"] + [f"path=={path}" for path in paths]
+    sent = min(cookies, host_cookies)
+    for start in range(0, sent, MAX_COOKIES_PER_RESPONSE):
+        count = min(MAX_COOKIES_PER_RESPONSE, sent - start)
+        _, stderr, exit_status = run_httpie([
+            "http", "--ignore-stdin", f"--session={path}", f"{base_url}/set-cookies/{count}",
+            f"start=={start}", *spread,
+        ])
+        if exit_status != 0:
+            raise RuntimeError(f"Setting cookies failed: {stderr}")
+
+    session = load_session(path, host)
+    value = "v" * size
+    for i in range(sent, cookies):
+        session.cookie_jar.set(f"bulk{i}", value, domain=f"site{i % domains}.example.test",
+                               path=paths[i % len(paths)])
+    session.save()
+    return spread
+
+
+def load_session(path, host):
+    """
+    Load a session file the way `http --session` does.
+    """
+    session = Session(path, env=Environment(), bound_host=host, session_id=path)
+    session.load()
+    return session
+
+
+def time_session_io(path, host, iterations):
+    """
+    Time loading and saving a session file with HTTPie's Session class.
+
+    Returns:
+        dict: Median milliseconds to load and to save, and the file size.
+    """
+    loads, saves = [], []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        session = load_session(path, host)
+        loads.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        session.save()
+        saves.append(time.perf_counter() - start)
+    return {"load_ms": _median_ms(loads), "save_ms": _median_ms(saves), "file_bytes": os.path.getsize(path)}
+
+
+def time_requests(args, iterations):
+    """
+    Time HTTPie invocations of `args`, after one untimed warm-up run.
+
+    Returns:
+        tuple: (median milliseconds, stdout of the last run).
+    """
+    durations = []
+    run_httpie(args, mode="inprocess")
+    for _ in range(iterations):
+        start = time.perf_counter()
+        stdout, stderr, exit_status = run_httpie(args, mode="inprocess")
+        durations.append(time.perf_counter() - start)
+        if exit_status != 0:
+            raise RuntimeError(f"HTTPie exited with status {exit_status}: {stderr}")
+    return _median_ms(durations), stdout
+
+
+def main():
+    """
+    Measure how HTTPie sessions scale with the number of stored cookies.
+
+    For each cookie count, a session file is built: the server's own cookies are set
+    through /set-cookies and the remainder are spread over other domains. The benchmark
+    reports the session's load and save time and file size. It also reports the time
+    per `http --session` request to /check-cookies, read-write and with
+    --session-read-only, and the overhead compared with the same request without a
+    session. The check route verifies the server's cookies on every run.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--sizes", type=parse_sizes, default=parse_sizes("1,10,100,1000,10000"),
+                        help="Comma-separated cookie counts.")
+    parser.add_argument("--host-cookies", type=int, default=50,
+                        help="Cookies per session that are sent to the server.")
+    parser.add_argument("--cookie-size", type=int, default=32, help="Characters per cookie value.")
+    parser.add_argument("--paths", type=int, default=2, help="Distinct cookie paths.")
+    parser.add_argument("--domains", type=int, default=100, help="Distinct domains of the other cookies.")
+    parser.add_argument("--iterations", type=int, default=5)
+    options = parser.parse_args()
+
+    paths = (["/", "/check-cookies"] + [f"/section{i}" for i in range(options.paths - 2)])[:max(options.paths, 1)]
+    work_dir = tempfile.mkdtemp(prefix="bench-sessions-")
+    results = {}
+    try:
+        with LocalServer() as server:
+            base_url, host = server.base_url, server.host
+            check = f"{base_url}/check-cookies"
+            baseline, _ = time_requests(
+                ["http", "--ignore-stdin", "--body", f"{check}/0"], options.iterations
+            )
+            for cookies in options.sizes:
+                path = os.path.join(work_dir, f"session-{cookies}.json")
+                spread = build_session(path, base_url, host, cookies, options.host_cookies,
+                                       options.cookie_size, paths, options.domains)
+                sent = min(cookies, options.host_cookies)
+                args = ["http", "--ignore-stdin", "--body", f"--session={path}", f"{check}/{sent}", *spread]
+                session_ms, stdout = time_requests(args, options.iterations)
+                read_only_ms, _ = time_requests(
+                    [*args[:3], f"--session-read-only={path}", *args[4:]], options.iterations
+                )
+                results[cookies] = {
+                    **time_session_io(path, host, options.iterations),
+                    "cookies_sent": json.loads(stdout)["received"],
+                    "request_ms": session_ms,
+                    "read_only_request_ms": read_only_ms,
+                    "overhead_ms": round(session_ms - baseline, 3),
+                    "read_only_overhead_ms": round(read_only_ms - baseline, 3),
+                }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print(json.dumps({"no_session_request_ms": baseline, "sessions": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+from tests.httpie_runner import run_httpie
+from tests.local_server import LocalServer
+
+
+def raise_file_limit(connections):
+    """
+    Raise this process's open file limit (inherited by the server it starts) so that
+    both ends of every connection fit.
+
+    Returns:
+        int: The soft limit now in effect.
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = 2 * connections + 256
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        soft = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    return soft
+
+
+def scrape_parked(base_url):
+    with urllib.request.urlopen(f"{base_url}/metrics") as response:
+        for line in response.read().decode().splitlines():
+            if line.startswith("flask_app_connections_parked "):
+                return int(line.split()[1])
+    return None
+
+
+async def _fetch(host, port, path, headers=()):
+    """
+    Send one GET on a new connection and read the response until the server closes it.
+
+    Returns:
+        tuple: (seconds to the first byte, seconds to the last byte, bytes received,
+        status line, arrival times of each read relative to the first byte).
+    """
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    lines = [f"GET {path} HTTP/1.1", f"Host: {host}", "Connection: close", *headers]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+    received, arrivals, first = b"", [], None
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            now = time.perf_counter()
+            first = first or now
+            arrivals.append(now - first)
+            received += data
+    finally:
+        writer.close()
+    status = received.split(b"\r\n", 1)[0].decode()
+    return (first or time.perf_counter()) - start, time.perf_counter() - start, len(received), status, arrivals
+
+
+async def _hold(base_url, connections, delay, opening):
+    """
+    Open `connections` connections to /delay/<delay> at once and wait for them all.
+    """
+    url = urlsplit(base_url)
+    limit = asyncio.Semaphore(opening)
+
+    async def one():
+        async with limit:
+            # The semaphore only paces the connects; the wait happens outside it.
+            task = asyncio.ensure_future(_fetch(url.hostname, url.port, f"/delay/{delay}"))
+            await asyncio.sleep(0)
+        return await task
+
+    async def peak():
+        await asyncio.sleep(delay * 0.8)
+        return await asyncio.get_running_loop().run_in_executor(None, scrape_parked, base_url)
+
+    start = time.perf_counter()
+    peak_task = asyncio.ensure_future(peak())
+    results = await asyncio.gather(*(one() for _ in range(connections)), return_exceptions=True)
+    return results, time.perf_counter() - start, await peak_task
+
+
+def measure_held_connections(base_url, connections, delay, opening):
+    """
+    Hold many delayed responses open at once.
+
+    Returns:
+        dict: Completed and failed requests, wall time, time to first byte, and the
+        server's parked connection gauge sampled while the responses were waiting.
+    """
+    results, wall, parked = asyncio.run(_hold(base_url, connections, delay, opening))
+    completed = [result for result in results if not isinstance(result, BaseException)
+                 and result[3].startswith("HTTP/1.1 200")]
+    errors = {}
+    for result in results:
+        if isinstance(result, BaseException):
+            errors[type(result).__name__] = errors.get(type(result).__name__, 0) + 1
+    first_bytes = sorted(result[0] for result in completed) or [0.0]
+    return {
+        "connections": connections,
+        "delay_s": delay,
+        "completed": len(completed),
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "parked_at_peak": parked,
+        "first_byte_s": {
+            "min": round(first_bytes[0], 3),
+            "median": round(statistics.median(first_bytes), 3),
+            "max": round(first_bytes[-1], 3),
+        },
+    }
+
+
+def measure_pacing(base_url, path, headers=()):
+    """
+    Fetch one paced response and compare its timing with what was asked for.
+
+    Returns:
+        dict: Time to first and last byte, bytes, reads and the achieved rate.
+    """
+    url = urlsplit(base_url)
+    first, last, size, status, arrivals = asyncio.run(_fetch(url.hostname, url.port, path, headers))
+    spread = arrivals[-1] if arrivals else 0.0
+    return {
+        "status": status,
+        "first_byte_s": round(first, 3),
+        "last_byte_s": round(last, 3),
+        "bytes": size,
+        "reads": len(arrivals),
+        "bytes_per_s": round(size / spread) if spread else None,
+    }
+
+
+def measure_httpie_timeouts(base_url, delay, timeouts):
+    """
+    Run `http --timeout` against /delay/<delay> for each timeout.
+
+    Returns:
+        dict: Timeout -> HTTPie's exit status and seconds until it returned.
+    """
+    results = {}
+    for timeout in timeouts:
+        start = time.perf_counter()
+        _, _, exit_status = run_httpie(["http", "--ignore-stdin", f"--timeout={timeout}", f"{base_url}/delay/{delay}"],
+                                       mode="inprocess")
+        results[str(timeout)] = {"exit_status": exit_status, "seconds": round(time.perf_counter() - start, 3)}
+    return results
+
+
+def main():
+    """
+    Benchmark the latency and bandwidth fault injection routes.
+
+    Opens --connections connections to /delay/<--delay> at once and reports how many
+    complete, their time to first byte and the server's count of parked connections,
+    which shows the waits are held without a thread each. It then checks the pacing of
+    /drip and of a bandwidth-limited /bytes download, and runs `http --timeout` against
+    /delay with a timeout shorter and longer than the delay.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--delay", type=float, default=3.0)
+    parser.add_argument("--opening", type=int, default=200, help="Connects in flight at once.")
+    parser.add_argument("--drip-bytes", type=int, default=10000)
+    parser.add_argument("--drip-seconds", type=float, default=2.0)
+    parser.add_argument("--bandwidth", type=int, default=256 * 1024, help="Bytes per second for /bytes.")
+    options = parser.parse_args()
+
+    results = {"file_limit": raise_file_limit(options.connections)}
+    with LocalServer(mode="process") as server:
+        results["held"] = measure_held_connections(server.base_url, options.connections, options.delay,
+                                                   options.opening)
+        results["drip"] = measure_pacing(
+            server.base_url,
+            f"/drip?numbytes={options.drip_bytes}&duration={options.drip_seconds}&delay=0&chunks=100",
+        )
+        results["bandwidth"] = measure_pacing(
+            server.base_url, f"/bytes/{options.bandwidth * 2}", [f"X-Shape-Bandwidth: {options.bandwidth}"]
+        )
+        results["httpie_timeout"] = measure_httpie_timeouts(server.base_url, 1, (0.5, 3))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
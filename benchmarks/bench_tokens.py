@@ -0,0 +1,134 @@
+import argparse
+import json
+import random
+import time
+import tracemalloc
+import urllib.request
+
+from benchmarks.loadgen import run_load
+from flask_app.tokens import TokenRegistry
+from tests.local_server import LocalServer
+
+# Tokens issued per call, as POST /tokens allows at most.
+BATCH = 10000
+
+
+def fill(registry, count, ttls):
+    """
+    Issue `count` tokens in batches, cycling through the lifetimes in `ttls`.
+
+    Returns:
+        list: The issued tokens.
+    """
+    issued = []
+    for index, start in enumerate(range(0, count, BATCH)):
+        batch, _ = registry.issue(ttls[index % len(ttls)], min(BATCH, count - start))
+        issued.extend(batch)
+    return issued
+
+
+def _ns_per_call(function, arguments):
+    start = time.perf_counter()
+    for argument in arguments:
+        function(argument)
+    return round((time.perf_counter() - start) / len(arguments) * 1e9, 1)
+
+
+def measure_registry(count, lookups):
+    """
+    Measure issuing, memory, lookups and eviction for `count` live tokens in-process.
+
+    Returns:
+        dict: Issue rate, bytes per token, nanoseconds per lookup (valid, unknown and
+        malformed tokens) and the time to sweep them all once expired.
+    """
+    now = [time.time()]
+    registry = TokenRegistry(capacity=count, max_ttl=3600, clock=lambda: now[0])
+    tracemalloc.start()
+    fill(registry, count, ttls=(60,))
+    token_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    registry = TokenRegistry(capacity=count, max_ttl=3600, clock=lambda: now[0])
+    start = time.perf_counter()
+    issued = fill(registry, count, ttls=(60, 120, 300, 600, 3600))
+    issue_seconds = time.perf_counter() - start
+
+    sample = random.sample(issued, min(lookups, len(issued)))
+    unknown = [TokenRegistry(clock=lambda: now[0]).issue(60, 1)[0][0] for _ in range(min(lookups, 1000))]
+    result = {
+        "tokens": count,
+        "issue_per_s": round(count / issue_seconds),
+        "bytes_per_token": round(token_bytes / count, 1),
+        "lookup_ns": {
+            "valid": _ns_per_call(registry.is_valid, sample),
+            "unknown": _ns_per_call(registry.is_valid, unknown),
+            "malformed": _ns_per_call(registry.is_valid, ["x" * 27] * len(unknown)),
+        },
+    }
+    assert all(registry.is_valid(token) for token in sample[:1000])
+    now[0] += 3601
+    start = time.perf_counter()
+    evicted = registry.sweep()
+    result["sweep_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    result["swept"] = evicted
+    return result
+
+
+def measure_server(tokens, concurrency, requests):
+    """
+    Fill a server's registry through POST /tokens, then load-test /test/headers with an
+    issued token and with a static token.
+
+    The server is one process (LocalServer's process mode, a single threaded worker):
+    the registry lives in a worker's memory, and /tokens is refused with several workers.
+
+    Returns:
+        dict: Seconds to issue the tokens, the load reports and the registry's counters.
+    """
+    with LocalServer(mode="process") as server:
+        start = time.perf_counter()
+        token = None
+        for offset in range(0, tokens, BATCH):
+            count = min(BATCH, tokens - offset)
+            request = urllib.request.Request(f"{server.base_url}/tokens?count={count}", method="POST")
+            with urllib.request.urlopen(request) as response:
+                body = json.load(response)
+            token = token or body.get("tokens", [body.get("access_token")])[0]
+        issue_seconds = time.perf_counter() - start
+        results = {"workers": 1, "issue_seconds": round(issue_seconds, 3)}
+        for name, value in (("issued_token", token), ("static_token", "sampletoken")):
+            report = run_load(f"{server.base_url}/test/headers", concurrency=concurrency, requests=requests,
+                              headers={"Authorization": f"Bearer {value}"})
+            results[name] = {key: report[key] for key in ("throughput_rps", "latency_ms", "status_codes")}
+        with urllib.request.urlopen(f"{server.base_url}/debug/tokens") as response:
+            results["registry"] = json.load(response)
+    return results
+
+
+def main():
+    """
+    Benchmark the bearer token registry behind /test/headers.
+
+    In-process, it fills a registry with --tokens live tokens and reports the issue
+    rate, bytes per token, lookup cost for valid, unknown and malformed tokens, and the
+    time to evict them all once expired. It then fills a server's registry with
+    --server-tokens tokens through POST /tokens and load-tests /test/headers with an
+    issued token and with a static one, on a single-process server.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--tokens", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--server-tokens", type=int, default=100000)
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("-n", "--requests", type=int, default=5000)
+    options = parser.parse_args()
+
+    results = {"registry": measure_registry(options.tokens, options.lookups)}
+    if options.server_tokens:
+        results["server"] = measure_server(options.server_tokens, options.concurrency, options.requests)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import argparse
+import json
+import math
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from importlib import metadata
+
+DEFAULT_HISTORY = os.environ.get(
+    "BENCHMARK_HISTORY", os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.jsonl")
+)
+
+# Metrics extracted from each load generator report, and which direction is better.
+LOADGEN_METRICS = {
+    "throughput_rps": "higher",
+    "latency_p50_ms": "lower",
+    "latency_p99_ms": "lower",
+    "latency_max_ms": "lower",
+}
+PEAK_MEMORY_METRIC = "peak_memory_mb"
+
+
+def environment_info():
+    """
+    Describe the code and machine a benchmark ran on.
+
+    Returns:
+        dict: Commit (with a dirty flag), Python, HTTPie and Flask versions, and host details.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=root, capture_output=True, text=True,
+                                  timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+
+    def version(package):
+        try:
+            return metadata.version(package)
+        except metadata.PackageNotFoundError:
+            return None
+
+    return {
+        "commit": git("rev-parse", "HEAD") or None,
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "httpie": version("httpie"),
+        "flask": version("flask"),
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def peak_rss_mb(pid):
+    """
+    Return the peak resident set size of a process in MB, or None where /proc is unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def metrics_from_reports(reports, peak_memory=None):
+    """
+    Collect per-repetition samples of the tracked metrics from load generator reports.
+
+    Returns:
+        dict: Metric name -> {"better": "higher" | "lower", "samples": [...]}.
+    """
+    metrics = {name: {"better": better, "samples": []} for name, better in LOADGEN_METRICS.items()}
+    for report in reports:
+        latency = report["latency_ms"]
+        metrics["throughput_rps"]["samples"].append(report["throughput_rps"])
+        metrics["latency_p50_ms"]["samples"].append(latency["p50"])
+        metrics["latency_p99_ms"]["samples"].append(latency["p99"])
+        metrics["latency_max_ms"]["samples"].append(latency["max"])
+    samples = [value for value in (peak_memory or []) if value is not None]
+    if samples:
+        metrics[PEAK_MEMORY_METRIC] = {"better": "lower", "samples": samples}
+    return metrics
+
+
+def append_record(name, metrics, path=DEFAULT_HISTORY, config=None):
+    """
+    Append one benchmark run to the JSONL history file.
+
+    Returns:
+        dict: The record that was written.
+    """
+    record = {
+        "name": name,
+        "timestamp": time.time(),
+        **environment_info(),
+        "config": config or {},
+        "metrics": metrics,
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+    return record
+
+
+def load_history(path=DEFAULT_HISTORY, name=None):
+    """
+    Read history records in the order they were written, optionally for one benchmark name.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [r for r in records if name is None or r["name"] == name]
+
+
+def mann_whitney_u(baseline, candidate):
+    """
+    Two-sided Mann-Whitney U test with the normal approximation and a tie correction.
+
+    The test makes no assumption about the shape of the distributions, which suits
+    latency and throughput samples with long tails.
+
+    Returns:
+        float | None: The p-value, or None when either side has fewer than two samples.
+    """
+    n1, n2 = len(baseline), len(candidate)
+    if n1 < 2 or n2 < 2:
+        return None
+    combined = sorted([(value, 0) for value in baseline] + [(value, 1) for value in candidate])
+    ranks = [0.0] * len(combined)
+    tie_term = 0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tied = j - i + 1
+        tie_term += tied ** 3 - tied
+        i = j + 1
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return min(1.0, 2 * (1 - statistics.NormalDist().cdf(max(z, 0))))
+
+
+def compare_records(baseline, candidate, threshold=0.05, alpha=0.05):
+    """
+    Compare each metric of two history records.
+
+    A metric regresses when its median moves in the worse direction by more than
+    `threshold` (a fraction of the baseline median) and the Mann-Whitney U test gives
+    p < `alpha`. With fewer than two samples on either side, significance cannot be
+    tested and the threshold alone decides.
+
+    Returns:
+        list: One dict per shared metric with the medians, relative change, p-value and
+        a status of 'regression', 'improvement' or 'unchanged'.
+    """
+    results = []
+    for name, base in baseline["metrics"].items():
+        cand = candidate["metrics"].get(name)
+        if cand is None or not base["samples"] or not cand["samples"]:
+            continue
+        base_median = statistics.median(base["samples"])
+        cand_median = statistics.median(cand["samples"])
+        change = (cand_median - base_median) / base_median if base_median else 0.0
+        worse = -change if base["better"] == "higher" else change
+        p_value = mann_whitney_u(base["samples"], cand["samples"])
+        significant = p_value is None or p_value < alpha
+        if significant and worse > threshold:
+            status = "regression"
+        elif significant and worse < -threshold:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        results.append({
+            "metric": name,
+            "better": base["better"],
+            "baseline": base_median,
+            "candidate": cand_median,
+            "change": round(change, 4),
+            "p_value": None if p_value is None else round(p_value, 4),
+            "status": status,
+        })
+    return results
+
+
+def select_baseline(records, candidate, selector="previous"):
+    """
+    Pick the baseline record for `candidate` from the same benchmark's history.
+
+    Args:
+        selector (str): 'previous' for the run before the candidate, 'first' for the
+            oldest run, or a commit hash prefix for the latest run of that commit.
+    """
+    earlier = [r for r in records if r is not candidate and r["timestamp"] < candidate["timestamp"]]
+    if selector == "previous":
+        return earlier[-1] if earlier else None
+    if selector == "first":
+        return earlier[0] if earlier else None
+    matches = [r for r in earlier if (r.get("commit") or "").startswith(selector)]
+    return matches[-1] if matches else None
+
+
+def run_benchmark(name, path, path_url, concurrency, requests, repeat, mode, server_mode):
+    """
+    Load-test a local server `repeat` times and append the samples to the history.
+
+    Every repetition starts a fresh server, so the samples are independent: peak memory
+    in particular only ever grows within a process. Peak memory is only measured in
+    process mode, where the server is a process of its own; in thread mode it would
+    include the load generator.
+    """
+    from benchmarks.loadgen import run_load
+    from tests.local_server import LocalServer
+
+    reports, peak_memory = [], []
+    for _ in range(repeat):
+        with LocalServer(mode=server_mode) as server:
+            reports.append(run_load(server.base_url + path_url, concurrency=concurrency,
+                                    requests=requests, mode=mode))
+            if server_mode == "process":
+                peak_memory.append(peak_rss_mb(server.pid))
+    config = {"path": path_url, "concurrency": concurrency, "requests": requests,
+              "repeat": repeat, "mode": mode, "server_mode": server_mode,
+              "server_per_repeat": True,
+              "peak_memory": "server process VmHWM per repetition" if server_mode == "process" else None}
+    return append_record(name, metrics_from_reports(reports, peak_memory), path, config)
+
+
+def main(argv=None):
+    """
+    Record benchmark runs in a JSONL history and detect regressions between runs.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="History file (env BENCHMARK_HISTORY).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the load generator against a local server and record it.")
+    run.add_argument("--name", default="loadgen-status-200")
+    run.add_argument("--path", default="/status/200")
+    run.add_argument("-c", "--concurrency", type=int, default=20)
+    run.add_argument("-n", "--requests", type=int, default=2000)
+    run.add_argument("--repeat", type=int, default=5, help="Repetitions, i.e. samples per metric; at least 4 are needed for p < 0.05.")
+    run.add_argument("--mode", choices=("raw", "httpie"), default="raw")
+    run.add_argument("--server-mode", choices=("thread", "process"), default="process")
+
+    record = commands.add_parser("record", help="Record load generator JSON reports as one run.")
+    record.add_argument("--name", required=True)
+    record.add_argument("reports", nargs="+", help="Report files written by benchmarks.loadgen -o.")
+
+    compare = commands.add_parser("compare", help="Compare the latest run against a baseline.")
+    compare.add_argument("--name", default="loadgen-status-200")
+    compare.add_argument("--baseline", default="previous",
+                         help="'previous', 'first' or a commit hash prefix.")
+    compare.add_argument("--threshold", type=float, default=0.05,
+                         help="Relative change of the median counted as a regression.")
+    compare.add_argument("--alpha", type=float, default=0.05, help="Significance level.")
+    compare.add_argument("--fail-on-regression", action="store_true",
+                         help="Exit with status 1 when any metric regressed.")
+    options = parser.parse_args(argv)
+
+    if options.command == "run":
+        result = run_benchmark(options.name, options.history, options.path, options.concurrency,
+                               options.requests, options.repeat, options.mode, options.server_mode)
+    elif options.command == "record":
+        reports = []
+        for report_path in options.reports:
+            with open(report_path) as f:
+                reports.append(json.load(f))
+        result = append_record(options.name, metrics_from_reports(reports), options.history)
+    else:
+        records = load_history(options.history, options.name)
+        if not records:
+            parser.error(f"No history for benchmark {options.name!r} in {options.history}")
+        candidate = records[-1]
+        baseline = select_baseline(records, candidate, options.baseline)
+        if baseline is None:
+            parser.error(f"No baseline {options.baseline!r} for benchmark {options.name!r}")
+        comparison = compare_records(baseline, candidate, options.threshold, options.alpha)
+        result = {
+            "name": options.name,
+            "baseline": {"commit": baseline.get("commit"), "timestamp": baseline["timestamp"]},
+            "candidate": {"commit": candidate.get("commit"), "timestamp": candidate["timestamp"]},
+            "metrics": comparison,
+            "regressions": [m["metric"] for m in comparison if m["status"] == "regression"],
+        }
+        print(json.dumps(result, indent=2))
+        return 1 if options.fail_on_regression and result["regressions"] else 0
+
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
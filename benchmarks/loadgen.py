@@ -0,0 +1,393 @@
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from urllib.parse import urlsplit
+
+
+class LatencyHistogram:
+    """
+    A log-linear latency histogram in the style of HdrHistogram.
+
+    Values (in microseconds) below 2048 are counted exactly; larger values go into
+    buckets of 1024 sub-buckets per power of two, so every recorded value keeps three
+    significant digits. The count array is allocated up front, so recording is a couple
+    of integer operations and one list increment.
+
+    Attributes:
+        total (int): Number of recorded values.
+        min (int | None), max (int): Exact smallest and largest recorded values.
+    """
+
+    SUB_BUCKET_BITS = 11
+    SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+    SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+    def __init__(self, highest_trackable_us=3600 * 1000000):
+        self.highest_trackable_us = highest_trackable_us
+        self.counts = [0] * (self._index(highest_trackable_us) + 1)
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value):
+        if value < self.SUB_BUCKET_COUNT:
+            return value
+        shift = value.bit_length() - self.SUB_BUCKET_BITS
+        return self.SUB_BUCKET_COUNT + (shift - 1) * self.SUB_BUCKET_HALF + ((value >> shift) - self.SUB_BUCKET_HALF)
+
+    def _highest_equivalent(self, index):
+        if index < self.SUB_BUCKET_COUNT:
+            return index
+        offset = index - self.SUB_BUCKET_COUNT
+        shift = offset // self.SUB_BUCKET_HALF + 1
+        mantissa = offset % self.SUB_BUCKET_HALF + self.SUB_BUCKET_HALF
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value_us):
+        """
+        Record one latency in microseconds, clamped to the trackable range.
+        """
+        value_us = min(max(int(value_us), 0), self.highest_trackable_us)
+        self.counts[self._index(value_us)] += 1
+        self.total += 1
+        self.sum += value_us
+        if self.min is None or value_us < self.min:
+            self.min = value_us
+        if value_us > self.max:
+            self.max = value_us
+
+    def merge(self, other):
+        """
+        Add the counts of another histogram with the same range into this one.
+        """
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total += other.total
+        self.sum += other.sum
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent):
+        """
+        Return the value at `percent` (0-100), as the highest value of its bucket.
+        """
+        if not self.total:
+            return 0
+        target = max(1, math.ceil(percent / 100 * self.total))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def summary_ms(self, percentiles=(50, 90, 99, 99.9)):
+        """
+        Summarize the histogram in milliseconds.
+        """
+        summary = {
+            "count": self.total,
+            "min": round((self.min or 0) / 1000, 3),
+            "mean": round(self.sum / self.total / 1000, 3) if self.total else 0,
+        }
+        for percent in percentiles:
+            summary[f"p{percent:g}"] = round(self.percentile(percent) / 1000, 3)
+        summary["max"] = round(self.max / 1000, 3)
+        return summary
+
+
+class HTTPConnection:
+    """
+    A minimal keep-alive HTTP/1.1 client connection on asyncio streams.
+
+    Only what the load generator needs is supported: Content-Length, chunked and
+    read-until-close bodies, and reconnecting when the server closes the connection.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, headers=None, body=b''):
+        """
+        Send one request and read the full response.
+
+        Returns:
+            tuple: (status code, response body bytes).
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 f"Content-Length: {len(body)}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        try:
+            return await self._read_response(method)
+        except BaseException:
+            await self.close()
+            raise
+
+    async def _read_response(self, method):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Server closed the connection")
+        version, status = status_line.split(None, 2)[:2]
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        status = int(status)
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            body = b""
+        elif response_headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self._read_chunked()
+        elif "content-length" in response_headers:
+            body = await self.reader.readexactly(int(response_headers["content-length"]))
+        else:
+            body = await self.reader.read()
+            response_headers["connection"] = "close"
+
+        connection = response_headers.get("connection", "").lower()
+        if connection == "close" or (version == b"HTTP/1.0" and connection != "keep-alive"):
+            await self.close()
+        return status, body
+
+    async def _read_chunked(self):
+        parts = []
+        while True:
+            size = int((await self.reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(parts)
+            parts.append(await self.reader.readexactly(size))
+            await self.reader.readexactly(2)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self.writer = None
+            self.reader = None
+
+
+class LoadGenerator:
+    """
+    Drive a URL at a fixed concurrency for a request count or a duration.
+
+    Each of `concurrency` workers owns one keep-alive connection (raw mode) or sends
+    requests through a pool of pre-warmed HTTPie processes (httpie mode). With
+    `connections='per-request'`, raw workers instead open a new connection for every
+    request and close it after the response, as separate `http` invocations do. With a target
+    `rate`, request i is scheduled at start + i / rate and its latency is measured from
+    that scheduled time, so a stalled server is not hidden by requests that were never
+    sent (coordinated omission).
+
+    Attributes:
+        url (str): Target URL.
+        concurrency (int): Number of concurrent workers.
+        requests (int | None): Total requests to send; None to run for `duration`.
+        duration (float | None): Seconds to run for when `requests` is None.
+        rate (float | None): Target requests per second across all workers.
+        method (str): HTTP method.
+        mode (str): 'raw' or 'httpie'.
+        connections (str): 'keep-alive' or 'per-request'; raw mode only.
+    """
+
+    def __init__(self, url, concurrency=10, requests=None, duration=None, rate=None,
+                 method="GET", body=b"", headers=None, mode="raw", connections="keep-alive"):
+        if requests is None and duration is None:
+            raise ValueError("Either requests or duration must be given")
+        if mode not in ("raw", "httpie"):
+            raise ValueError(f"Unknown load generator mode: {mode!r}")
+        if connections not in ("keep-alive", "per-request"):
+            raise ValueError(f"Unknown connection mode: {connections!r}")
+        self.url = url
+        self.concurrency = concurrency
+        self.requests = requests
+        self.duration = duration
+        self.rate = rate
+        self.method = method
+        self.body = body
+        self.headers = headers or {}
+        self.mode = mode
+        self.connections = connections
+
+        parts = urlsplit(url)
+        self._host = parts.hostname
+        self._port = parts.port or 80
+        self._path = parts.path or "/"
+        if parts.query:
+            self._path += "?" + parts.query
+
+        self.histogram = LatencyHistogram()
+        self.status_codes = {}
+        self.errors = {}
+        self._issued = 0
+
+    def _next_index(self, start, now):
+        """
+        Claim the next request slot, or return None when the run is over.
+        """
+        if self.requests is not None and self._issued >= self.requests:
+            return None
+        if self.requests is None:
+            if now - start >= self.duration:
+                return None
+            if self.rate and self._issued / self.rate >= self.duration:
+                return None
+        index = self._issued
+        self._issued += 1
+        return index
+
+    async def _worker(self, start, send):
+        loop = asyncio.get_running_loop()
+        while True:
+            index = self._next_index(start, loop.time())
+            if index is None:
+                return
+            scheduled = loop.time()
+            if self.rate:
+                scheduled = start + index / self.rate
+                delay = scheduled - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            try:
+                status = await send()
+                key = str(status)
+                self.status_codes[key] = self.status_codes.get(key, 0) + 1
+            except Exception as e:
+                name = type(e).__name__
+                self.errors[name] = self.errors.get(name, 0) + 1
+            self.histogram.record((loop.time() - scheduled) * 1000000)
+
+    async def _run_raw(self, start):
+        connections = [HTTPConnection(self._host, self._port) for _ in range(self.concurrency)]
+        per_request = self.connections == "per-request"
+        headers = dict(self.headers, Connection="close") if per_request else self.headers
+
+        def sender(connection):
+            async def send():
+                status, _ = await connection.request(self.method, self._path, headers, self.body)
+                if per_request:
+                    await connection.close()
+                return status
+            return send
+
+        try:
+            await asyncio.gather(*(self._worker(start, sender(c)) for c in connections))
+        finally:
+            for connection in connections:
+                await connection.close()
+
+    async def _run_httpie(self, start):
+        from tests.httpie_pool import HTTPiePool
+
+        args = ["http", "--print=h", self.method, self.url] + [f"{k}:{v}" for k, v in self.headers.items()]
+        loop = asyncio.get_running_loop()
+        with HTTPiePool(size=self.concurrency) as pool:
+            async def send():
+                stdout, stderr, exit_status = await loop.run_in_executor(None, pool.run, args, self.body or None)
+                if exit_status != 0 or not stdout.startswith("HTTP/"):
+                    raise RuntimeError(stderr.strip() or f"HTTPie exit status {exit_status}")
+                return int(stdout.split(None, 2)[1])
+
+            await asyncio.gather(*(self._worker(start, send) for _ in range(self.concurrency)))
+
+    async def run(self):
+        """
+        Run the load and return the report (see report()).
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        if self.mode == "raw":
+            await self._run_raw(start)
+        else:
+            await self._run_httpie(start)
+        return self.report(loop.time() - start)
+
+    def report(self, elapsed):
+        """
+        Build a JSON-serializable report of throughput, latency and outcomes.
+        """
+        completed = self.histogram.total
+        return {
+            "url": self.url,
+            "mode": self.mode,
+            "connections": self.connections if self.mode == "raw" else "per-request",
+            "method": self.method,
+            "concurrency": self.concurrency,
+            "target_rate": self.rate,
+            "requests": completed,
+            "duration_s": round(elapsed, 3),
+            "throughput_rps": round(completed / elapsed, 1) if elapsed else 0,
+            "latency_ms": self.histogram.summary_ms(),
+            "status_codes": dict(sorted(self.status_codes.items())),
+            "errors": self.errors,
+            "timestamp": time.time(),
+        }
+
+
+def run_load(url, **options):
+    """
+    Run a LoadGenerator to completion from synchronous code and return its report.
+    """
+    return asyncio.run(LoadGenerator(url, **options).run())
+
+
+def main(argv=None):
+    """
+    Generate HTTP load against the mock server and print a JSON report.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("url")
+    parser.add_argument("-c", "--concurrency", type=int, default=10)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("-n", "--requests", type=int, default=None)
+    group.add_argument("-d", "--duration", type=float, default=None, help="Seconds to run for.")
+    parser.add_argument("-r", "--rate", type=float, default=None, help="Target requests per second.")
+    parser.add_argument("-m", "--method", default="GET")
+    parser.add_argument("--mode", choices=("raw", "httpie"), default="raw",
+                        help="raw: asyncio HTTP client; httpie: real HTTPie invocations.")
+    parser.add_argument("--connections", choices=("keep-alive", "per-request"), default="keep-alive",
+                        help="Raw mode: reuse one connection per worker, or open one per request.")
+    parser.add_argument("-o", "--output", default=None, help="Also write the report to this file.")
+    options = parser.parse_args(argv)
+    if options.requests is None and options.duration is None:
+        options.requests = 1000
+
+    report = run_load(
+        options.url,
+        concurrency=options.concurrency,
+        requests=options.requests,
+        duration=options.duration,
+        rate=options.rate,
+        method=options.method,
+        mode=options.mode,
+        connections=options.connections,
+    )
+    text = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0 if not report["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,103 +1,145 @@
 import csv
+import hashlib
 import io
+import json
+import mimetypes
+import os
+import sys
+import time
+from http import HTTPStatus
+from urllib.parse import urlsplit
 from xml.etree import ElementTree as ET
-from flask import Flask, jsonify, redirect, request
+from datetime import datetime, timezone
+from flask import Flask, jsonify, redirect, request, stream_with_context
+from werkzeug.http import http_date, quote_etag
+from werkzeug.security import safe_join
+
+if __package__ in (None, ''):
+    # Running as `python flask_app/app.py`: make the flask_app package importable.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_app.compression import (
+    RequestDecompressor, ResponseCompressor, mark_static, request_body_stats
+)
+from flask_app.credentials import CredentialStore
+from flask_app.downloads import FileBody, files_directory, iter_pattern, resolve_range
+from flask_app.json_provider import FastJSONProvider
+from flask_app.metrics import RouteMetrics, connection_metrics
+from flask_app.profiling import SORT_KEYS, RequestProfiler
+from flask_app.serve import connection_scheduler, worker_processes
+from flask_app.shaping import PARK_BODY_LIMIT, ResponseShaper, shape_response
+from flask_app.streaming import (
+    UrlencodedFieldReader, XMLStreamParser, iter_stream, iter_text_lines, spool_stream
+)
+from flask_app.tokens import RegistryFull, TokenRegistry
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+# Installed first so that they are the innermost middleware: metrics then count the
+# bytes actually sent and received, and profiles include (de)compression time.
+compressor = ResponseCompressor(app)
+decompressor = RequestDecompressor(app)
+metrics = RouteMetrics(app)
+profiler = RequestProfiler(app)
+# Outermost, so that delays and bandwidth limits apply to the bytes as they are sent.
+shaper = ResponseShaper(app)
 
 # Token variables for customization
 tokenValue = "sampletoken"
 userValue = "anonymousDude"
 
-#-------------------------------------------------------------------------------
-# 1xx Informational Responses
-#-------------------------------------------------------------------------------
+# Bearer tokens accepted by /test/headers: the fixed tokens above, which never expire,
+# and the tokens issued by POST /tokens. The registry lives in one process's memory, so
+# /tokens is refused when the server runs more than one worker.
+tokens = TokenRegistry()
+tokens.add_static(tokenValue)
+tokens.add_static(userValue)
 
-@app.route('/status/102', methods=['GET'])
-def status_102():
-    """
-    Handle the route for a 102 Processing status.
+# Most tokens one POST /tokens request may issue.
+MAX_TOKENS_PER_REQUEST = 10000
 
-    Returns:
-        Response: A JSON object with a "Processing" message.
-        int: HTTP status code 102.
-
-    This endpoint simulates an informational response, which is not directly
-    handled by HTTPie. For testing, we mimic this with a message.
-    """
-    return jsonify({"status": "Processing", "note": "This simulates a 102 response"}), 200
+# Basic Auth users of /test/basic-auth, stored as salted PBKDF2 hashes (user1's password
+# is 'password'). FLASK_APP_CREDENTIALS_FILE adds the users of a CredentialStore file.
+credentials = CredentialStore({
+    'user1': 'pbkdf2_sha256$600000$zVN5BK7CNbigBcvxuWsGtg==$LeoDzAmeuZrfjyWgWMVtddBs7re5tNvo+gYEFfpzoH4=',
+})
+if os.environ.get('FLASK_APP_CREDENTIALS_FILE'):
+    credentials.load(os.environ['FLASK_APP_CREDENTIALS_FILE'])
 
 #-------------------------------------------------------------------------------
-# 2xx Successful Responses
+# Status Code Responses
 #-------------------------------------------------------------------------------
 
-@app.route('/status/200', methods=['GET'])
-def status_200():
-    """
-    Handle the route for a 200 OK status.
+# Where 3xx responses send the client.
+STATUS_REDIRECT_TARGET = '/status/200'
 
-    Returns:
-        Response: A JSON object with a success message.
-        int: HTTP status code 200 to indicate a successful request.
+# Statuses that advertise when to retry, and the delay they advertise in seconds.
+RETRY_AFTER_STATUSES = {429, 503}
+RETRY_AFTER_SECONDS = 1
 
-    This endpoint simulates a standard success response, commonly used to indicate
-    that the request was processed successfully.
-    """
-    return jsonify({"message": "Success"}), 200
+# Statuses that must not carry a body.
+NO_BODY_STATUSES = {204, 205, 304}
 
-#-------------------------------------------------------------------------------
-# 3xx Redirection Responses
-#-------------------------------------------------------------------------------
 
-@app.route('/status/302', methods=['GET'])
-def status_302():
+def _build_status_response(code):
     """
-    Handle the route for a 302 Found status.
+    Build the response for one status code as (status, body bytes, header list).
 
-    Redirects:
-        str: The URL to redirect the client to, in this case, '/status/200'.
-        int: HTTP status code 302 to indicate a redirection.
-
-    This endpoint simulates a redirection, instructing the client to fetch the
-    resource at '/status/200'.
+    - 1xx codes cannot be sent as final responses, so they are simulated with a 200
+      and a {"status": ..., "note": ...} message, as HTTPie never sees them directly.
+    - 2xx codes return {"message": "Success"}.
+    - 3xx codes redirect to STATUS_REDIRECT_TARGET (except 304, which has no body).
+    - 4xx and 5xx codes return {"error": <reason phrase>}; 429 and 503 add Retry-After.
     """
-    return redirect('/status/200', code=302)
+    phrase = HTTPStatus(code).phrase
+    status = code
+    headers = []
 
-#-------------------------------------------------------------------------------
-# 4xx Client Error Responses
-#-------------------------------------------------------------------------------
+    if code in NO_BODY_STATUSES:
+        return status, b'', headers
+    if 300 <= code < 400:
+        response = redirect(STATUS_REDIRECT_TARGET, code=code)
+        headers = [('Content-Type', response.content_type), ('Location', response.headers['Location'])]
+        return status, response.get_data(), headers
 
-@app.route('/status/404', methods=['GET'])
-def status_404():
-    """
-    Handle the route for a 404 Not Found status.
+    if code < 200:
+        status, body = 200, {"status": phrase, "note": f"This simulates a {code} response"}
+    elif code < 300:
+        body = {"message": "Success"}
+    else:
+        body = {"error": phrase}
+    if code in RETRY_AFTER_STATUSES:
+        headers.append(('Retry-After', str(RETRY_AFTER_SECONDS)))
+    response = app.json.response(body)
+    headers.insert(0, ('Content-Type', response.content_type))
+    return status, response.get_data(), headers
 
-    Returns:
-        Response: A JSON object with an error message.
-        int: HTTP status code 404 to indicate that the requested resource was not found.
 
-    This endpoint simulates a client error response, typically used when the requested
-    resource does not exist on the server.
-    """
-    return jsonify({"error": "Not Found"}), 404
+# Every standard status code, serialized once at startup.
+STATUS_RESPONSES = {status.value: _build_status_response(status.value) for status in HTTPStatus}
+UNKNOWN_STATUS_RESPONSE = (
+    400, app.json.response({"error": "Unknown status code"}).get_data(), [('Content-Type', 'application/json')]
+)
 
-#-------------------------------------------------------------------------------
-# 5xx Server Error Responses
-#-------------------------------------------------------------------------------
 
-@app.route('/status/500', methods=['GET'])
-def status_500():
+@app.route('/status/<int:code>', methods=['GET'])
+def status(code):
     """
-    Handle the route for a 500 Internal Server Error status.
+    Handle the route for any standard HTTP status code.
 
     Returns:
-        Response: A JSON object with an error message.
-        int: HTTP status code 500 to indicate a generic server error.
+        Response: The precomputed body and headers for `code` (see
+        _build_status_response()), or a 400 for codes that are not standard.
+
+    Responses are looked up in STATUS_RESPONSES, so no serialization happens per
+    request, and their compressed forms are cached by the compression middleware.
 
-    This endpoint simulates a server error response, typically used when the server
-    encounters an unexpected condition that prevents it from fulfilling the request.
+    For example, /status/102 simulates an informational response, /status/302
+    redirects to /status/200, and /status/404 returns {"error": "Not Found"}.
     """
-    return jsonify({"error": "Internal Server Error"}), 500
+    status_code, body, headers = STATUS_RESPONSES.get(code, UNKNOWN_STATUS_RESPONSE)
+    mark_static(body)
+    return app.response_class(body, status=status_code, headers=headers)
 
 #-------------------------------------------------------------------------------
 # Custom Routes for Session Management and Testing
@@ -108,8 +150,8 @@ def test_headers():
     """
     Handle the route for testing header persistence.
 
-    Checks for the 'Authorization' header in the request and verifies if it matches
-    the expected values.
+    Checks for a 'Bearer' 'Authorization' header in the request and verifies the token
+    against the token registry: the fixed test tokens, or a live token from POST /tokens.
 
     Returns:
         Response: A JSON object with a success or error message.
@@ -118,18 +160,82 @@ def test_headers():
     This endpoint is used to test if authorization headers persist across
     different requests, which is crucial for session management and security.
     """
-    auth_header = request.headers.get('Authorization')
-    if auth_header in [f"Bearer {tokenValue}", f"Bearer {userValue}"]:
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme == 'Bearer' and tokens.is_valid(token):
         return jsonify({"message": "Authorization header received"}), 200
     return jsonify({"error": "Authorization header missing or incorrect"}), 401
 
+@app.route('/tokens', methods=['POST'])
+def issue_tokens():
+    """
+    Handle the route that issues bearer tokens for /test/headers.
+
+    Query parameters:
+        ttl: Lifetime in seconds, 3600 by default (FLASK_APP_TOKEN_TTL), at most
+            FLASK_APP_TOKEN_MAX_TTL.
+        count: Number of tokens to issue, 1 by default and at most 10000, e.g. to load
+            the registry before a benchmark.
+
+    Returns:
+        Response: 201 with {"access_token", "token_type", "expires_in", "expires_at"},
+        or {"tokens": [...], ...} when count is above 1; a 400 for an invalid ttl or
+        count, a 503 when the registry is full, or a 501 when the server runs several
+        worker processes.
+    """
+    if worker_processes() > 1:
+        return _per_worker_tokens_error()
+    try:
+        ttl = int(request.args.get('ttl', tokens.default_ttl))
+        count = int(request.args.get('count', 1))
+    except ValueError:
+        return jsonify({"error": "ttl and count must be integers"}), 400
+    if not 1 <= count <= MAX_TOKENS_PER_REQUEST:
+        return jsonify({"error": f"count must be between 1 and {MAX_TOKENS_PER_REQUEST}"}), 400
+    try:
+        issued, expires = tokens.issue(ttl, count)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RegistryFull as e:
+        return jsonify({"error": str(e)}), 503
+    body = {"token_type": "Bearer", "expires_in": ttl, "expires_at": expires}
+    if count == 1:
+        body["access_token"] = issued[0]
+    else:
+        body["tokens"] = issued
+    return jsonify(body), 201
+
+@app.route('/tokens/<token>', methods=['DELETE'])
+def revoke_token(token):
+    """
+    Handle the route that revokes an issued bearer token.
+
+    Returns:
+        Response: An empty 204, a 404 when the token is unknown or has expired, or a
+        501 when the server runs several worker processes.
+    """
+    if worker_processes() > 1:
+        return _per_worker_tokens_error()
+    if tokens.revoke(token):
+        return '', 204
+    return jsonify({"error": "Unknown or expired token"}), 404
+
+
+def _per_worker_tokens_error():
+    """
+    Refuse to issue or revoke tokens that only one worker process would know about.
+    """
+    return jsonify({
+        "error": "Issued tokens are kept per worker process; start the server with --workers 1 to use /tokens"
+    }), 501
+
 @app.route('/test/basic-auth', methods=['GET'])
 def basic_auth():
     """
     Handle the route for testing basic authentication.
 
     Checks the 'Authorization' header for basic authentication credentials and
-    verifies if they are correct.
+    verifies them against the credential store's password hashes. Credentials
+    verified recently are answered from its cache without hashing.
 
     Returns:
         Response: A JSON object with a success or error message.
@@ -139,7 +245,7 @@ def basic_auth():
     the server correctly handles and validates user credentials.
     """
     auth = request.authorization
-    if auth and auth.username == 'user1' and auth.password == 'password':
+    if auth and auth.type == 'basic' and credentials.verify(auth.username, auth.password or ''):
         return jsonify({"message": "Basic Auth successful"}), 200
     return jsonify({"error": "Unauthorized"}), 401
 
@@ -154,12 +260,70 @@ def large_payload():
     Returns:
         Response: A JSON object confirming receipt of the payload.
         int: HTTP status code 200 if the payload is successfully received.
+
+    With the `stream` query argument set (e.g. `http -f POST .../test/large_payload
+    stream==1 payload=@big.txt`), the body is read from the request stream in fixed-size
+    chunks instead of being buffered, so memory stays flat for uploads of any size.
+    See _stream_large_payload() for the fields reported in that mode.
     """
+    if request.args.get('stream'):
+        return _stream_large_payload()
+
     payload = request.form.get('payload')
     if payload:
         return jsonify({"status": "Payload received", "payload_size": len(payload)}), 200
     return jsonify({"error": "Payload not provided"}), 400
 
+def _stream_large_payload():
+    """
+    Count and hash the /test/large_payload body while reading it in chunks.
+
+    Raw bodies (including chunked transfer encoding) are measured whole; for
+    form-encoded bodies the decoded 'payload' field is measured, as in buffered mode.
+    The `digest` query argument selects the hash algorithm (default sha256).
+
+    Returns:
+        Response: A JSON object with bytes_received (raw body), payload_size, the digest,
+        elapsed_seconds and throughput_mb_per_s measured on the server. For a compressed
+        body (`http --compress`), bytes_received counts inflated bytes and
+        request_encoding gives the compressed size, ratio and inflate time.
+        int: HTTP status code 200, or 400 for an unknown digest or missing form field.
+    """
+    algorithm = request.args.get('digest', 'sha256')
+    if algorithm not in hashlib.algorithms_available:
+        return jsonify({"error": f"Unsupported digest: {algorithm}"}), 400
+    digest = hashlib.new(algorithm)
+
+    is_form = request.mimetype == 'application/x-www-form-urlencoded'
+    form_reader = UrlencodedFieldReader('payload', digest.update) if is_form else None
+
+    bytes_received = 0
+    start = time.perf_counter()
+    for chunk in iter_stream(request.stream):
+        bytes_received += len(chunk)
+        if form_reader:
+            form_reader.feed(chunk)
+        else:
+            digest.update(chunk)
+    if form_reader:
+        form_reader.close()
+    elapsed = time.perf_counter() - start
+
+    payload_size = form_reader.size if form_reader else bytes_received
+    if (form_reader and not form_reader.found) or not payload_size:
+        return jsonify({"error": "Payload not provided"}), 400
+
+    return jsonify({
+        "status": "Payload received",
+        "mode": "stream",
+        "bytes_received": bytes_received,
+        "payload_size": payload_size,
+        "digest": {"algorithm": algorithm, "value": digest.hexdigest()},
+        "elapsed_seconds": round(elapsed, 6),
+        "throughput_mb_per_s": round(bytes_received / elapsed / 1e6, 3) if elapsed else None,
+        "request_encoding": request_body_stats(request.environ),
+    }), 200
+
 #-------------------------------------------------------------------------------
 # Working with Cookies
 #-------------------------------------------------------------------------------
@@ -233,6 +397,99 @@ def delete_cookie():
     response.set_cookie('test_cookie', '', expires=0)
     return response
 
+@app.route('/set-cookies/<int:n>', methods=['GET', 'POST'])
+def set_cookies(n):
+    """
+    Set `n` generated cookies in the response, for building large cookie jars.
+
+    Cookie i is named 'bulk<i>' and has a value of `size` characters (default 16)
+    derived from i, for i from `start` (default 0). Repeated `domain` and `path` query
+    arguments are assigned to the cookies in turn; an empty `domain` sets a host-only
+    cookie. Clients built on http.client, HTTPie included, refuse responses with more
+    than 100 headers, so larger jars are built in batches with `start`.
+
+    Returns:
+        Response: The first and last index and the number of cookies set, or a 400 for
+        an invalid `size` or `start`.
+    """
+    size = request.args.get('size', 16, type=int)
+    start = request.args.get('start', 0, type=int)
+    if not 1 <= size <= 4096 or start < 0:
+        return jsonify({"error": "size must be between 1 and 4096 and start must not be negative"}), 400
+    domains = request.args.getlist('domain') or ['']
+    paths = request.args.getlist('path') or ['/']
+    response = jsonify({"message": "Cookies set", "start": start, "end": start + n, "count": n})
+    for i in range(start, start + n):
+        response.set_cookie(f'bulk{i}', _bulk_cookie_value(i, size),
+                            domain=domains[i % len(domains)] or None, path=paths[i % len(paths)])
+    return response
+
+@app.route('/check-cookies/<int:n>', methods=['GET', 'POST'])
+def check_cookies(n):
+    """
+    Check in one pass that the cookies from /set-cookies/<n> were sent back.
+
+    Takes the same `size`, `domain` and `path` arguments as /set-cookies. Only the
+    cookies whose domain and path match this request are expected, since a client
+    sends no others.
+
+    Returns:
+        Response: Counts of expected, received, missing and mismatched cookies. The
+        status is 400 unless every expected cookie arrived with its value.
+    """
+    size = request.args.get('size', 16, type=int)
+    domains = request.args.getlist('domain') or ['']
+    paths = request.args.getlist('path') or ['/']
+    host = urlsplit(request.host_url).hostname or ''
+    sent_for = [
+        [_cookie_domain_matches(host, domain) and _cookie_path_matches(request.path, path) for path in paths]
+        for domain in domains
+    ]
+    cookies = request.cookies
+    expected = received = mismatched = 0
+    missing = []
+    for i in range(n):
+        if not sent_for[i % len(domains)][i % len(paths)]:
+            continue
+        expected += 1
+        value = cookies.get(f'bulk{i}')
+        if value is None:
+            missing.append(i)
+        elif value == _bulk_cookie_value(i, size):
+            received += 1
+        else:
+            mismatched += 1
+    body = {"expected": expected, "received": received, "missing": len(missing),
+            "mismatched": mismatched, "first_missing": missing[:10]}
+    if received == expected:
+        return jsonify({"message": "All cookies received", **body})
+    return jsonify({"message": "Some or all cookies missing", **body}), 400
+
+def _bulk_cookie_value(i, size):
+    """
+    Returns:
+        str: The `size`-character value of bulk cookie i.
+    """
+    unit = f"{i:x}_"
+    return (unit * (size // len(unit) + 1))[:size]
+
+def _cookie_domain_matches(host, domain):
+    """
+    Returns:
+        bool: Whether a cookie set with this Domain attribute is sent to `host` (RFC 6265).
+    """
+    domain = domain.lstrip('.').lower()
+    return not domain or host == domain or host.endswith('.' + domain)
+
+def _cookie_path_matches(request_path, path):
+    """
+    Returns:
+        bool: Whether a cookie with this Path attribute is sent for `request_path` (RFC 6265).
+    """
+    return request_path == path or (
+        request_path.startswith(path) and (path.endswith('/') or request_path[len(path)] == '/')
+    )
+
 #-------------------------------------------------------------------------------
 # Response formatting
 #-------------------------------------------------------------------------------
@@ -260,10 +517,18 @@ def test_json():
 def test_xml():
     """
     Handle POST requests with XML payloads.
+
+    The `stream` query argument switches to bounded-memory incremental parsing:
+    `stream=summary` returns element counts, depth and byte size, and any other value
+    returns the nested conversion of each record as NDJSON; see _stream_xml().
     """
     if request.content_type != 'application/xml':
         return jsonify({"error": "Content-Type must be application/xml"}), 400
 
+    stream_mode = request.args.get('stream')
+    if stream_mode:
+        return _stream_xml(stream_mode)
+
     try:
         # Parse the XML data
         xml_data = ET.fromstring(request.data)
@@ -277,15 +542,66 @@ def test_xml():
     except ET.ParseError:
         return jsonify({"error": "Invalid XML payload"}), 400
 
+def _stream_xml(stream_mode):
+    """
+    Parse the /test/xml body incrementally, clearing elements once processed.
+
+    Args:
+        stream_mode (str): 'summary' for a summary of the whole document, 'duplex' to
+            stream records straight off the socket, anything else to stream records
+            from a spooled copy of the body (see _stream_csv_rows() for why).
+
+    Returns:
+        Response: For 'summary', a JSON object with the byte size, root tag, element
+        and attribute counts, maximum depth and per-tag counts. Otherwise an
+        application/x-ndjson stream with one {tag: data} line per direct child of the
+        root, keeping nested structure and repeated tags (as lists). A parse error ends
+        the stream with a final {"error": ...} line.
+    """
+    parser = XMLStreamParser()
+
+    if stream_mode == 'summary':
+        try:
+            summary = parser.summary(iter_stream(request.stream))
+        except ET.ParseError as e:
+            return jsonify({"error": f"Invalid XML payload: {str(e)}"}), 400
+        return jsonify({
+            "method": request.method,
+            "Content-Type": request.headers.get("Content-Type"),
+            "summary": summary
+        }), 200
+
+    duplex = stream_mode == 'duplex'
+    source = request.stream if duplex else spool_stream(request.stream)
+
+    def generate():
+        try:
+            for tag, data in parser.records(iter_stream(source)):
+                yield app.json.dumps({tag: data}, separators=(',', ':')) + "\n"
+        except ET.ParseError as e:
+            yield json.dumps({"error": f"Invalid XML payload: {str(e)}"}) + "\n"
+        finally:
+            if not duplex:
+                source.close()
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 
 @app.route('/test/csv', methods=['POST'])
 def test_csv():
     """
     Handle POST requests with CSV payloads.
+
+    With the `stream` query argument set, rows are parsed incrementally and returned
+    as NDJSON, one JSON object per line; see _stream_csv_rows().
     """
     if request.content_type != 'text/csv':
         return jsonify({"error": "Content-Type must be text/csv"}), 400
 
+    stream_mode = request.args.get('stream')
+    if stream_mode:
+        return _stream_csv_rows(duplex=stream_mode == 'duplex')
+
     try:
         # Parse the CSV data
         csv_file = io.StringIO(request.data.decode('utf-8'))
@@ -300,6 +616,35 @@ def test_csv():
     except Exception as e:
         return jsonify({"error": f"Invalid CSV payload: {str(e)}"}), 400
 
+def _stream_csv_rows(duplex=False):
+    """
+    Stream the rows of the /test/csv body back as NDJSON while they are parsed.
+
+    Peak memory is bounded by one row whatever the size of the upload. By default the
+    body is first spooled (to disk past a few MB), because HTTPie, like most HTTP/1.1
+    clients, sends the whole body before reading the response; writing rows earlier
+    would stall both sides once the socket buffers fill. With `stream=duplex` rows are
+    parsed straight off the socket, for full-duplex clients, giving a constant
+    time-to-first-byte.
+
+    Returns:
+        Response: An application/x-ndjson stream of row objects. A malformed row ends
+        the stream with a final {"error": ...} line, since the status is already sent.
+    """
+    source = request.stream if duplex else spool_stream(request.stream)
+
+    def generate():
+        try:
+            for row in csv.DictReader(iter_text_lines(iter_stream(source))):
+                yield app.json.dumps(row, separators=(',', ':')) + "\n"
+        except (csv.Error, UnicodeDecodeError) as e:
+            yield json.dumps({"error": f"Invalid CSV payload: {str(e)}"}) + "\n"
+        finally:
+            if not duplex:
+                source.close()
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/test/html', methods=['POST'])
 def test_html():
     """
@@ -316,6 +661,472 @@ def test_html():
         "data": html_data
     }), 200
 
+#-------------------------------------------------------------------------------
+# httpbin-compatible Routes
+#-------------------------------------------------------------------------------
+
+# Requests carrying more headers than this are rejected by /headers with a 431,
+# standing in for the header limit of the proxy in front of httpbin.org.
+HTTPBIN_MAX_HEADERS = 50
+
+
+def _build_gray_jpeg(width=64, height=64):
+    """
+    Build a minimal baseline grayscale JPEG of uniform mid-gray pixels.
+
+    Every 8x8 block has a zero DC difference and no AC coefficients, so the scan
+    data is two one-bit Huffman codes per block and the bytes never change.
+    """
+    def segment(marker, payload):
+        return bytes([0xFF, marker]) + (len(payload) + 2).to_bytes(2, 'big') + payload
+
+    blocks = ((width + 7) // 8) * ((height + 7) // 8)
+    scan_bits = '00' * blocks
+    scan_bits += '1' * (-len(scan_bits) % 8)  # Pad the final byte with 1-bits
+    scan = int(scan_bits, 2).to_bytes(len(scan_bits) // 8, 'big')
+    one_symbol_table = bytes([1] + [0] * 15) + b'\x00'  # A single 1-bit code for symbol 0
+
+    return b''.join([
+        b'\xFF\xD8',
+        segment(0xE0, b'JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'),
+        segment(0xDB, b'\x00' + b'\x01' * 64),
+        segment(0xC0, b'\x08' + height.to_bytes(2, 'big') + width.to_bytes(2, 'big') + b'\x01\x01\x11\x00'),
+        segment(0xC4, b'\x00' + one_symbol_table),
+        segment(0xC4, b'\x10' + one_symbol_table),
+        segment(0xDA, b'\x01\x01\x00\x00\x3F\x00'),
+        scan,
+        b'\xFF\xD9',
+    ])
+
+
+HTTPBIN_JPEG = _build_gray_jpeg()
+
+
+def _httpbin_response(body, status=200):
+    """
+    Serialize a body the way httpbin.org does: indented, key-sorted JSON.
+    """
+    return app.response_class(
+        app.json.dumps(body, indent=2) + "\n",
+        status=status,
+        mimetype='application/json'
+    )
+
+
+def _httpbin_request_info(*fields):
+    """
+    Collect the httpbin description of the current request.
+
+    Args:
+        fields (str): Names of the keys to include, e.g. 'args', 'headers', 'url'.
+
+    Returns:
+        dict: The requested subset of args, data, files, form, headers, json, origin and url.
+    """
+    builders = {
+        'args': lambda: request.args.to_dict(),
+        'data': lambda: request.get_data(as_text=True) if not request.form and not request.files else "",
+        'files': lambda: {name: f.read().decode('utf-8', 'replace') for name, f in request.files.items()},
+        'form': lambda: request.form.to_dict(),
+        'headers': lambda: dict(request.headers.items()),
+        'json': lambda: request.get_json(silent=True),
+        'origin': lambda: request.remote_addr,
+        'url': lambda: request.url,
+    }
+    return {field: builders[field]() for field in fields}
+
+
+@app.route('/get', methods=['GET'])
+def httpbin_get():
+    """
+    Handle the route for an httpbin-compatible GET echo.
+
+    Returns:
+        Response: The query arguments, headers, origin and URL of the request.
+    """
+    return _httpbin_response(_httpbin_request_info('args', 'headers', 'origin', 'url'))
+
+
+@app.route('/post', methods=['POST'])
+def httpbin_post():
+    """
+    Handle the route for an httpbin-compatible POST echo.
+
+    Returns:
+        Response: The body of the request as raw data, form fields, files and JSON,
+        alongside its arguments, headers, origin and URL.
+    """
+    return _httpbin_response(_httpbin_request_info(
+        'args', 'data', 'files', 'form', 'headers', 'json', 'origin', 'url'
+    ))
+
+
+@app.route('/headers', methods=['GET'])
+def httpbin_headers():
+    """
+    Handle the route for an httpbin-compatible header echo.
+
+    Returns:
+        Response: The request headers.
+        int: HTTP status code 200, or 431 when more than HTTPBIN_MAX_HEADERS were sent.
+    """
+    if len(request.headers) > HTTPBIN_MAX_HEADERS:
+        return _httpbin_response({"error": "Request Header Fields Too Large"}, 431)
+    return _httpbin_response(_httpbin_request_info('headers'))
+
+
+@app.route('/basic-auth/<user>/<passwd>', methods=['GET'])
+def httpbin_basic_auth(user, passwd):
+    """
+    Handle the route for httpbin-compatible basic authentication.
+
+    Returns:
+        Response: {"authenticated": true, "user": <user>} when the credentials match the
+        URL, otherwise an empty 401 response with a WWW-Authenticate challenge.
+    """
+    auth = request.authorization
+    if auth and auth.username == user and auth.password == passwd:
+        return _httpbin_response({"authenticated": True, "user": user})
+    response = app.response_class(status=401)
+    response.headers['WWW-Authenticate'] = 'Basic realm="Fake Realm"'
+    return response
+
+
+@app.route('/redirect/<int:n>', methods=['GET'])
+def httpbin_redirect(n):
+    """
+    Handle the route for an httpbin-compatible redirect chain.
+
+    Redirects:
+        str: '/redirect/<n-1>', or '/get' once the chain is exhausted.
+        int: HTTP status code 302.
+    """
+    return redirect('/get' if n <= 1 else f'/redirect/{n - 1}', code=302)
+
+
+@app.route('/stream/<int:n>', methods=['GET'])
+def httpbin_stream(n):
+    """
+    Handle the route for an httpbin-compatible line-delimited JSON stream.
+
+    Returns:
+        Response: min(n, 100) JSON documents, one per line, each carrying its "id".
+    """
+    info = _httpbin_request_info('args', 'headers', 'origin', 'url')
+
+    def generate():
+        for i in range(min(n, 100)):
+            yield json.dumps({**info, "id": i}) + "\n"
+
+    return app.response_class(generate(), mimetype='application/json')
+
+
+@app.route('/image/jpeg', methods=['GET'])
+def httpbin_image_jpeg():
+    """
+    Handle the route for an httpbin-compatible JPEG image.
+
+    Returns:
+        Response: A fixed, deterministic JPEG so downloaded checksums never change.
+    """
+    return app.response_class(HTTPBIN_JPEG, mimetype='image/jpeg')
+
+
+# Longest delay of /delay and /drip, as on httpbin.org.
+HTTPBIN_MAX_DELAY = 10.0
+
+# Largest /drip body, and most paced writes it is split into. Bodies up to the
+# shaping middleware's PARK_BODY_LIMIT are waited out without holding a request thread.
+HTTPBIN_MAX_DRIP_BYTES = PARK_BODY_LIMIT
+HTTPBIN_MAX_DRIP_CHUNKS = 1000
+
+
+def _query_number(name, convert, default, low, high):
+    """
+    Read a numeric query argument, clamped to low..high.
+
+    Returns:
+        int | float | None: The value, or None when it is not a number.
+    """
+    try:
+        value = convert(request.args.get(name, default))
+    except ValueError:
+        return None
+    return None if value != value else min(max(value, low), high)
+
+
+@app.route('/delay/<delay>', methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+def httpbin_delay(delay):
+    """
+    Handle the route for an httpbin-compatible delayed response, for testing --timeout.
+
+    The delay is waited out without holding a request thread; see
+    flask_app.shaping.ResponseShaper.
+
+    Returns:
+        Response: The request's args, data, files, form, headers, origin and url, sent
+        after min(delay, 10) seconds, or a 400 when the delay is not a number.
+    """
+    try:
+        seconds = min(max(float(delay), 0.0), HTTPBIN_MAX_DELAY)
+    except ValueError:
+        return _httpbin_response({"error": "delay must be a number of seconds"}, 400)
+    if seconds != seconds:
+        return _httpbin_response({"error": "delay must be a number of seconds"}, 400)
+    shape_response(request.environ, latency=seconds)
+    return _httpbin_response(_httpbin_request_info('args', 'data', 'files', 'form', 'headers', 'origin', 'url'))
+
+
+@app.route('/drip', methods=['GET'])
+def httpbin_drip():
+    """
+    Handle the route for httpbin-compatible dripped data, for testing streaming output.
+
+    Query parameters:
+        numbytes: Bytes to send (default 10, at most 1 MiB).
+        duration: Seconds over which the bytes are spread (default 2).
+        delay: Seconds before the response starts (default 2, at most 10).
+        code: Response status (default 200).
+        chunks: Writes the bytes are split into (default numbytes, at most 1000).
+
+    Returns:
+        Response: `numbytes` asterisks with a Content-Length, sent in evenly paced chunks
+        after the delay, or a 400 for a parameter that is not a number.
+    """
+    numbytes = _query_number('numbytes', int, 10, 0, HTTPBIN_MAX_DRIP_BYTES)
+    duration = _query_number('duration', float, 2, 0.0, 3600.0)
+    delay = _query_number('delay', float, 2, 0.0, HTTPBIN_MAX_DELAY)
+    code = _query_number('code', int, 200, 200, 599)
+    chunks = _query_number('chunks', int, min(numbytes or 1, HTTPBIN_MAX_DRIP_CHUNKS), 1, HTTPBIN_MAX_DRIP_CHUNKS)
+    if None in (numbytes, duration, delay, code, chunks):
+        return _httpbin_response({"error": "numbytes, duration, delay, code and chunks must be numbers"}, 400)
+
+    rate = numbytes / duration if numbytes and duration else None
+    shape_response(request.environ, latency=delay, rate=rate, chunk_size=max(-(-numbytes // chunks), 1))
+    return app.response_class(b'*' * numbytes, status=code, mimetype='application/octet-stream')
+
+#-------------------------------------------------------------------------------
+# Downloads
+#-------------------------------------------------------------------------------
+
+@app.route('/bytes/<int:n>', methods=['GET'])
+def download_bytes(n):
+    """
+    Handle the route for a deterministic download of `n` bytes, of any size.
+
+    The body repeats a cached block of pseudo-random bytes chosen by the `seed` query
+    argument (default 0), so it costs no memory per request and the same URL always
+    returns the same bytes. Range and If-Range are supported, so
+    `http --download --continue` can resume an interrupted download. The bytes do
+    not compress, so they are sent unencoded whatever the request's Accept-Encoding.
+
+    Returns:
+        Response: The bytes (200), the requested range (206), or a 416 for a range
+        beyond the end.
+    """
+    seed = request.args.get('seed', 0, type=int)
+    etag = f"bytes-{n}-{seed}"
+    return _ranged_response(
+        n, etag, None, lambda start, end: iter_pattern(start, end, seed),
+        'application/octet-stream',
+    )
+
+
+@app.route('/files/<name>', methods=['GET'])
+def download_file(name):
+    """
+    Handle the route for downloading a file from the files directory.
+
+    Files are read from FLASK_APP_FILES_DIR (flask_app_files in the temporary directory
+    by default) and sent with sendfile() when the server supports it, or from a memory
+    map otherwise. Range and If-Range (by entity tag or Last-Modified date) are supported.
+
+    Returns:
+        Response: The file (200), the requested range (206), a 416 for a range beyond
+        the end, or a 404 when there is no such file.
+    """
+    path = safe_join(files_directory(), name)
+    if path is None or not os.path.isfile(path):
+        return jsonify({"error": f"File not found: {name}"}), 404
+    stat = os.stat(path)
+    return _ranged_response(
+        stat.st_size, f"{stat.st_mtime_ns:x}-{stat.st_size:x}",
+        datetime.fromtimestamp(int(stat.st_mtime), timezone.utc),
+        lambda start, end: FileBody(path, start, end, request.environ),
+        mimetypes.guess_type(name)[0] or 'application/octet-stream',
+    )
+
+
+def _ranged_response(size, etag, last_modified, body, mimetype):
+    """
+    Build a response that honours the request's Range and If-Range headers.
+
+    Args:
+        size (int): Length of the full representation.
+        etag (str): Its strong entity tag, without quotes.
+        last_modified (datetime | None): Its modification time, if it has one.
+        body (callable): Called with (start, end) to get the body iterable for that range.
+        mimetype (str): Content type of the representation.
+
+    Returns:
+        Response: A 200, 206 or 416 response with Accept-Ranges, ETag and Content-Length.
+    """
+    status, start, end = resolve_range(request.range, request.if_range, size, etag, last_modified)
+    headers = {'Accept-Ranges': 'bytes', 'ETag': quote_etag(etag)}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    if status == 416:
+        headers['Content-Range'] = f"bytes */{size}"
+        return app.response_class(status=416, headers=headers)
+    if status == 206:
+        headers['Content-Range'] = f"bytes {start}-{end - 1}/{size}"
+    headers['Content-Length'] = str(end - start)
+    return app.response_class(body(start, end), status=status, mimetype=mimetype,
+                              headers=headers, direct_passthrough=True)
+
+#-------------------------------------------------------------------------------
+# Metrics
+#-------------------------------------------------------------------------------
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Handle the route for per-endpoint request metrics.
+
+    Returns:
+        Response: Request counts by status, in-flight gauges, byte counters and latency
+        histograms since the last reset, followed by connection counts, requests per
+        connection, connection lifetimes and parked slow responses, in the Prometheus
+        text format.
+    """
+    body = (metrics.render_prometheus() + connection_metrics.render_prometheus()
+            + connection_scheduler.render_prometheus())
+    return app.response_class(body, mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/metrics/reset', methods=['POST'])
+def metrics_reset():
+    """
+    Handle the route that starts a new metrics window, e.g. at the start of a benchmark run.
+
+    Returns:
+        JSON: {"message": "Metrics reset"}, or a 404 when metrics are disabled.
+    """
+    if not metrics.enabled:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    metrics.reset()
+    connection_metrics.reset()
+    return jsonify({"message": "Metrics reset"})
+
+#-------------------------------------------------------------------------------
+# Profiling
+#-------------------------------------------------------------------------------
+
+@app.route('/debug/profile', methods=['GET'])
+def profile_summary():
+    """
+    Handle the route listing the endpoints with collected profiles.
+
+    Returns:
+        JSON: The profiling settings and, per endpoint, the number of profiled requests
+        and their total profiled time; a 404 when profiling is off (FLASK_APP_PROFILE).
+    """
+    if not profiler.enabled:
+        return jsonify({"error": "Profiling is disabled; start the server with FLASK_APP_PROFILE=1"}), 404
+    return jsonify({
+        "sample_rate": profiler.sample_rate,
+        "header": profiler.header,
+        "endpoints": profiler.summary(),
+    })
+
+
+@app.route('/debug/profile/<endpoint>', methods=['GET'])
+def profile_report(endpoint):
+    """
+    Handle the route for one endpoint's merged cProfile stats.
+
+    Query parameters:
+        sort: A pstats sort key, 'cumulative' by default (e.g. tottime, calls, ncalls).
+        limit: Number of functions to list, 40 by default.
+        format: 'text' (default) for a pstats report, or 'pstats' for the binary stats
+            file, e.g. `http --download .../debug/profile/test_csv format==pstats`.
+
+    Returns:
+        Response: The report, a 400 for an unknown sort key, or a 404 when the endpoint
+        has no profiles or profiling is off.
+    """
+    if not profiler.enabled:
+        return jsonify({"error": "Profiling is disabled; start the server with FLASK_APP_PROFILE=1"}), 404
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in SORT_KEYS:
+        return jsonify({"error": f"Unknown sort key: {sort}", "sort_keys": list(SORT_KEYS)}), 400
+
+    if request.args.get('format') == 'pstats':
+        body = profiler.dump(endpoint)
+        mimetype = 'application/octet-stream'
+        headers = {'Content-Disposition': f'attachment; filename="{endpoint}.pstats"'}
+    else:
+        body = profiler.report(endpoint, sort=sort, limit=request.args.get('limit', 40, type=int))
+        mimetype = 'text/plain'
+        headers = {}
+    if body is None:
+        return jsonify({"error": f"No profiles collected for endpoint: {endpoint}"}), 404
+    return app.response_class(body, mimetype=mimetype, headers=headers)
+
+
+@app.route('/debug/profile/reset', methods=['POST'])
+def profile_reset():
+    """
+    Handle the route that discards all collected profiles.
+
+    Returns:
+        JSON: {"message": "Profiles reset"}, or a 404 when profiling is off.
+    """
+    if not profiler.enabled:
+        return jsonify({"error": "Profiling is disabled; start the server with FLASK_APP_PROFILE=1"}), 404
+    profiler.reset()
+    return jsonify({"message": "Profiles reset"})
+
+#-------------------------------------------------------------------------------
+# Credential cache and token registry
+#-------------------------------------------------------------------------------
+
+@app.route('/debug/auth-cache', methods=['GET'])
+def auth_cache_stats():
+    """
+    Handle the route for the verified-credential cache of /test/basic-auth.
+
+    Returns:
+        JSON: Cache hits, misses and expired entries, the number of entries, its
+        capacity and time to live, and the number of users in the store.
+    """
+    return jsonify({**credentials.cache.stats(), "users": len(credentials)})
+
+
+@app.route('/debug/auth-cache/reset', methods=['POST'])
+def auth_cache_reset():
+    """
+    Handle the route that empties the verified-credential cache and its counters, so
+    the next Basic Auth request of every client pays for a password hash.
+
+    Returns:
+        JSON: {"message": "Credential cache reset"}
+    """
+    credentials.cache.clear()
+    return jsonify({"message": "Credential cache reset"})
+
+
+@app.route('/debug/tokens', methods=['GET'])
+def token_stats():
+    """
+    Handle the route for the bearer token registry's counters.
+
+    Returns:
+        JSON: Live and static tokens, expiry seconds held, tokens evicted and the
+        registry's settings.
+    """
+    return jsonify(tokens.stats())
+
 #-------------------------------------------------------------------------------
 # Main Entry Point
 #-------------------------------------------------------------------------------
@@ -324,7 +1135,10 @@ if __name__ == "__main__":
     """
     Main entry point of the Flask application.
 
-    Runs the Flask development server on port 5001, making the app accessible
-    locally at 'http://localhost:5001'.
+    Serves the app on port 5001, making it accessible locally at
+    'http://localhost:5001'. By default a pooled, multi-threaded server is used;
+    see `python flask_app/app.py --help` for worker, thread, backlog and keep-alive
+    options, or pass --dev for the Flask development server.
     """
-    app.run(port=5001)
+    from flask_app.serve import main
+    main(app=app)
@@ -0,0 +1,584 @@
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from flask import request
+from werkzeug.datastructures import Headers
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge, UnsupportedMediaType
+from werkzeug.http import parse_accept_header
+
+from flask_app.serve import SOCKET_ENVIRON_KEY
+
+try:
+    import brotli
+except ImportError:  # Optional dependency; only gzip and deflate are offered without it.
+    brotli = None
+
+# Content codings in order of preference when the client rates them equally.
+ENCODINGS = (("br",) if brotli is not None else ()) + ("gzip", "deflate")
+
+# Content types compressed on the fly; other types are only compressed when the route
+# marks its body as static with mark_static().
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/xml", "application/javascript",
+    "application/x-ndjson", "image/svg+xml",
+)
+COMPRESSIBLE_SUFFIXES = ("+json", "+xml")
+
+# Bodies of at most this many bytes with a known length are compressed in one call and
+# keep a Content-Length; larger or unknown-length bodies are compressed as they stream.
+BUFFER_LIMIT = 1024 * 1024
+
+# Static bodies up to this size are cached compressed, up to CACHE_MAX_BYTES in total.
+CACHE_MAX_BODY = 4 * 1024 * 1024
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Levels for bodies compressed once and cached, and for bodies compressed per request.
+STATIC_LEVELS = {"br": 11, "gzip": 9, "deflate": 9}
+DYNAMIC_LEVELS = {"br": 4, "gzip": 6, "deflate": 6}
+
+# Request body codings that RequestDecompressor inflates; x-gzip is an alias of gzip.
+REQUEST_ENCODINGS = ENCODINGS + ("x-gzip",)
+
+# Default cap on the inflated size of one request body, against decompression bombs.
+MAX_DECOMPRESSED_SIZE = 1024 * 1024 * 1024
+
+# Compressed bytes read from the client per step, and the most output produced from them
+# in one step, so a small highly compressed chunk never inflates all at once.
+INFLATE_READ_SIZE = 64 * 1024
+INFLATE_OUTPUT_SIZE = 256 * 1024
+
+_STATIC_KEY = "flask_app.compression.static"
+_REQUEST_BODY_KEY = "flask_app.compression.request_body"
+
+# Statuses whose body must not be re-encoded: no body, or a byte range of the identity body.
+_SKIP_STATUSES = {204, 206, 304, 416}
+
+
+def mark_static(key):
+    """
+    Mark the current response body as deterministic for `key`, e.g. the body bytes or
+    an entity tag.
+
+    If it is at most CACHE_MAX_BODY bytes, its compressed forms are then cached by
+    (key, encoding) and reused, and it is compressed even when its content type is not
+    in COMPRESSIBLE_TYPES.
+    """
+    request.environ[_STATIC_KEY] = key
+
+
+def negotiate(accept_encoding, encodings=ENCODINGS):
+    """
+    Pick the content coding for an Accept-Encoding header.
+
+    Returns:
+        str | None: The client's highest-rated coding among `encodings` (server order
+        breaking ties), or None for the identity coding.
+    """
+    if not accept_encoding:
+        return None
+    accepted = parse_accept_header(accept_encoding)
+    best, best_quality = None, 0
+    for encoding in encodings:
+        quality = accepted.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class _Encoder:
+    """
+    Incremental encoder for one content coding with a zlib-style compress()/flush().
+    """
+
+    def __init__(self, encoding, level):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+            self.compress = self._compressor.process
+            self._flush = self._compressor.flush
+            self._finish = self._compressor.finish
+        else:
+            wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+            self.compress = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def flush(self):
+        """
+        Emit everything compressed so far, so a streamed chunk reaches the client now.
+        """
+        return self._flush()
+
+    def finish(self):
+        return self._finish()
+
+
+def compress(data, encoding, level):
+    """
+    Compress a complete body with one content coding.
+    """
+    encoder = _Encoder(encoding, level)
+    return encoder.compress(data) + encoder.finish()
+
+
+class CompressionCache:
+    """
+    LRU cache of compressed static bodies, keyed by (key, encoding) and bounded in bytes.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that had to compress.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, encoding, body):
+        """
+        Return the compressed body for (key, encoding), calling `body()` for the identity
+        bytes and compressing them on a miss.
+        """
+        with self._lock:
+            compressed = self._entries.get((key, encoding))
+            if compressed is not None:
+                self._entries.move_to_end((key, encoding))
+                self.hits += 1
+                return compressed
+            self.misses += 1
+        compressed = compress(body(), encoding, STATIC_LEVELS[encoding])
+        with self._lock:
+            if (key, encoding) not in self._entries and len(compressed) <= self.max_bytes:
+                self._entries[(key, encoding)] = compressed
+                self._size += len(compressed)
+                while self._size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+        return compressed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = 0
+
+
+class ResponseCompressor:
+    """
+    Negotiates Accept-Encoding and compresses responses with gzip, deflate or brotli.
+
+    Static bodies (see mark_static()) of up to CACHE_MAX_BODY bytes are compressed once
+    at the best level and served from a CompressionCache; larger ones are treated like
+    any other body. Bodies of a compressible content type are compressed per request:
+    in one call when they are small and of known length, otherwise chunk by chunk as
+    they stream, without a Content-Length. Bodies shorter than `min_size`,
+    byte ranges and already encoded responses are sent unchanged.
+
+    FLASK_APP_COMPRESSION=0 disables the middleware and FLASK_APP_COMPRESSION_MIN_SIZE
+    sets `min_size`.
+
+    Attributes:
+        enabled (bool): Whether the middleware was installed.
+        min_size (int): Smallest body, in bytes, worth compressing.
+        cache (CompressionCache): The compressed static bodies.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.min_size = int(os.environ.get("FLASK_APP_COMPRESSION_MIN_SIZE", "1024"))
+        self.cache = CompressionCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Install the compression middleware on a Flask app.
+        """
+        if os.environ.get("FLASK_APP_COMPRESSION", "1") in ("0", "false", "False"):
+            return
+        self.enabled = True
+        app.wsgi_app = self.middleware(app.wsgi_app)
+
+    def middleware(self, wsgi_app):
+        def compressed(environ, start_response):
+            encoding = negotiate(environ.get("HTTP_ACCEPT_ENCODING"))
+            if encoding is None or environ["REQUEST_METHOD"] == "HEAD":
+                return wsgi_app(environ, start_response)
+
+            captured = {}
+            written = []
+
+            def capture_start_response(status, headers, exc_info=None):
+                if captured.get("passthrough"):
+                    return start_response(status, headers, exc_info)
+                captured.update(status=status, headers=headers, exc_info=exc_info)
+                return written.append
+
+            iterable = wsgi_app(environ, capture_start_response)
+            if "status" not in captured:
+                # The app defers start_response to its first chunk; leave it alone.
+                captured["passthrough"] = True
+                return iterable
+            if written:
+                iterable = _WrittenFirst(written, iterable)
+            return self._respond(environ, start_response, captured, iterable, encoding)
+
+        return compressed
+
+    def _respond(self, environ, start_response, captured, iterable, encoding):
+        status, exc_info = captured["status"], captured["exc_info"]
+        headers = Headers(captured["headers"])
+        static_key = environ.get(_STATIC_KEY)
+        length = headers.get("Content-Length", type=int)
+        if not self._should_compress(status, headers, static_key, length):
+            start_response(status, captured["headers"], exc_info)
+            return iterable
+
+        headers.add("Vary", "Accept-Encoding")
+        if length is not None and length < self.min_size:
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return iterable
+
+        # The body is re-encoded here, so it must come through the iterable rather than
+        # being written to the socket with sendfile().
+        environ.pop(SOCKET_ENVIRON_KEY, None)
+        if static_key is not None and length is not None and length <= CACHE_MAX_BODY:
+            body = self.cache.get(static_key, encoding, lambda: _read_all(iterable))
+            _close(iterable)
+            _set_encoding(headers, encoding)
+            headers["Content-Length"] = str(len(body))
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return [body]
+        if length is not None and length <= BUFFER_LIMIT:
+            body = compress(_read_all(iterable), encoding, DYNAMIC_LEVELS[encoding])
+            _close(iterable)
+            _set_encoding(headers, encoding)
+            headers["Content-Length"] = str(len(body))
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return [body]
+        return self._stream(start_response, status, headers, exc_info, iterable, encoding, length)
+
+    def _should_compress(self, status, headers, static_key, length):
+        code = int(status[:3])
+        if code < 200 or code in _SKIP_STATUSES or length == 0:
+            return False
+        if "Content-Encoding" in headers or "Content-Range" in headers:
+            return False
+        if "no-transform" in headers.get("Cache-Control", ""):
+            return False
+        if static_key is not None and length is not None and length <= CACHE_MAX_BODY:
+            return True
+        mimetype = headers.get("Content-Type", "").split(";")[0].strip().lower()
+        return mimetype.startswith(COMPRESSIBLE_TYPES) or mimetype.endswith(COMPRESSIBLE_SUFFIXES)
+
+    def _stream(self, start_response, status, headers, exc_info, iterable, encoding, length):
+        """
+        Compress a large or unknown-length body chunk by chunk.
+
+        An unknown-length body is held back until it reaches `min_size`; one that ends
+        sooner is sent as it is, with a Content-Length.
+        """
+        iterator = iter(iterable)
+        try:
+            buffered = []
+            if length is None:
+                size = 0
+                for chunk in iterator:
+                    buffered.append(chunk)
+                    size += len(chunk)
+                    if size >= self.min_size:
+                        break
+                else:
+                    headers["Content-Length"] = str(size)
+                    start_response(status, headers.to_wsgi_list(), exc_info)
+                    yield b"".join(buffered)
+                    return
+
+            _set_encoding(headers, encoding)
+            headers.pop("Content-Length", None)
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            encoder = _Encoder(encoding, DYNAMIC_LEVELS[encoding])
+            for chunk in _chain(buffered, iterator):
+                if chunk:
+                    yield encoder.compress(chunk) + encoder.flush()
+            yield encoder.finish()
+        finally:
+            _close(iterable)
+
+
+def _set_encoding(headers, encoding):
+    headers["Content-Encoding"] = encoding
+    etag = headers.get("ETag")
+    if etag and etag.endswith('"'):
+        # The encoded body is a different representation, so it needs its own tag.
+        headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+
+
+def _chain(buffered, iterator):
+    yield from buffered
+    yield from iterator
+
+
+def _read_all(iterable):
+    return b"".join(iterable)
+
+
+def _close(iterable):
+    if hasattr(iterable, "close"):
+        iterable.close()
+
+
+class _WrittenFirst:
+    """
+    A response body made of the data the app passed to the write() callable, then its
+    iterable.
+    """
+
+    def __init__(self, written, iterable):
+        self._written = written
+        self._iterable = iterable
+
+    def __iter__(self):
+        yield from self._written
+        yield from self._iterable
+
+    def close(self):
+        _close(self._iterable)
+
+
+#-------------------------------------------------------------------------------
+# Request bodies
+#-------------------------------------------------------------------------------
+
+class _Decoder:
+    """
+    Incremental decoder for one content coding, producing at most `max_length` bytes
+    per call and keeping the input it has not consumed yet.
+    """
+
+    def __init__(self, encoding):
+        self.encoding = "gzip" if encoding == "x-gzip" else encoding
+        self.tail = b""
+        self._zlib = None
+        self._brotli = brotli.Decompressor() if self.encoding == "br" else None
+
+    def decompress(self, data, max_length):
+        if self._brotli is not None:
+            # Fed in INFLATE_READ_SIZE pieces, so the output of one call stays bounded
+            # by brotli's maximum ratio for that much input.
+            return self._brotli.process(data)
+        if self._zlib is None:
+            self._zlib = zlib.decompressobj(self._wbits(data))
+        output = self._zlib.decompress(data, max_length)
+        self.tail = self._zlib.unconsumed_tail
+        return output
+
+    def finish(self):
+        if self._brotli is not None:
+            if not self._brotli.is_finished():
+                raise BadRequest("The br request body is truncated")
+            return b""
+        if self._zlib is None:
+            return b""
+        if not self._zlib.eof:
+            raise BadRequest(f"The {self.encoding} request body is truncated")
+        return self._zlib.flush()
+
+    def _wbits(self, data):
+        if self.encoding == "gzip":
+            return 16 + zlib.MAX_WBITS
+        # 'deflate' means a zlib stream, but some clients send raw deflate data; a zlib
+        # stream starts with a header whose first two bytes are a multiple of 31.
+        if len(data) >= 2 and data[0] & 0x0F == 8 and (data[0] << 8 | data[1]) % 31 == 0:
+            return zlib.MAX_WBITS
+        return -zlib.MAX_WBITS
+
+
+class DecompressingInput:
+    """
+    A wsgi.input replacement that inflates a compressed request body as it is read.
+
+    Compressed data is pulled from the client only when the app asks for more, so the
+    whole body is never held in memory, and reading fails with a 413 once the inflated
+    size passes `max_size`.
+
+    Attributes:
+        encoding (str): The body's content coding.
+        compressed (int): Compressed bytes read from the client so far.
+        decompressed (int): Inflated bytes produced so far.
+        seconds (float): Time spent inflating.
+    """
+
+    def __init__(self, stream, encoding, length=None, max_size=MAX_DECOMPRESSED_SIZE):
+        self._stream = stream
+        self._remaining = length
+        self._decoder = _Decoder(encoding)
+        self._pending = bytearray()
+        self._eof = False
+        self.max_size = max_size
+        self.encoding = self._decoder.encoding
+        self.compressed = 0
+        self.decompressed = 0
+        self.seconds = 0.0
+
+    def _fill(self):
+        """
+        Inflate the next piece of the body into the pending buffer.
+        """
+        data = self._decoder.tail
+        if not data:
+            size = INFLATE_READ_SIZE if self._remaining is None else min(INFLATE_READ_SIZE, self._remaining)
+            data = self._stream.read(size) if size else b""
+            self.compressed += len(data)
+            if self._remaining is not None:
+                self._remaining -= len(data)
+        start = time.perf_counter()
+        try:
+            output = self._decoder.decompress(data, INFLATE_OUTPUT_SIZE) if data else self._decoder.finish()
+        except (zlib.error, getattr(brotli, "error", zlib.error)) as e:
+            raise BadRequest(f"The {self.encoding} request body could not be decoded: {e}")
+        finally:
+            self.seconds += time.perf_counter() - start
+        if not data:
+            self._eof = True
+        self.decompressed += len(output)
+        if self.decompressed > self.max_size:
+            raise RequestEntityTooLarge(
+                f"The request body inflates to more than {self.max_size} bytes"
+            )
+        self._pending += output
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            while not self._eof:
+                self._fill()
+            size = len(self._pending)
+        while len(self._pending) < size and not self._eof:
+            self._fill()
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def readline(self, size=-1):
+        while not self._eof and b"\n" not in self._pending and (size < 0 or len(self._pending) < size):
+            self._fill()
+        end = self._pending.find(b"\n") + 1 or len(self._pending)
+        return self.read(end if size < 0 else min(end, size))
+
+    def readlines(self, hint=-1):
+        return list(self)
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+    def stats(self):
+        """
+        Returns:
+            dict: The coding, compressed and inflated byte counts, the compression ratio
+            and the seconds spent inflating.
+        """
+        return {
+            "encoding": self.encoding,
+            "compressed_bytes": self.compressed,
+            "decompressed_bytes": self.decompressed,
+            "ratio": round(self.decompressed / self.compressed, 3) if self.compressed else None,
+            "inflate_seconds": round(self.seconds, 6),
+        }
+
+
+def request_body_stats(environ):
+    """
+    Return DecompressingInput.stats() for a request whose body was compressed, else None.
+    """
+    body = environ.get(_REQUEST_BODY_KEY)
+    return None if body is None else body.stats()
+
+
+class RequestDecompressor:
+    """
+    Inflates request bodies sent with Content-Encoding (e.g. `http --compress`, which
+    sends deflate) before the app reads them.
+
+    The body is inflated incrementally as the app reads it, so every route, streaming or
+    not, sees the plain body. Inflating stops with a 413 past `max_size` bytes, and an
+    unknown coding gets a 415. Responses carry X-Request-Compressed-Bytes,
+    X-Request-Decompressed-Bytes and X-Request-Inflate-Seconds, counted up to the moment
+    the response starts.
+
+    FLASK_APP_REQUEST_DECOMPRESSION=0 disables the middleware and
+    FLASK_APP_MAX_DECOMPRESSED_SIZE sets `max_size`.
+
+    Attributes:
+        enabled (bool): Whether the middleware was installed.
+        max_size (int): Largest inflated request body accepted, in bytes.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.max_size = int(os.environ.get("FLASK_APP_MAX_DECOMPRESSED_SIZE", MAX_DECOMPRESSED_SIZE))
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Install the request decompression middleware on a Flask app.
+        """
+        if os.environ.get("FLASK_APP_REQUEST_DECOMPRESSION", "1") in ("0", "false", "False"):
+            return
+        self.enabled = True
+        app.wsgi_app = self.middleware(app.wsgi_app)
+
+    def middleware(self, wsgi_app):
+        def decompressing(environ, start_response):
+            encoding = environ.get("HTTP_CONTENT_ENCODING", "").strip().lower()
+            if encoding in ("", "identity"):
+                return wsgi_app(environ, start_response)
+            if encoding not in REQUEST_ENCODINGS:
+                error = UnsupportedMediaType(
+                    f"Unsupported request Content-Encoding: {encoding}; expected one of {', '.join(REQUEST_ENCODINGS)}"
+                )
+                return error(environ, start_response)
+
+            length = environ.get("CONTENT_LENGTH")
+            if length:
+                try:
+                    length = int(length)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    return BadRequest("Invalid Content-Length")(environ, start_response)
+            elif not environ.get("wsgi.input_terminated"):
+                length = 0
+            else:
+                length = None
+            body = DecompressingInput(environ["wsgi.input"], encoding, length, self.max_size)
+            environ["wsgi.input"] = body
+            # The inflated length is unknown, so the body now ends where the stream ends.
+            environ["wsgi.input_terminated"] = True
+            environ.pop("CONTENT_LENGTH", None)
+            del environ["HTTP_CONTENT_ENCODING"]
+            environ[_REQUEST_BODY_KEY] = body
+
+            def reporting_start_response(status, headers, exc_info=None):
+                headers = list(headers) + [
+                    ("X-Request-Compressed-Bytes", str(body.compressed)),
+                    ("X-Request-Decompressed-Bytes", str(body.decompressed)),
+                    ("X-Request-Inflate-Seconds", f"{body.seconds:.6f}"),
+                ]
+                return start_response(status, headers, exc_info)
+
+            return wsgi_app(environ, reporting_start_response)
+
+        return decompressing
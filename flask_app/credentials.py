@@ -0,0 +1,242 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import Counter, OrderedDict
+
+# PBKDF2-HMAC-SHA256 iterations for new hashes (OWASP's recommendation). Every record
+# carries its own parameters, so files hashed with other settings still verify.
+PBKDF2_ITERATIONS = int(os.environ.get("FLASK_APP_PASSWORD_ITERATIONS", "600000"))
+
+# scrypt cost parameters for new hashes: about 16 MiB of memory per hash.
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+SALT_BYTES = 16
+
+ALGORITHMS = ("pbkdf2_sha256", "scrypt")
+
+# Verified credentials kept by default, and for how many seconds.
+CACHE_MAX_ENTRIES = int(os.environ.get("FLASK_APP_AUTH_CACHE_SIZE", "4096"))
+CACHE_TTL = float(os.environ.get("FLASK_APP_AUTH_CACHE_TTL", "300"))
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def hash_password(password, algorithm="pbkdf2_sha256", iterations=None, salt=None):
+    """
+    Hash a password with a random salt.
+
+    Returns:
+        str: A record such as 'pbkdf2_sha256$<iterations>$<salt>$<hash>' or
+        'scrypt$<n>$<r>$<p>$<salt>$<hash>', with base64 salt and hash.
+    """
+    salt = salt if salt is not None else secrets.token_bytes(SALT_BYTES)
+    password = password.encode("utf-8")
+    if algorithm == "pbkdf2_sha256":
+        iterations = iterations or PBKDF2_ITERATIONS
+        derived = hashlib.pbkdf2_hmac("sha256", password, salt, iterations)
+        return f"pbkdf2_sha256${iterations}${_b64encode(salt)}${_b64encode(derived)}"
+    if algorithm == "scrypt":
+        derived = hashlib.scrypt(password, salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, dklen=32)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(derived)}"
+    raise ValueError(f"Unsupported password hash: {algorithm}")
+
+
+def verify_password(password, record):
+    """
+    Check a password against a record from hash_password(), in constant time.
+
+    Returns:
+        bool: Whether the password matches. Malformed records never match.
+    """
+    algorithm, _, params = record.partition("$")
+    try:
+        if algorithm == "pbkdf2_sha256":
+            iterations, salt, expected = params.split("$")
+            derived = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), base64.b64decode(salt),
+                                          int(iterations))
+        elif algorithm == "scrypt":
+            n, r, p, salt, expected = params.split("$")
+            derived = hashlib.scrypt(password.encode("utf-8"), salt=base64.b64decode(salt),
+                                     n=int(n), r=int(r), p=int(p), dklen=32)
+        else:
+            return False
+        return hmac.compare_digest(derived, base64.b64decode(expected))
+    except ValueError:
+        return False
+
+
+def _unmatchable_record(records):
+    """
+    Build a record that no password matches and that takes as long to check as the
+    records in `records`: it has the parameters most of them share (the default PBKDF2
+    settings when there are none) with a random salt and a random hash. Building it
+    hashes nothing.
+    """
+    parameters = Counter(record.rsplit("$", 2)[0] for record in records)
+    prefix = parameters.most_common(1)[0][0] if parameters else f"pbkdf2_sha256${PBKDF2_ITERATIONS}"
+    return f"{prefix}${_b64encode(secrets.token_bytes(SALT_BYTES))}${_b64encode(secrets.token_bytes(32))}"
+
+
+class VerifiedCredentialCache:
+    """
+    LRU cache of recently verified credentials with a time to live, so a client that
+    repeats the same Basic Auth credentials skips the password hash.
+
+    Entries are keyed by an HMAC of the username and password under a key generated
+    for each process, so no password, or a hash of one that could be attacked offline,
+    is held. An entry records the hash it was verified against and stops matching
+    once the user's hash changes. Failed attempts are never cached.
+
+    Attributes:
+        max_entries (int): Capacity; 0 disables the cache.
+        ttl (float): Seconds an entry stays valid.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that had to hash, including expired entries.
+        expired (int): Entries dropped because their time to live ran out.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._key = secrets.token_bytes(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry_key(self, username, password):
+        message = username.encode("utf-8") + b"\0" + password.encode("utf-8")
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def get(self, username, password, record):
+        """
+        Returns:
+            bool: True when these credentials were verified against `record` within the TTL.
+        """
+        if not self.max_entries:
+            return False
+        key = self._entry_key(username, password)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                cached_record, expires = entry
+                if expires <= now:
+                    del self._entries[key]
+                    self.expired += 1
+                elif hmac.compare_digest(cached_record, record):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True
+            self.misses += 1
+        return False
+
+    def add(self, username, password, record):
+        """
+        Remember credentials that were just verified against `record`.
+        """
+        if not self.max_entries:
+            return
+        key = self._entry_key(username, password)
+        with self._lock:
+            self._entries[key] = (record, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit, miss and expiry counters, the number of entries and the settings.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.expired = 0
+
+
+class CredentialStore:
+    """
+    Usernames and salted password hashes, checked through a VerifiedCredentialCache.
+
+    Unknown usernames are checked against a dummy record with the same algorithm and
+    cost as the stored users' hashes, so a failed login takes as long whether or not
+    the user exists.
+
+    Attributes:
+        cache (VerifiedCredentialCache): Recently verified credentials.
+    """
+
+    def __init__(self, users=None, cache=None):
+        self._records = dict(users or {})
+        self._dummy_record = _unmatchable_record(self._records.values())
+        self.cache = cache if cache is not None else VerifiedCredentialCache()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, username):
+        return username in self._records
+
+    def add_user(self, username, password, algorithm="pbkdf2_sha256", iterations=None):
+        """
+        Add a user, or change a user's password, hashing it with `algorithm`.
+        """
+        self._records[username] = hash_password(password, algorithm, iterations)
+        # Rebuilt on the next unknown user, so adding many users stays linear.
+        self._dummy_record = None
+
+    def load(self, path):
+        """
+        Add the users of a JSON file written by save().
+        """
+        with open(path) as f:
+            self._records.update(json.load(f)["users"])
+        self._dummy_record = _unmatchable_record(self._records.values())
+
+    def save(self, path):
+        """
+        Write the users and their hashes to a JSON file.
+        """
+        with open(path, "w") as f:
+            json.dump({"users": self._records}, f)
+
+    def verify(self, username, password):
+        """
+        Check a username and password, hashing only when the cache cannot answer.
+
+        Returns:
+            bool: Whether the credentials are valid.
+        """
+        record = self._records.get(username)
+        if record is None:
+            if self._dummy_record is None:
+                self._dummy_record = _unmatchable_record(self._records.values())
+            verify_password(password, self._dummy_record)
+            return False
+        if self.cache.get(username, password, record):
+            return True
+        if not verify_password(password, record):
+            return False
+        self.cache.add(username, password, record)
+        return True
@@ -0,0 +1,132 @@
+import functools
+import mmap
+import os
+import random
+import tempfile
+
+from flask_app.serve import OUTPUT_ENVIRON_KEY, SOCKET_ENVIRON_KEY
+
+# /bytes/<n> serves repetitions of one block of this size, which is also the chunk size.
+PATTERN_BLOCK_SIZE = 1024 * 1024
+
+# Size of each slice sent from a memory-mapped file when sendfile() is unavailable.
+FILE_CHUNK_SIZE = 1024 * 1024
+
+
+@functools.lru_cache(maxsize=8)
+def pattern_block(seed=0):
+    """
+    Return the block of seeded pseudo-random bytes that /bytes/<n> repeats.
+    """
+    return random.Random(seed).randbytes(PATTERN_BLOCK_SIZE)
+
+
+def iter_pattern(start, end, seed=0):
+    """
+    Yield bytes [start, end) of the endless repetition of pattern_block(seed).
+
+    Chunks are aligned to the block, so every whole chunk is the cached block itself
+    and only the first and last chunk of a range are copied.
+    """
+    block = pattern_block(seed)
+    position = start
+    while position < end:
+        offset = position % PATTERN_BLOCK_SIZE
+        stop = min(offset + end - position, PATTERN_BLOCK_SIZE)
+        yield block if offset == 0 and stop == PATTERN_BLOCK_SIZE else block[offset:stop]
+        position += stop - offset
+
+
+def write_pattern_file(path, size, seed=0):
+    """
+    Write the first `size` bytes of the /bytes/<n> pattern to `path`, replacing it atomically.
+    """
+    temp_path = f"{path}.partial"
+    with open(temp_path, "wb") as f:
+        for chunk in iter_pattern(0, size, seed):
+            f.write(chunk)
+    os.replace(temp_path, path)
+    return path
+
+
+def files_directory():
+    """
+    Return the directory /files/<name> serves: FLASK_APP_FILES_DIR, or flask_app_files
+    in the temporary directory.
+    """
+    directory = os.environ.get("FLASK_APP_FILES_DIR") or os.path.join(tempfile.gettempdir(), "flask_app_files")
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def resolve_range(byte_range, if_range, size, etag, last_modified=None):
+    """
+    Decide which part of a `size`-byte representation to send.
+
+    A single byte range is honoured unless the request's If-Range validator (an entity
+    tag, or a date compared with `last_modified`) no longer matches the representation.
+    A request for several ranges gets the whole representation, as RFC 9110 allows.
+
+    Args:
+        byte_range (werkzeug.datastructures.Range | None): The parsed Range header.
+        if_range (werkzeug.datastructures.IfRange): The parsed If-Range header.
+        size (int): Length of the full representation.
+        etag (str): Strong entity tag of the representation, without quotes.
+        last_modified (datetime | None): Modification time, if the representation has one.
+
+    Returns:
+        tuple: (status, start, end), with status 200, 206 or 416 and end exclusive.
+    """
+    if byte_range is None or byte_range.units != "bytes":
+        return 200, 0, size
+    if if_range.etag is not None and if_range.etag != etag:
+        return 200, 0, size
+    if if_range.date is not None and (last_modified is None or if_range.date != last_modified):
+        return 200, 0, size
+    if len(byte_range.ranges) != 1:
+        return 200, 0, size
+    bounds = byte_range.range_for_length(size)
+    if bounds is None:
+        return 416, 0, 0
+    return 206, bounds[0], bounds[1]
+
+
+class FileBody:
+    """
+    WSGI response body for bytes [start, end) of a file.
+
+    When the server has put the client socket in the environ (flask_app.serve does), an
+    empty chunk makes it send the status line and headers, and the range then goes from
+    the page cache to the socket with sendfile() without passing through Python, and is
+    counted on the handler's output stream (OUTPUT_ENVIRON_KEY).
+    Otherwise the file is memory-mapped and sent in FILE_CHUNK_SIZE slices. Middleware
+    that rewrites the body must remove SOCKET_ENVIRON_KEY from the environ before
+    iterating it, so that it receives the data as chunks.
+    """
+
+    def __init__(self, path, start, end, environ):
+        self._file = open(path, "rb")
+        self._start = start
+        self._end = end
+        self._environ = environ
+
+    def __iter__(self):
+        try:
+            if self._start >= self._end:
+                return
+            sock = self._environ.get(SOCKET_ENVIRON_KEY)
+            if sock is not None:
+                yield b""
+                sent = sock.sendfile(self._file, self._start, self._end - self._start)
+                output = self._environ.get(OUTPUT_ENVIRON_KEY)
+                if output is not None:
+                    output.count_sent(sent)
+                return
+            with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for position in range(self._start, self._end, FILE_CHUNK_SIZE):
+                    yield mapped[position:min(position + FILE_CHUNK_SIZE, self._end)]
+        finally:
+            self.close()
+
+    def close(self):
+        self._file.close()
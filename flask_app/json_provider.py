@@ -0,0 +1,107 @@
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional dependency; fall back to the stdlib encoder.
+    orjson = None
+
+BACKENDS = ("auto", "orjson", "stdlib")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    A Flask JSON provider that encodes and decodes with orjson when it is installed.
+
+    Output matches the stdlib provider (sorted keys, compact or 2-space indented
+    responses, Flask's handling of dates and Markup), except that non-ASCII text is
+    written as UTF-8 rather than \\u escapes. Anything orjson cannot handle, such as
+    integers wider than 64 bits, falls back to the stdlib encoder.
+
+    Attributes:
+        backend (str): 'auto' (orjson if importable), 'orjson' or 'stdlib'. Defaults to
+            the FLASK_APP_JSON_BACKEND environment variable.
+        compact (bool | None): As in DefaultJSONProvider; defaults to the
+            FLASK_APP_JSON_COMPACT environment variable ('1' or '0') when it is set.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.backend = os.environ.get("FLASK_APP_JSON_BACKEND", "auto")
+        compact = os.environ.get("FLASK_APP_JSON_COMPACT")
+        if compact is not None:
+            self.compact = compact not in ("0", "false", "False", "")
+
+    @property
+    def backend(self):
+        return self._backend
+
+    @backend.setter
+    def backend(self, value):
+        if value not in BACKENDS:
+            raise ValueError(f"Unknown JSON backend {value!r}; expected one of {BACKENDS}")
+        if value == "orjson" and orjson is None:
+            raise ValueError("The orjson JSON backend was requested but orjson is not installed")
+        self._backend = value
+
+    @property
+    def uses_orjson(self):
+        return orjson is not None and self._backend != "stdlib"
+
+    def _orjson_options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def _orjson_dumps(self, obj, indent=False):
+        """
+        Encode with orjson, returning None when the stdlib encoder has to be used.
+        """
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+        except TypeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        """
+        Serialize data as JSON to a string.
+
+        orjson is only used for the compact and 2-space indented layouts it can produce;
+        any other keyword arguments go to json.dumps as in DefaultJSONProvider.
+        """
+        if self.uses_orjson:
+            layout = {key: kwargs.pop(key) for key in ("indent", "separators") if key in kwargs}
+            if not kwargs and layout in ({"separators": (",", ":")}, {"indent": 2}):
+                encoded = self._orjson_dumps(obj, indent="indent" in layout)
+                if encoded is not None:
+                    return encoded.decode()
+            kwargs.update(layout)
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        """
+        Deserialize JSON, retrying with json.loads for input orjson rejects (e.g. NaN).
+        """
+        if self.uses_orjson and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        """
+        Serialize the arguments as a JSON response, encoding straight to bytes.
+        """
+        if not self.uses_orjson:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        encoded = self._orjson_dumps(obj, indent=indent)
+        if encoded is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(encoded + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,445 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import request
+
+# Upper bounds (seconds) of the request latency histogram buckets; +Inf is implicit.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the requests-per-connection histogram buckets; +Inf is implicit.
+CONNECTION_REQUEST_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Upper bounds (seconds) of the connection lifetime histogram buckets; +Inf is implicit.
+CONNECTION_DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Label used for requests that did not match a route (404, 405).
+UNMATCHED_ENDPOINT = "<unmatched>"
+
+_ENDPOINT_KEY = "flask_app.metrics.endpoint"
+
+
+class _EndpointStats:
+    """
+    Counters for one endpoint, owned and written by a single thread.
+    """
+
+    __slots__ = ("requests", "statuses", "request_bytes", "response_bytes", "latency_sum",
+                 "buckets", "in_flight")
+
+    def __init__(self):
+        self.in_flight = 0
+        self.reset()
+
+    def reset(self):
+        # in_flight is a gauge and survives resets.
+        self.requests = 0
+        self.statuses = {}
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency_sum = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+
+class _Shard:
+    """
+    One thread's counters, keyed by endpoint.
+    """
+
+    __slots__ = ("endpoints", "generation")
+
+    def __init__(self, generation):
+        self.endpoints = {}
+        self.generation = generation
+
+
+class _CountingInput:
+    """
+    Wraps wsgi.input to count the request body bytes the app actually reads.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.count = 0
+
+    def read(self, *args):
+        data = self._stream.read(*args)
+        self.count += len(data)
+        return data
+
+    def readinto(self, buffer):
+        size = self._stream.readinto(buffer)
+        self.count += size or 0
+        return size
+
+    def readline(self, *args):
+        data = self._stream.readline(*args)
+        self.count += len(data)
+        return data
+
+    def readlines(self, *args):
+        lines = self._stream.readlines(*args)
+        self.count += sum(len(line) for line in lines)
+        return lines
+
+    def __iter__(self):
+        return iter(self.readline, b'')
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _InstrumentedResponse:
+    """
+    Wraps a WSGI response iterable and records the request once the body has been sent.
+
+    The request is recorded when iteration ends (or the generator is discarded) rather
+    than only in close(), since Werkzeug's server can skip close() when draining the
+    socket fails. Bytes are only counted per chunk when there is no Content-Length.
+    """
+
+    def __init__(self, metrics, iterable, environ, state, counting_input, start):
+        self._metrics = metrics
+        self._iterable = iterable
+        self._environ = environ
+        self._state = state
+        self._input = counting_input
+        self._start = start
+        self._streamed = 0
+        self._recorded = False
+
+    def __iter__(self):
+        count_chunks = self._state["length"] is None
+        try:
+            for chunk in self._iterable:
+                if count_chunks:
+                    self._streamed += len(chunk)
+                yield chunk
+        finally:
+            self._record()
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, "close"):
+                self._iterable.close()
+        finally:
+            self._record()
+
+    def _record(self):
+        if self._recorded:
+            return
+        self._recorded = True
+        length = self._state["length"]
+        self._metrics._finish(
+            self._environ, self._state["status"], self._input.count,
+            self._streamed if length is None else length, time.perf_counter() - self._start,
+        )
+
+
+class RouteMetrics:
+    """
+    Per-endpoint request counts, in-flight gauges, byte counters and latency histograms.
+
+    Each thread records into its own shard, so the request path takes no lock and only
+    allocates when a thread first sees an endpoint or status code. Shards are summed
+    when the metrics are rendered, and a reset bumps a generation number that makes
+    each thread clear its own shard the next time it records.
+
+    Attributes:
+        enabled (bool): Whether the middleware was installed; FLASK_APP_METRICS=0 disables it.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self._generation = 0
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard(0)
+        self._shards_lock = threading.Lock()
+        self._started = time.time()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Install the WSGI middleware and the endpoint hook on a Flask app.
+        """
+        if os.environ.get("FLASK_APP_METRICS", "1") in ("0", "false", "False"):
+            return
+        self.enabled = True
+        app.before_request(self._before_request)
+        app.wsgi_app = self.middleware(app.wsgi_app)
+
+    def middleware(self, wsgi_app):
+        def instrumented(environ, start_response):
+            start = time.perf_counter()
+            counting_input = _CountingInput(environ["wsgi.input"])
+            environ["wsgi.input"] = counting_input
+            state = {"status": 0, "length": None}
+
+            def instrumented_start_response(status, headers, exc_info=None):
+                state["status"] = int(status[:3])
+                for name, value in headers:
+                    if name.lower() == "content-length":
+                        state["length"] = int(value)
+                        break
+                return start_response(status, headers, exc_info)
+
+            try:
+                iterable = wsgi_app(environ, instrumented_start_response)
+            except BaseException:
+                self._finish(environ, 500, counting_input.count, 0, time.perf_counter() - start)
+                raise
+            return _InstrumentedResponse(self, iterable, environ, state, counting_input, start)
+
+        return instrumented
+
+    def _before_request(self):
+        endpoint = request.endpoint or UNMATCHED_ENDPOINT
+        request.environ[_ENDPOINT_KEY] = endpoint
+        self._stats(endpoint).in_flight += 1
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard(self._generation)
+            with self._shards_lock:
+                self._shards.append((threading.current_thread(), shard))
+        elif shard.generation != self._generation:
+            for stats in shard.endpoints.values():
+                stats.reset()
+            shard.generation = self._generation
+        return shard
+
+    def _stats(self, endpoint):
+        endpoints = self._shard().endpoints
+        stats = endpoints.get(endpoint)
+        if stats is None:
+            stats = endpoints[endpoint] = _EndpointStats()
+        return stats
+
+    def _finish(self, environ, status, request_bytes, response_bytes, elapsed):
+        endpoint = environ.get(_ENDPOINT_KEY)
+        stats = self._stats(endpoint or UNMATCHED_ENDPOINT)
+        if endpoint is not None:
+            stats.in_flight -= 1
+        stats.requests += 1
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.request_bytes += request_bytes
+        stats.response_bytes += response_bytes
+        stats.latency_sum += elapsed
+        stats.buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+
+    def reset(self):
+        """
+        Start a new measurement window; in-flight gauges are kept.
+        """
+        with self._shards_lock:
+            self._generation += 1
+            self._retired = _Shard(self._generation)
+            self._started = time.time()
+
+    def snapshot(self):
+        """
+        Sum every thread's shard for the current window.
+
+        Returns:
+            dict: Endpoint -> dict of totals, status counts and per-bucket (non-cumulative) counts.
+        """
+        with self._shards_lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    # Fold finished threads (one per connection on threaded servers) into one shard.
+                    self._merge(self._retired.endpoints, shard)
+            self._shards = alive
+            shards = [self._retired] + [shard for _, shard in alive]
+
+        totals = {}
+        for shard in shards:
+            self._merge(totals, shard)
+        return {
+            endpoint: {
+                "requests": stats.requests,
+                "in_flight": stats.in_flight,
+                "statuses": dict(stats.statuses),
+                "request_bytes": stats.request_bytes,
+                "response_bytes": stats.response_bytes,
+                "latency_sum": stats.latency_sum,
+                "buckets": list(stats.buckets),
+            }
+            for endpoint, stats in sorted(totals.items())
+        }
+
+    def _merge(self, totals, shard):
+        """
+        Add a shard into `totals`; shards from before the last reset only add their gauges.
+        """
+        current = shard.generation == self._generation
+        # Live shards are written without a lock: a worker may add an endpoint or a
+        # status while they are read, so iterate over copies.
+        for endpoint, stats in list(shard.endpoints.items()):
+            total = totals.get(endpoint)
+            if total is None:
+                total = totals[endpoint] = _EndpointStats()
+            total.in_flight += stats.in_flight
+            if not current:
+                continue
+            total.requests += stats.requests
+            for status, count in list(stats.statuses.items()):
+                total.statuses[status] = total.statuses.get(status, 0) + count
+            total.request_bytes += stats.request_bytes
+            total.response_bytes += stats.response_bytes
+            total.latency_sum += stats.latency_sum
+            for index, count in enumerate(stats.buckets):
+                total.buckets[index] += count
+
+    def render_prometheus(self):
+        """
+        Render the current window in the Prometheus text exposition format (version 0.0.4).
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        family("flask_app_requests_total", "counter", "Requests completed, by endpoint and status code.")
+        for endpoint, stats in snapshot.items():
+            for status, count in sorted(stats["statuses"].items()):
+                lines.append(f'flask_app_requests_total{{endpoint="{_escape(endpoint)}",status="{status}"}} {count}')
+        family("flask_app_requests_in_flight", "gauge", "Requests currently being handled, by endpoint.")
+        for endpoint, stats in snapshot.items():
+            lines.append(f'flask_app_requests_in_flight{{endpoint="{_escape(endpoint)}"}} {stats["in_flight"]}')
+        family("flask_app_request_bytes_total", "counter", "Request body bytes read, by endpoint.")
+        for endpoint, stats in snapshot.items():
+            lines.append(f'flask_app_request_bytes_total{{endpoint="{_escape(endpoint)}"}} {stats["request_bytes"]}')
+        family("flask_app_response_bytes_total", "counter", "Response body bytes sent, by endpoint.")
+        for endpoint, stats in snapshot.items():
+            lines.append(f'flask_app_response_bytes_total{{endpoint="{_escape(endpoint)}"}} {stats["response_bytes"]}')
+        family("flask_app_request_duration_seconds", "histogram",
+               "Time from receiving a request to closing its response, by endpoint.")
+        for endpoint, stats in snapshot.items():
+            label = f'endpoint="{_escape(endpoint)}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), stats["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'flask_app_request_duration_seconds_bucket{{{label},le="{le}"}} {cumulative}')
+            lines.append(f'flask_app_request_duration_seconds_sum{{{label}}} {stats["latency_sum"]!r}')
+            lines.append(f'flask_app_request_duration_seconds_count{{{label}}} {stats["requests"]}')
+        family("flask_app_metrics_window_start_seconds", "gauge", "Unix time of the last metrics reset.")
+        lines.append(f"flask_app_metrics_window_start_seconds {self._started!r}")
+        return "\n".join(lines) + "\n"
+
+
+class ConnectionMetrics:
+    """
+    Connections accepted and open, requests served per connection and connection lifetimes.
+
+    The request handler in flask_app.serve records a connection when it is accepted and
+    again when it closes. That is twice per connection rather than per request, so a
+    single lock is enough. A reset starts a new window but keeps the open-connection
+    gauge; connections that were open across it are counted when they close.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Start a new measurement window; the open-connection gauge is kept.
+        """
+        with self._lock:
+            self.accepted = 0
+            self.closed_connections = 0
+            self.requests = 0
+            self.seconds = 0.0
+            self.request_buckets = [0] * (len(CONNECTION_REQUEST_BUCKETS) + 1)
+            self.duration_buckets = [0] * (len(CONNECTION_DURATION_BUCKETS) + 1)
+
+    def opened(self):
+        """
+        Record an accepted connection.
+
+        Returns:
+            float: The start time to pass to closed().
+        """
+        with self._lock:
+            self.accepted += 1
+            self.open += 1
+        return time.perf_counter()
+
+    def closed(self, requests, started):
+        """
+        Record a closed connection that served `requests` requests since `started`.
+        """
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.open -= 1
+            self.closed_connections += 1
+            self.requests += requests
+            self.seconds += elapsed
+            self.request_buckets[bisect_left(CONNECTION_REQUEST_BUCKETS, requests)] += 1
+            self.duration_buckets[bisect_left(CONNECTION_DURATION_BUCKETS, elapsed)] += 1
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: Totals for the current window, with per-bucket (non-cumulative) counts.
+        """
+        with self._lock:
+            return {
+                "accepted": self.accepted,
+                "open": self.open,
+                "closed": self.closed_connections,
+                "requests": self.requests,
+                "seconds": self.seconds,
+                "request_buckets": list(self.request_buckets),
+                "duration_buckets": list(self.duration_buckets),
+            }
+
+    def render_prometheus(self):
+        """
+        Render the current window in the Prometheus text exposition format (version 0.0.4).
+        """
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP flask_app_connections_accepted_total Connections accepted by the server.",
+            "# TYPE flask_app_connections_accepted_total counter",
+            f"flask_app_connections_accepted_total {snapshot['accepted']}",
+            "# HELP flask_app_connections_open Connections currently open.",
+            "# TYPE flask_app_connections_open gauge",
+            f"flask_app_connections_open {snapshot['open']}",
+        ]
+        histograms = (
+            ("flask_app_connection_requests", "Requests served per closed connection.",
+             CONNECTION_REQUEST_BUCKETS, snapshot["request_buckets"], snapshot["requests"]),
+            ("flask_app_connection_duration_seconds", "Time from accepting to closing a connection.",
+             CONNECTION_DURATION_BUCKETS, snapshot["duration_buckets"], snapshot["seconds"]),
+        )
+        for name, help_text, bounds, buckets, total in histograms:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(bounds + (float("inf"),), buckets):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{le="{le}"}} {cumulative}')
+            lines.append(f"{name}_sum {total!r}")
+            lines.append(f"{name}_count {snapshot['closed']}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by the request handlers of flask_app.serve and the app's /metrics route.
+connection_metrics = ConnectionMetrics()
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
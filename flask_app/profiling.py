@@ -0,0 +1,207 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import random
+import threading
+
+from flask import request
+
+# Sort orders accepted by report(), including aliases such as tottime and cumtime.
+SORT_KEYS = tuple(sorted(pstats.Stats.sort_arg_dict_default))
+
+# Seconds a header-triggered request waits for the profiler before it is served
+# unprofiled.
+PROFILE_WAIT = 10.0
+
+_ENDPOINT_KEY = "flask_app.profiling.endpoint"
+
+
+class _ProfiledResponse:
+    """
+    Wraps a WSGI response iterable so that producing each chunk is profiled too.
+
+    The profiler is switched off while the server writes a chunk, so only time spent
+    in the app counts.
+    """
+
+    def __init__(self, profiler, profile, iterable, environ):
+        self._profiler = profiler
+        self._profile = profile
+        self._iterable = iterable
+        self._environ = environ
+        self._done = False
+
+    def __iter__(self):
+        iterator = iter(self._iterable)
+        try:
+            while True:
+                self._profile.enable()
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    self._profile.disable()
+                yield chunk
+        finally:
+            self._finish()
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, "close"):
+                self._iterable.close()
+        finally:
+            self._finish()
+
+    def __del__(self):
+        # A response that is never iterated or closed must still release the profiler.
+        self._finish()
+
+    def _finish(self):
+        if not self._done:
+            self._done = True
+            self._profiler._store(self._environ, self._profile)
+
+
+class RequestProfiler:
+    """
+    Opt-in cProfile profiling of requests, with stats merged per endpoint.
+
+    Nothing is installed unless FLASK_APP_PROFILE=1, so the request path is untouched
+    when profiling is off. When on, a request is profiled if it carries the trigger
+    header (FLASK_APP_PROFILE_HEADER, default X-Profile) or is picked by sampling
+    (FLASK_APP_PROFILE_SAMPLE, a fraction between 0 and 1, default 0). One request is
+    profiled at a time: a sampled request that finds another being profiled is skipped,
+    while a header-triggered one waits its turn for up to FLASK_APP_PROFILE_WAIT seconds
+    (default PROFILE_WAIT) and is then served unprofiled.
+
+    The turn lasts until the response body has been produced, since its chunks are
+    profiled as they are generated: streamed views do most of their work there. A slow
+    client reading a large streamed body therefore holds up other profiled requests.
+
+    Attributes:
+        enabled (bool): Whether the profiling middleware was installed.
+        sample_rate (float): Fraction of requests profiled without the header.
+        header (str): Name of the trigger header.
+        wait (float): Seconds a header-triggered request waits for its turn.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.sample_rate = float(os.environ.get("FLASK_APP_PROFILE_SAMPLE", "0"))
+        self.header = os.environ.get("FLASK_APP_PROFILE_HEADER", "X-Profile")
+        self.wait = float(os.environ.get("FLASK_APP_PROFILE_WAIT", PROFILE_WAIT))
+        self._environ_header = "HTTP_" + self.header.upper().replace("-", "_")
+        self._profiling_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+        self._counts = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Install the profiling middleware on a Flask app when FLASK_APP_PROFILE is set.
+        """
+        if os.environ.get("FLASK_APP_PROFILE", "0") in ("0", "false", "False", ""):
+            return
+        self.enabled = True
+        app.before_request(self._before_request)
+        app.wsgi_app = self.middleware(app.wsgi_app)
+
+    def middleware(self, wsgi_app):
+        def profiled(environ, start_response):
+            if environ.get(self._environ_header):
+                acquired = self._profiling_lock.acquire(timeout=self.wait)
+            else:
+                acquired = (self.sample_rate and random.random() < self.sample_rate
+                            and self._profiling_lock.acquire(blocking=False))
+            if not acquired:
+                return wsgi_app(environ, start_response)
+
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                iterable = wsgi_app(environ, start_response)
+            except BaseException:
+                profile.disable()
+                self._store(environ, profile)
+                raise
+            profile.disable()
+            return _ProfiledResponse(self, profile, iterable, environ)
+
+        return profiled
+
+    def _before_request(self):
+        request.environ[_ENDPOINT_KEY] = request.endpoint or "<unmatched>"
+
+    def _store(self, environ, profile):
+        """
+        Merge a finished request's profile into its endpoint's stats and free the profiler.
+        """
+        self._profiling_lock.release()
+        endpoint = environ.get(_ENDPOINT_KEY, "<unmatched>")
+        stats = pstats.Stats(profile)
+        with self._stats_lock:
+            if endpoint in self._stats:
+                self._stats[endpoint].add(stats)
+            else:
+                self._stats[endpoint] = stats
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+
+    def summary(self):
+        """
+        Returns:
+            dict: Endpoint -> number of profiled requests and their total profiled seconds.
+        """
+        with self._stats_lock:
+            return {
+                endpoint: {"requests": self._counts[endpoint], "seconds": round(stats.total_tt, 6)}
+                for endpoint, stats in sorted(self._stats.items())
+            }
+
+    def _copy(self, endpoint, stream=None):
+        with self._stats_lock:
+            if endpoint not in self._stats:
+                return None
+            copy = pstats.Stats(stream=stream)
+            copy.add(self._stats[endpoint])
+            return copy
+
+    def report(self, endpoint, sort="cumulative", limit=40):
+        """
+        Render the merged stats of one endpoint as pstats text.
+
+        Returns:
+            str | None: The report, or None when the endpoint has not been profiled.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key {sort!r}; expected one of {SORT_KEYS}")
+        out = io.StringIO()
+        stats = self._copy(endpoint, stream=out)
+        if stats is None:
+            return None
+        out.write(f"{self._counts.get(endpoint, 0)} profiled request(s) to {endpoint}\n")
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def dump(self, endpoint):
+        """
+        Serialize the merged stats of one endpoint in the format of pstats.Stats.dump_stats,
+        for loading into pstats or a viewer such as snakeviz.
+
+        Returns:
+            bytes | None: The marshalled stats, or None when the endpoint has not been profiled.
+        """
+        stats = self._copy(endpoint)
+        return None if stats is None else marshal.dumps(stats.stats)
+
+    def reset(self):
+        """
+        Discard all collected stats.
+        """
+        with self._stats_lock:
+            self._stats.clear()
+            self._counts.clear()
@@ -0,0 +1,775 @@
+import argparse
+import heapq
+import itertools
+import os
+import selectors
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from flask_app.metrics import connection_metrics
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5001
+
+# Environ key under which the request handler exposes the client socket, so that
+# response bodies such as flask_app.downloads.FileBody can use socket.sendfile().
+SOCKET_ENVIRON_KEY = "flask_app.socket"
+
+# Environ key under which the request handler exposes its response output stream. A body
+# that writes to the socket directly reports the bytes it sent with its count_sent()
+# method, so that the handler can tell whether the response was complete.
+OUTPUT_ENVIRON_KEY = "flask_app.output"
+
+# Environ key under which the request handler exposes its ConnectionScheduler, for
+# apps that raise ParkResponse to send a response paced over time.
+PARK_ENVIRON_KEY = "flask_app.park"
+
+# Unread request body bytes discarded after a response to keep its connection open;
+# a connection with more left over is closed instead.
+DRAIN_LIMIT = 64 * 1024
+
+# Worker processes of the running server, set by serve().
+_workers = 1
+
+# Seconds between checks, while a keep-alive connection is idle, for connections
+# waiting for a thread.
+IDLE_POLL_INTERVAL = 0.05
+
+# Statuses whose responses never have a body, so they need no framing headers.
+_BODYLESS_STATUSES = frozenset((204, 304))
+
+
+class _RequestInput:
+    """
+    The connection's read stream, limited to the current request's body.
+
+    Werkzeug's handler reads whatever is left on the socket after each response, which
+    on a keep-alive connection would swallow the next request. While a body of known
+    length is being read, this stream ends at the body's last byte instead, so the
+    handler only ever discards the rest of the current body. Between requests, and for
+    chunked bodies, reads pass straight through.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.remaining = None
+
+    def _limit(self, size):
+        if self.remaining is None:
+            return size
+        if size is None or size < 0:
+            return self.remaining
+        return min(size, self.remaining)
+
+    def _consumed(self, count):
+        if self.remaining is not None:
+            self.remaining -= count
+
+    def read(self, size=-1):
+        size = self._limit(size)
+        if size == 0:
+            return b""
+        data = self._stream.read(size)
+        self._consumed(len(data))
+        return data
+
+    def read1(self, size=-1):
+        size = self._limit(size)
+        if size == 0:
+            return b""
+        data = self._stream.read1(size)
+        self._consumed(len(data))
+        return data
+
+    def readinto(self, buffer):
+        with memoryview(buffer) as view:
+            size = self._limit(len(view))
+            if size == 0:
+                return 0
+            count = self._stream.readinto(view[:size]) or 0
+        self._consumed(count)
+        return count
+
+    def readline(self, size=-1):
+        size = self._limit(size)
+        if size == 0:
+            return b""
+        line = self._stream.readline(size)
+        self._consumed(len(line))
+        return line
+
+    def readlines(self, hint=-1):
+        lines = []
+        total = 0
+        for line in iter(self.readline, b""):
+            lines.append(line)
+            total += len(line)
+            if 0 < hint <= total:
+                break
+        return lines
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+    def discard(self, limit):
+        """
+        Read and drop what is left of the current body, up to `limit` bytes.
+
+        Returns:
+            bool: True when the body has been read to its end.
+        """
+        while self.remaining and limit > 0:
+            data = self.read(min(self.remaining, limit, DRAIN_LIMIT))
+            if not data:
+                return False
+            limit -= len(data)
+        return not self.remaining
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def worker_processes():
+    """
+    Returns:
+        int: Worker processes serving the app. With more than one, state held in one
+        process's memory, such as issued bearer tokens, is not seen by requests that
+        reach another worker.
+    """
+    return _workers
+
+
+class ParkResponse(BaseException):
+    """
+    Raised by an app to have its response written later by the ConnectionScheduler,
+    instead of by the request handler's thread.
+
+    It derives from BaseException so that Werkzeug's server, which turns any Exception
+    into a 500, passes it through to the handler. It may only be raised before
+    start_response() has been called, by an app that found PARK_ENVIRON_KEY in its
+    environ.
+
+    Attributes:
+        status (str): Status line, e.g. '200 OK'.
+        headers (list): Response headers as (name, value) pairs.
+        items: Iterator of (delay, data) pairs: wait `delay` seconds, then send the bytes
+            `data`. The headers go out with the first item. Its close() method, if any,
+            is called once the response is over.
+    """
+
+    def __init__(self, status, headers, items):
+        super().__init__(status)
+        self.status = status
+        self.headers = headers
+        self.items = items
+
+
+class _ParkedResponse:
+    """
+    A connection held by the ConnectionScheduler and the response still to be sent on it.
+    """
+
+    __slots__ = ("sock", "items", "chunked", "on_close", "pending", "buffer", "finished", "closed")
+
+    def __init__(self, sock, head, items, chunked, on_close):
+        self.sock = sock
+        self.items = items
+        self.chunked = chunked
+        self.on_close = on_close
+        self.pending = head
+        self.buffer = b""
+        self.finished = False
+        self.closed = False
+
+
+class ConnectionScheduler:
+    """
+    Writes paced responses on parked connections from a single thread.
+
+    A request handler parks a connection once the app has raised ParkResponse, and
+    returns, so no handler thread waits while the response sleeps. The scheduler keeps
+    a heap of timers and a selector over the parked sockets: when a response's next
+    delay has passed it sends the following data without blocking, and waits for the
+    socket to become writable when the client reads slowly. A client that disconnects
+    is noticed at once and its connection dropped. Parked connections are closed once
+    their response is complete, so one thread holds any number of slow responses,
+    limited only by file descriptors.
+
+    The thread starts on first use in each process, so forked workers get their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._incoming = []
+        self._pid = None
+        self._wakeup = None
+        self._parked = 0
+
+    @property
+    def parked(self):
+        """
+        Connections currently held by the scheduler.
+        """
+        return self._parked
+
+    def render_prometheus(self):
+        """
+        Render the parked connection gauge in the Prometheus text exposition format.
+        """
+        return (
+            "# HELP flask_app_connections_parked Connections whose paced response is held by the scheduler.\n"
+            "# TYPE flask_app_connections_parked gauge\n"
+            f"flask_app_connections_parked {self._parked}\n"
+        )
+
+    def park(self, sock, head, items, chunked=False, on_close=None):
+        """
+        Take over `sock` and send `head` followed by the data of `items`.
+
+        Args:
+            sock (socket.socket): The client connection; the scheduler closes it.
+            head (bytes): The status line and headers.
+            items: Iterator of (delay, data) pairs, as in ParkResponse.
+            chunked (bool): Frame the data with chunked transfer encoding.
+            on_close (callable): Called without arguments once the connection is closed.
+        """
+        sock.setblocking(False)
+        response = _ParkedResponse(sock, head, items, chunked, on_close)
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+            self._incoming.append(response)
+            self._parked += 1
+        try:
+            self._wakeup.send(b"\0")
+        except BlockingIOError:
+            pass  # A wakeup is already pending.
+
+    def _start(self):
+        """
+        Start the scheduler thread; the caller holds the lock.
+        """
+        self._pid = os.getpid()
+        self._incoming = []
+        self._parked = 0
+        receiver, self._wakeup = socket.socketpair()
+        receiver.setblocking(False)
+        self._wakeup.setblocking(False)
+        threading.Thread(target=self._run, args=(receiver,), name="park-scheduler", daemon=True).start()
+
+    def _run(self, receiver):
+        selector = selectors.DefaultSelector()
+        selector.register(receiver, selectors.EVENT_READ)
+        timers = []
+        order = itertools.count()
+        while True:
+            timeout = max(timers[0][0] - time.monotonic(), 0) if timers else None
+            for key, events in selector.select(timeout):
+                response = key.data
+                if response is None:
+                    try:
+                        while receiver.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                if events & selectors.EVENT_READ and not self._client_open(response):
+                    self._close(selector, response)
+                elif events & selectors.EVENT_WRITE:
+                    self._send(selector, timers, order, response)
+
+            with self._lock:
+                incoming, self._incoming = self._incoming, []
+            for response in incoming:
+                selector.register(response.sock, selectors.EVENT_READ, response)
+                self._advance(selector, timers, order, response)
+
+            now = time.monotonic()
+            while timers and timers[0][0] <= now:
+                _, _, response, data = heapq.heappop(timers)
+                if response.closed:
+                    continue
+                if response.chunked and data:
+                    data = b"%x\r\n%s\r\n" % (len(data), data)
+                response.buffer = response.pending + data
+                response.pending = b""
+                self._send(selector, timers, order, response)
+
+    def _client_open(self, response):
+        """
+        Read and drop whatever the client sent; a parked connection takes no more requests.
+
+        Returns:
+            bool: False once the client has closed its end or the connection failed.
+        """
+        try:
+            return bool(response.sock.recv(DRAIN_LIMIT))
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def _send(self, selector, timers, order, response):
+        """
+        Write as much of the buffer as the socket takes, then wait for it to drain or
+        move on to the response's next item.
+        """
+        try:
+            sent = response.sock.send(response.buffer) if response.buffer else 0
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            self._close(selector, response)
+            return
+        response.buffer = response.buffer[sent:]
+        if response.buffer:
+            selector.modify(response.sock, selectors.EVENT_READ | selectors.EVENT_WRITE, response)
+            return
+        selector.modify(response.sock, selectors.EVENT_READ, response)
+        if response.finished:
+            self._close(selector, response)
+        else:
+            self._advance(selector, timers, order, response)
+
+    def _advance(self, selector, timers, order, response):
+        """
+        Schedule the response's next item, or its end.
+        """
+        try:
+            delay, data = next(response.items)
+        except StopIteration:
+            response.finished = True
+            heapq.heappush(timers, (time.monotonic(), next(order), response, b""))
+            if response.chunked:
+                response.pending += b"0\r\n\r\n"
+            return
+        except Exception:
+            self._close(selector, response)
+            return
+        heapq.heappush(timers, (time.monotonic() + delay, next(order), response, data))
+
+    def _close(self, selector, response):
+        if response.closed:
+            return
+        response.closed = True
+        selector.unregister(response.sock)
+        try:
+            response.sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        response.sock.close()
+        with self._lock:
+            self._parked -= 1
+        try:
+            if hasattr(response.items, "close"):
+                response.items.close()
+        finally:
+            if response.on_close is not None:
+                response.on_close()
+
+
+# The scheduler shared by every request handler of a process.
+connection_scheduler = ConnectionScheduler()
+
+
+class _ResponseOutput:
+    """
+    The connection's write stream, counting the bytes written to it.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.written = 0
+
+    def write(self, data):
+        self.written += len(data)
+        return self._stream.write(data)
+
+    def count_sent(self, count):
+        """
+        Count bytes sent on the socket without passing through this stream.
+        """
+        self.written += count
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    A Werkzeug WSGI server that handles connections on a fixed-size thread pool.
+
+    Unlike Werkzeug's ThreadedWSGIServer, which starts a new thread per connection,
+    the number of threads is bounded, so a burst of connections queues in the
+    listen backlog instead of exhausting the process.
+    """
+
+    multithread = True
+
+    def __init__(self, host, port, app, handler=None, threads=16, fd=None):
+        super().__init__(host, port, app, handler, fd=fd)
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi")
+        self._waiting = 0
+        self._waiting_lock = threading.Lock()
+
+    @property
+    def has_waiting_connections(self):
+        """
+        Whether accepted connections are queued for a free thread. Handlers then close
+        keep-alive connections after their current response, and idle ones within
+        IDLE_POLL_INTERVAL, so that idle clients cannot hold every thread while others
+        wait.
+        """
+        return self._waiting > 0
+
+    def process_request(self, request, client_address):
+        with self._waiting_lock:
+            self._waiting += 1
+        self._executor.submit(self._process_request_thread, request, client_address)
+
+    def _process_request_thread(self, request, client_address):
+        with self._waiting_lock:
+            self._waiting -= 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        if hasattr(self, "_executor"):
+            self._executor.shutdown(wait=False)
+
+
+def make_request_handler(keep_alive=5.0, access_log=False):
+    """
+    Build a request handler class for the given keep-alive and logging settings.
+
+    Werkzeug's handler closes the connection after every response. This one keeps it
+    open when the client allows it and the response is delimited by Content-Length or
+    chunked encoding, so a client can send many requests over one connection. Request
+    bodies with a Content-Length are read through _RequestInput; chunked request bodies
+    still close the connection. Every connection is recorded in
+    flask_app.metrics.connection_metrics: when it is accepted, how many requests it
+    served and how long it was open.
+
+    The handler also puts the client socket in the WSGI environ under
+    SOCKET_ENVIRON_KEY, for zero-copy file responses, and the process's
+    ConnectionScheduler under PARK_ENVIRON_KEY. When the app raises ParkResponse, the
+    connection is handed to the scheduler with the response's headers, marked
+    Connection: close, and the handler's thread is released.
+
+    Args:
+        keep_alive (float): Seconds an idle connection is kept open for another request.
+            0 disables keep-alive and closes the connection after every response.
+        access_log (bool): Log one line per request, as the development server does.
+
+    Returns:
+        type: A WSGIRequestHandler subclass.
+    """
+    class RequestHandler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1" if keep_alive else "HTTP/1.0"
+        timeout = keep_alive or None
+
+        def setup(self):
+            super().setup()
+            # Headers and body go out in separate writes; without this, Nagle's algorithm
+            # holds the body back until the client's delayed ACK on a reused connection.
+            if self.connection.family in (socket.AF_INET, socket.AF_INET6):
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.rfile = _RequestInput(self.rfile)
+            self.wfile = _ResponseOutput(self.wfile)
+            self.requests_served = 0
+            self._parked = False
+            self._connection_started = connection_metrics.opened()
+
+        def finish(self):
+            try:
+                super().finish()
+            finally:
+                if not self._parked:
+                    connection_metrics.closed(self.requests_served, self._connection_started)
+
+        def handle_one_request(self):
+            if self.requests_served and not self._wait_for_request():
+                self.close_connection = True
+                return
+            super().handle_one_request()
+
+        def _wait_for_request(self):
+            """
+            Wait for the next request on a kept-alive connection.
+
+            Returns:
+                bool: False when the client closed the connection, the keep-alive timeout
+                passed, or the server has connections waiting for a thread, which an idle
+                connection must not keep waiting.
+            """
+            deadline = time.monotonic() + keep_alive
+            ready = False
+            with selectors.DefaultSelector() as selector:
+                selector.register(self.connection, selectors.EVENT_READ)
+                while True:
+                    if self._request_pending():
+                        return True
+                    remaining = deadline - time.monotonic()
+                    if ready or remaining <= 0 or getattr(self.server, "has_waiting_connections", False):
+                        return False
+                    ready = bool(selector.select(min(remaining, IDLE_POLL_INTERVAL)))
+
+        def _request_pending(self):
+            """
+            Whether request bytes are buffered or on the socket, without blocking.
+            """
+            self.connection.settimeout(0.0)
+            try:
+                return bool(self.rfile.peek(1))
+            except OSError:
+                return False
+            finally:
+                self.connection.settimeout(self.timeout)
+
+        def make_environ(self):
+            if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+                self.close_connection = True
+            else:
+                try:
+                    self.rfile.remaining = max(int(self.headers.get("Content-Length") or 0), 0)
+                except ValueError:
+                    self.close_connection = True
+            environ = super().make_environ()
+            environ[SOCKET_ENVIRON_KEY] = self.connection
+            environ[OUTPUT_ENVIRON_KEY] = self.wfile
+            environ[PARK_ENVIRON_KEY] = connection_scheduler
+            return environ
+
+        def run_wsgi(self):
+            self.requests_served += 1
+            self._status = None
+            self._framed = False
+            self._content_length = None
+            self._body_start = None
+            try:
+                super().run_wsgi()
+                if not self.close_connection and (self._body_incomplete() or not self.rfile.discard(DRAIN_LIMIT)):
+                    self.close_connection = True
+            except ParkResponse as parked:
+                self._park(parked)
+            finally:
+                self.rfile.remaining = None
+
+        def _park(self, parked):
+            """
+            Hand the connection and the parked response to the scheduler.
+            """
+            code = int(parked.status.split(None, 1)[0])
+            names = {name.lower() for name, _ in parked.headers}
+            has_body = self.command != "HEAD" and code not in _BODYLESS_STATUSES and code >= 200
+            chunked = (has_body and "content-length" not in names and "transfer-encoding" not in names
+                       and self.request_version == "HTTP/1.1")
+            lines = [f"{self.protocol_version} {parked.status}"]
+            lines += [f"{name}: {value}" for name, value in parked.headers]
+            if "server" not in names:
+                lines.append(f"Server: {self.version_string()}")
+            if "date" not in names:
+                lines.append(f"Date: {self.date_time_string()}")
+            if chunked:
+                lines.append("Transfer-Encoding: chunked")
+            lines.append("Connection: close")
+            head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+            self.log_request(code)
+
+            # Detaching leaves the socket server nothing to shut down or close when this
+            # handler returns; the scheduler now owns the connection.
+            self.close_connection = True
+            self._parked = True
+            sock = socket.socket(fileno=self.connection.detach())
+            requests_served, started = self.requests_served, self._connection_started
+            connection_scheduler.park(sock, head, parked.items, chunked,
+                           on_close=lambda: connection_metrics.closed(requests_served, started))
+
+        def _body_incomplete(self):
+            """
+            Whether the body sent differs from its Content-Length, as when the app fails
+            partway through and Werkzeug appends its error page. The client would then
+            read the next response as part of this one, so the connection must close.
+            """
+            if self._content_length is None or self._body_start is None or not self._framed:
+                return False
+            if self.command == "HEAD" or self._status in _BODYLESS_STATUSES or (self._status or 0) < 200:
+                return False
+            return self.wfile.written - self._body_start != self._content_length
+
+        def end_headers(self):
+            super().end_headers()
+            self._body_start = self.wfile.written
+
+        def send_response_only(self, code, message=None):
+            self._status = code
+            super().send_response_only(code, message)
+
+        def send_header(self, keyword, value):
+            name = keyword.lower()
+            if name == "connection" and value.lower() == "close" and self._can_keep_alive():
+                if self.request_version != "HTTP/1.1":
+                    super().send_header("Connection", "keep-alive")
+                return
+            if name == "content-length" or (name == "transfer-encoding" and value.lower() == "chunked"):
+                self._framed = True
+                if name == "content-length":
+                    try:
+                        self._content_length = int(value)
+                    except ValueError:
+                        self._content_length = -1
+            super().send_header(keyword, value)
+
+        def _can_keep_alive(self):
+            """
+            Whether the connection can stay open after the response being sent.
+            """
+            if self.close_connection or getattr(self.server, "has_waiting_connections", False):
+                return False
+            return (self._framed or self.command == "HEAD" or self._status in _BODYLESS_STATUSES
+                    or 100 <= (self._status or 0) < 200)
+
+        def log_request(self, *args, **kwargs):
+            if access_log:
+                super().log_request(*args, **kwargs)
+
+    return RequestHandler
+
+
+def create_listen_socket(host, port, backlog):
+    """
+    Bind and listen on a TCP socket with an explicit backlog size.
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve(app, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=1, threads=16,
+          backlog=1024, keep_alive=5.0, access_log=False):
+    """
+    Serve a WSGI app with pre-forked worker processes, each running a thread pool.
+
+    Args:
+        app: The WSGI application to serve.
+        host (str): Interface to bind.
+        port (int): Port to bind; 0 picks an ephemeral port.
+        workers (int): Number of worker processes. 1 serves from the current process.
+        threads (int): Request-handling threads per worker.
+        backlog (int): Size of the kernel listen queue shared by all workers.
+        keep_alive (float): Idle keep-alive timeout in seconds; 0 disables keep-alive.
+        access_log (bool): Log every request.
+    """
+    global _workers
+    _workers = max(workers, 1)
+    sock = create_listen_socket(host, port, backlog)
+    handler = make_request_handler(keep_alive, access_log)
+    bound_port = sock.getsockname()[1]
+    print(f" * Serving on http://{host}:{bound_port} with {workers} worker(s) x {threads} thread(s),"
+          f" backlog {backlog}, keep-alive {keep_alive}s", flush=True)
+
+    if workers <= 1:
+        _run_worker(app, host, handler, threads, sock)
+        return
+
+    # Every worker accepts from the same socket; non-blocking accepts let a worker
+    # that loses the race go back to waiting instead of blocking inside accept().
+    sock.setblocking(False)
+    children = set()
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for _ in list(children):
+            os.wait()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while True:
+        while len(children) < workers:
+            pid = os.fork()
+            if pid == 0:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+                _run_worker(app, host, handler, threads, sock)
+                os._exit(0)
+            children.add(pid)
+        # Replace any worker that exits unexpectedly.
+        pid, _ = os.wait()
+        children.discard(pid)
+
+
+def _run_worker(app, host, handler, threads, sock):
+    """
+    Serve requests from an already listening socket until interrupted.
+    """
+    server = PooledWSGIServer(host, sock.getsockname()[1], app, handler, threads=threads, fd=sock.fileno())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Serve the HTTPie testing Flask app.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="Pre-forked worker processes.")
+    parser.add_argument("--threads", type=int, default=16, help="Request threads per worker.")
+    parser.add_argument("--backlog", type=int, default=1024, help="Listen queue size.")
+    parser.add_argument("--keep-alive", type=float, default=5.0,
+                        help="Idle keep-alive timeout in seconds; 0 disables keep-alive.")
+    parser.add_argument("--access-log", action="store_true", help="Log every request.")
+    parser.add_argument("--dev", action="store_true",
+                        help="Use Flask's single-process development server instead.")
+    return parser
+
+
+def main(argv=None, app=None):
+    """
+    Command line entry point: `python -m flask_app.serve` or `python flask_app/app.py`.
+    """
+    options = build_parser().parse_args(argv)
+    if app is None:
+        from flask_app.app import app
+
+    if options.dev:
+        app.run(host=options.host, port=options.port)
+        return
+
+    serve(
+        app,
+        host=options.host,
+        port=options.port,
+        workers=options.workers,
+        threads=options.threads,
+        backlog=options.backlog,
+        keep_alive=options.keep_alive,
+        access_log=options.access_log,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import math
+import os
+import time
+
+from werkzeug.exceptions import BadRequest
+
+from flask_app.serve import PARK_ENVIRON_KEY, SOCKET_ENVIRON_KEY, ParkResponse
+
+# Request headers that shape the response of any route: seconds to wait before the
+# response starts, body bandwidth in bytes per second, and bytes per paced write.
+LATENCY_HEADER = "X-Shape-Latency"
+BANDWIDTH_HEADER = "X-Shape-Bandwidth"
+CHUNK_SIZE_HEADER = "X-Shape-Chunk-Size"
+
+# Longest latency a request may ask for, in seconds.
+MAX_LATENCY = 300.0
+
+# Paced writes per second when a bandwidth is given without a chunk size.
+WRITES_PER_SECOND = 10
+
+# Largest body handed to the connection scheduler. Longer bodies are paced from the
+# request's own thread.
+PARK_BODY_LIMIT = 1024 * 1024
+
+_SHAPE_KEY = "flask_app.shaping.shape"
+
+
+class Shape:
+    """
+    How a response is slowed down.
+
+    Attributes:
+        latency (float): Seconds before the status line and headers are sent.
+        rate (float | None): Body bytes per second; None sends the body unpaced.
+        chunk_size (int): Bytes per write when the body is paced.
+    """
+
+    __slots__ = ("latency", "rate", "chunk_size")
+
+    def __init__(self, latency=0.0, rate=None, chunk_size=None):
+        self.latency = latency
+        self.rate = rate
+        self.chunk_size = chunk_size or max(int(rate or 0) // WRITES_PER_SECOND, 1)
+
+    @property
+    def active(self):
+        return self.latency > 0 or self.rate is not None
+
+
+def shape_response(environ, latency=0.0, rate=None, chunk_size=None):
+    """
+    Slow down the response to the request of `environ`, e.g. from a route. Values given
+    here replace those of the shaping headers.
+    """
+    shape = environ.get(_SHAPE_KEY)
+    if shape is not None:
+        latency = latency or shape.latency
+        if rate is None:
+            rate, chunk_size = shape.rate, shape.chunk_size
+    environ[_SHAPE_KEY] = Shape(latency, rate, chunk_size)
+
+
+def _header_number(environ, header, convert, low, high=None):
+    value = environ.get("HTTP_" + header.upper().replace("-", "_"))
+    if value is None:
+        return None
+    try:
+        number = convert(value)
+    except ValueError:
+        number = None
+    if number is None or not math.isfinite(number) or number < low or (high is not None and number > high):
+        bounds = f"between {low} and {high}" if high is not None else f"at least {low}"
+        raise BadRequest(f"{header} must be a number {bounds}")
+    return number
+
+
+def paced(iterable, shape):
+    """
+    Split a WSGI response body into the (delay, data) items of ParkResponse.
+
+    The first item carries the latency and no data; with a rate, every chunk of at most
+    `shape.chunk_size` bytes then follows after the time it takes to send at that rate.
+    The body is closed when the items are.
+    """
+    try:
+        yield shape.latency, b""
+        for data in iterable:
+            if shape.rate is None:
+                if data:
+                    yield 0.0, data
+                continue
+            for offset in range(0, len(data), shape.chunk_size):
+                chunk = data[offset:offset + shape.chunk_size]
+                yield len(chunk) / shape.rate, chunk
+    finally:
+        if hasattr(iterable, "close"):
+            iterable.close()
+
+
+def _collect(iterable, limit):
+    """
+    Read a WSGI response body into memory, up to about `limit` bytes.
+
+    Returns:
+        tuple: (list of the chunks read, iterator of the rest or None when the body was
+        read to its end, in which case it has been closed).
+    """
+    chunks = []
+    size = 0
+    iterator = iter(iterable)
+    try:
+        for data in iterator:
+            chunks.append(data)
+            size += len(data)
+            if size > limit:
+                return chunks, iterator
+    except BaseException:
+        if hasattr(iterable, "close"):
+            iterable.close()
+        raise
+    if hasattr(iterable, "close"):
+        iterable.close()
+    return chunks, None
+
+
+def _sleeping(items):
+    """
+    Send paced items from the request's own thread, when the response is not parked.
+    """
+    try:
+        for delay, data in items:
+            time.sleep(delay)
+            if data:
+                yield data
+    finally:
+        items.close()
+
+
+class ResponseShaper:
+    """
+    Adds latency and limits bandwidth for responses, to test client timeouts and
+    streaming over slow links.
+
+    Any route is shaped by the X-Shape-Latency (seconds before the response starts),
+    X-Shape-Bandwidth (body bytes per second) and X-Shape-Chunk-Size (bytes per write)
+    request headers; routes such as /delay and /drip shape their own responses with
+    shape_response(). Shaping is applied outside every other middleware, to the bytes
+    as they go on the wire.
+
+    On flask_app.serve's request handler, a shaped response whose body is at most
+    PARK_BODY_LIMIT bytes is produced in full, then raised as ParkResponse, so its
+    delays are waited out by the ConnectionScheduler instead of a request thread and one
+    server holds thousands of slow responses. Longer bodies, and every shaped response
+    on other servers (the --dev server, the Flask test client), are paced by sleeping in
+    the request's thread instead.
+
+    FLASK_APP_SHAPING_HEADERS=0 ignores the shaping headers; routes still shape their
+    responses.
+
+    Attributes:
+        headers_enabled (bool): Whether the shaping headers are honoured.
+    """
+
+    def __init__(self, app=None):
+        self.headers_enabled = os.environ.get("FLASK_APP_SHAPING_HEADERS", "1") not in ("0", "false", "False")
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Install the response shaping middleware on a Flask app.
+        """
+        app.wsgi_app = self.middleware(app.wsgi_app)
+
+    def _header_shape(self, environ):
+        """
+        Returns:
+            Shape | None: The shape asked for by the request headers, if any.
+
+        Raises:
+            BadRequest: For a header value that is not a number or is out of range.
+        """
+        latency = _header_number(environ, LATENCY_HEADER, float, 0, MAX_LATENCY)
+        rate = _header_number(environ, BANDWIDTH_HEADER, float, 1)
+        chunk_size = _header_number(environ, CHUNK_SIZE_HEADER, int, 1)
+        if latency is None and rate is None:
+            return None
+        return Shape(latency or 0.0, rate, chunk_size)
+
+    def middleware(self, wsgi_app):
+        def shaping(environ, start_response):
+            if self.headers_enabled:
+                try:
+                    shape = self._header_shape(environ)
+                except BadRequest as error:
+                    return error(environ, start_response)
+                if shape is not None:
+                    environ[_SHAPE_KEY] = shape
+                    # The body must pass through here rather than go out by sendfile().
+                    environ.pop(SOCKET_ENVIRON_KEY, None)
+
+            # The status and headers are held back until it is known whether the
+            # route asked for shaping.
+            response = []
+            written = []
+
+            def deferred_start_response(status, headers, exc_info=None):
+                response[:] = [status, headers]
+                return written.append
+
+            iterable = wsgi_app(environ, deferred_start_response)
+            if not response:
+                # Streamed bodies may start the response with their first chunk.
+                iterator = iter(iterable)
+                iterable = _Prepended([next(iterator, b"")], iterator, iterable)
+            if written:
+                iterable = _Prepended(written, iterable, iterable)
+            shape = environ.get(_SHAPE_KEY)
+            if shape is None or not shape.active:
+                start_response(*response)
+                return iterable
+
+            if environ.get(PARK_ENVIRON_KEY) is not None:
+                # The scheduler's thread must not run app code: streamed bodies need
+                # their request context and request body, and a slow generator would
+                # hold up every parked connection. The body is produced here first, so
+                # the app is done with the request before its connection is parked.
+                body, rest = _collect(iterable, PARK_BODY_LIMIT)
+                if rest is None:
+                    raise ParkResponse(response[0], response[1], paced(body, shape))
+                iterable = _Prepended(body, rest, iterable)
+            start_response(*response)
+            return _sleeping(paced(iterable, shape))
+
+        return shaping
+
+
+class _Prepended:
+    """
+    A response body made of data already taken from the app (written with write(), or
+    the first chunk of a streamed body), then the rest of its iterable.
+    """
+
+    def __init__(self, head, rest, body):
+        self._head = head
+        self._rest = rest
+        self._body = body
+
+    def __iter__(self):
+        yield from self._head
+        yield from self._rest
+
+    def close(self):
+        if hasattr(self._body, "close"):
+            self._body.close()
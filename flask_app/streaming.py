@@ -0,0 +1,249 @@
+import codecs
+import io
+import tempfile
+from urllib.parse import unquote_to_bytes
+from xml.etree import ElementTree as ET
+
+# Size of each read from the request stream in the streaming handlers.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def iter_stream(stream, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield a binary stream in chunks of at most `chunk_size` bytes until it is exhausted.
+
+    Works for Content-Length and chunked (Transfer-Encoding) request bodies alike, as
+    Werkzeug exposes both as a stream that ends with the body.
+    """
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+class UrlencodedFieldReader:
+    """
+    Incrementally decode one field of an application/x-www-form-urlencoded body.
+
+    The decoded value of the first occurrence of `field` is passed to `sink` piece by
+    piece, so a field of any size is handled in constant memory.
+
+    Attributes:
+        field (bytes): The field name to extract.
+        found (bool): Whether the field has been seen.
+        size (int): Number of decoded bytes passed to the sink.
+    """
+
+    def __init__(self, field, sink):
+        self.field = field.encode() if isinstance(field, str) else field
+        self.sink = sink
+        self.found = False
+        self.size = 0
+        self._key = b''
+        self._in_value = False
+        self._capturing = False
+        self._carry = b''
+
+    def feed(self, chunk):
+        """
+        Consume the next chunk of the raw body.
+        """
+        while chunk:
+            if not self._in_value:
+                eq = chunk.find(b'=')
+                amp = chunk.find(b'&')
+                if amp != -1 and (eq == -1 or amp < eq):
+                    # A key without a value; skip the pair.
+                    self._key = b''
+                    chunk = chunk[amp + 1:]
+                    continue
+                if eq == -1:
+                    self._key += chunk
+                    return
+                key = _unquote_plus(self._key + chunk[:eq])
+                self._key = b''
+                self._in_value = True
+                self._capturing = key == self.field and not self.found
+                chunk = chunk[eq + 1:]
+            else:
+                amp = chunk.find(b'&')
+                part, chunk = (chunk, b'') if amp == -1 else (chunk[:amp], chunk[amp + 1:])
+                if self._capturing:
+                    self._decode(part, final=amp != -1)
+                if amp != -1:
+                    self._end_value()
+
+    def close(self):
+        """
+        Flush the final value once the body has ended.
+        """
+        if self._in_value and self._capturing:
+            self._decode(b'', final=True)
+        if self._in_value:
+            self._end_value()
+
+    def _end_value(self):
+        if self._capturing:
+            self.found = True
+        self._in_value = False
+        self._capturing = False
+
+    def _decode(self, part, final):
+        data = self._carry + part
+        self._carry = b''
+        if not final:
+            # Keep an escape sequence that is split across chunks for the next call.
+            percent = data.rfind(b'%', max(len(data) - 2, 0))
+            if percent != -1:
+                data, self._carry = data[:percent], data[percent:]
+        decoded = _unquote_plus(data)
+        if decoded:
+            self.size += len(decoded)
+            self.sink(decoded)
+
+
+def _unquote_plus(data):
+    """
+    Decode a urlencoded byte string, treating '+' as a space.
+    """
+    return unquote_to_bytes(data.replace(b'+', b' '))
+
+
+def iter_text_lines(chunks, encoding='utf-8'):
+    """
+    Decode binary chunks incrementally and yield complete lines, keeping line endings.
+
+    Lines are split the way a file opened with newline='' splits them, which is what
+    the csv module expects. A multi-byte character or line split across chunks is
+    carried over to the next one, so only one partial line is ever held in memory.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ''
+    for chunk in chunks:
+        text = pending + decoder.decode(chunk)
+        end = text.rfind('\n') + 1
+        pending = text[end:]
+        if end:
+            yield from io.StringIO(text[:end], newline='')
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield from io.StringIO(pending, newline='')
+
+
+def spool_stream(stream, max_memory=8 * 1024 * 1024, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Copy a stream into a SpooledTemporaryFile that moves to disk past `max_memory` bytes.
+
+    Returns:
+        SpooledTemporaryFile: The spooled copy, rewound to the start.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    for chunk in iter_stream(stream, chunk_size):
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+def element_to_data(element):
+    """
+    Convert an XML element and its subtree to JSON-compatible data.
+
+    Leaf elements without attributes become their text. Other elements become a dict
+    with attributes under '@name', text under '#text' and children under their tag;
+    a tag that repeats becomes a list of values.
+    """
+    children = list(element)
+    if not children and not element.attrib:
+        return element.text
+
+    data = {f"@{name}": value for name, value in element.attrib.items()}
+    text = (element.text or '').strip()
+    if text:
+        data['#text'] = text
+    for child in children:
+        value = element_to_data(child)
+        if child.tag not in data:
+            data[child.tag] = value
+        elif isinstance(data[child.tag], list):
+            data[child.tag].append(value)
+        else:
+            data[child.tag] = [data[child.tag], value]
+    return data
+
+
+class XMLStreamParser:
+    """
+    Parse an XML document incrementally, discarding elements once they are processed.
+
+    Feed raw chunks to records() or summary(); at most one direct child of the root
+    (records) or one element per open level (summary) is held in memory at a time.
+
+    Attributes:
+        bytes_read (int): Bytes of XML consumed so far.
+        max_depth (int): Deepest nesting level seen, the root being depth 1.
+        tag_counts (dict): Number of elements seen per tag.
+        attribute_count (int): Total number of attributes seen.
+        root_tag (str | None): Tag of the document element.
+    """
+
+    def __init__(self):
+        self.bytes_read = 0
+        self.max_depth = 0
+        self.tag_counts = {}
+        self.attribute_count = 0
+        self.root_tag = None
+
+    def _events(self, chunks):
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        for chunk in chunks:
+            self.bytes_read += len(chunk)
+            parser.feed(chunk)
+            yield from parser.read_events()
+        parser.close()
+        yield from parser.read_events()
+
+    def records(self, chunks):
+        """
+        Yield (tag, data) for each direct child of the root element as soon as it ends.
+        """
+        stack = []
+        for event, element in self._events(chunks):
+            if event == 'start':
+                self._count(element, len(stack) + 1)
+                stack.append(element)
+                continue
+            stack.pop()
+            if len(stack) == 1:
+                yield element.tag, element_to_data(element)
+                stack[0].remove(element)
+
+    def summary(self, chunks):
+        """
+        Consume the whole document and return element counts, depth and byte size.
+        """
+        stack = []
+        for event, element in self._events(chunks):
+            if event == 'start':
+                self._count(element, len(stack) + 1)
+                stack.append(element)
+                continue
+            stack.pop()
+            element.clear()
+            if stack:
+                stack[-1].remove(element)
+        return {
+            "bytes": self.bytes_read,
+            "root": self.root_tag,
+            "elements": sum(self.tag_counts.values()),
+            "attributes": self.attribute_count,
+            "max_depth": self.max_depth,
+            "tags": self.tag_counts,
+        }
+
+    def _count(self, element, depth):
+        if self.root_tag is None:
+            self.root_tag = element.tag
+        self.max_depth = max(self.max_depth, depth)
+        self.tag_counts[element.tag] = self.tag_counts.get(element.tag, 0) + 1
+        self.attribute_count += len(element.attrib)
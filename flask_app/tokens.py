@@ -0,0 +1,209 @@
+import base64
+import heapq
+import os
+import secrets
+import threading
+import time
+
+# Random bytes per token. The registry stores only these; the expiry travels in the token.
+TOKEN_BYTES = 16
+
+# Length of an issued token: base64url of the random bytes and a 4-byte expiry, unpadded.
+TOKEN_LENGTH = 27
+
+DEFAULT_TTL = int(os.environ.get("FLASK_APP_TOKEN_TTL", "3600"))
+MAX_TTL = int(os.environ.get("FLASK_APP_TOKEN_MAX_TTL", "86400"))
+CAPACITY = int(os.environ.get("FLASK_APP_TOKEN_CAPACITY", "5000000"))
+
+# Seconds between sweeps of expired tokens.
+SWEEP_INTERVAL = 1.0
+
+
+class RegistryFull(Exception):
+    """
+    Raised when issuing tokens would exceed the registry's capacity.
+    """
+
+
+def _encode(key, expires):
+    return base64.urlsafe_b64encode(key + expires.to_bytes(4, "big")).rstrip(b"=").decode("ascii")
+
+
+def _decode(token):
+    """
+    Returns:
+        tuple | None: (random bytes, expiry in Unix seconds), or None for a malformed token.
+    """
+    if len(token) != TOKEN_LENGTH:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=")
+    except ValueError:
+        return None
+    return raw[:TOKEN_BYTES], int.from_bytes(raw[TOKEN_BYTES:], "big")
+
+
+class TokenRegistry:
+    """
+    Issued bearer tokens with per-token expiry, checked in constant time.
+
+    A token is 16 random bytes followed by its expiry in Unix seconds, encoded as
+    base64url. Tokens are stored in one set per expiry second, holding only the random
+    bytes, so a token costs one 16-byte bytes object and a set slot (about 80 bytes),
+    and a lookup is a dict and a set probe. Expired tokens are evicted a whole second
+    at a time: lazily when a lookup finds its token's second has passed, and by a sweep
+    at most once per `sweep_interval` on the request path. There is no background
+    thread, so the registry works unchanged in forked server workers.
+
+    Static tokens never expire; they stand in for fixed test tokens.
+
+    Attributes:
+        default_ttl (int): Lifetime in seconds of tokens issued without a ttl.
+        max_ttl (int): Longest lifetime that may be requested.
+        capacity (int): Most live tokens; issuing more raises RegistryFull.
+        evicted (int): Expired tokens removed so far.
+    """
+
+    def __init__(self, default_ttl=DEFAULT_TTL, max_ttl=MAX_TTL, capacity=CAPACITY,
+                 sweep_interval=SWEEP_INTERVAL, clock=time.time):
+        self.default_ttl = default_ttl
+        self.max_ttl = max_ttl
+        self.capacity = capacity
+        self.sweep_interval = sweep_interval
+        self.evicted = 0
+        self._clock = clock
+        self._buckets = {}
+        self._expiries = []
+        self._static = set()
+        self._live = 0
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """
+        Live issued tokens, including expired ones not yet evicted; static tokens excluded.
+        """
+        return self._live
+
+    def add_static(self, token):
+        """
+        Accept `token` forever, whatever its format.
+        """
+        self._static.add(token)
+
+    def issue(self, ttl=None, count=1):
+        """
+        Issue `count` tokens that expire `ttl` seconds from now.
+
+        Returns:
+            tuple: (list of token strings, expiry in Unix seconds).
+
+        Raises:
+            ValueError: For a ttl outside 1..max_ttl.
+            RegistryFull: When the tokens would exceed the capacity.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if not 1 <= ttl <= self.max_ttl:
+            raise ValueError(f"ttl must be between 1 and {self.max_ttl} seconds")
+        now = self._clock()
+        self._maybe_sweep(now)
+        expires = int(now) + ttl
+        keys = [secrets.token_bytes(TOKEN_BYTES) for _ in range(count)]
+        with self._lock:
+            if self._live + count > self.capacity:
+                raise RegistryFull(f"Token registry is full ({self.capacity} live tokens)")
+            bucket = self._buckets.get(expires)
+            if bucket is None:
+                bucket = self._buckets[expires] = set()
+                heapq.heappush(self._expiries, expires)
+            before = len(bucket)
+            bucket.update(keys)
+            self._live += len(bucket) - before
+        return [_encode(key, expires) for key in keys], expires
+
+    def is_valid(self, token):
+        """
+        Returns:
+            bool: Whether `token` is static, or was issued here and has not expired or
+            been revoked.
+        """
+        if token in self._static:
+            return True
+        decoded = _decode(token)
+        if decoded is None:
+            return False
+        key, expires = decoded
+        now = self._clock()
+        self._maybe_sweep(now)
+        bucket = self._buckets.get(expires)
+        if bucket is None:
+            return False
+        if expires <= now:
+            with self._lock:
+                self._drop(expires)
+            return False
+        return key in bucket
+
+    def revoke(self, token):
+        """
+        Returns:
+            bool: Whether a live issued token was removed.
+        """
+        decoded = _decode(token)
+        if decoded is None:
+            return False
+        key, expires = decoded
+        if expires <= self._clock():
+            # Expired but not swept yet: as unknown as a token that is gone.
+            return False
+        with self._lock:
+            bucket = self._buckets.get(expires)
+            if bucket is None or key not in bucket:
+                return False
+            bucket.remove(key)
+            self._live -= 1
+        return True
+
+    def _drop(self, expires):
+        """
+        Evict one expiry second's tokens; the caller holds the lock.
+        """
+        bucket = self._buckets.pop(expires, None)
+        if bucket is not None:
+            self._live -= len(bucket)
+            self.evicted += len(bucket)
+
+    def _maybe_sweep(self, now):
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+    def sweep(self, now=None):
+        """
+        Evict every token that has expired by `now` (default: the current time).
+
+        Returns:
+            int: Number of tokens evicted.
+        """
+        now = self._clock() if now is None else now
+        with self._lock:
+            self._next_sweep = now + self.sweep_interval
+            evicted = self.evicted
+            while self._expiries and self._expiries[0] <= now:
+                self._drop(heapq.heappop(self._expiries))
+            return self.evicted - evicted
+
+    def stats(self):
+        """
+        Returns:
+            dict: Live and static token counts, expiry seconds held, evictions and settings.
+        """
+        with self._lock:
+            return {
+                "live": self._live,
+                "static": len(self._static),
+                "expiry_buckets": len(self._buckets),
+                "evicted": self.evicted,
+                "capacity": self.capacity,
+                "default_ttl": self.default_ttl,
+                "max_ttl": self.max_ttl,
+            }
@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+from tests.local_server import LocalServer
+
+
+@pytest.fixture(scope="session")
+def flask_server():
+    """
+    Start the Flask app once per test session on an ephemeral port and yield its base URL.
+
+    Set HTTPIE_TEST_BASE_URL to run against an already running server instead, and
+    HTTPIE_TEST_SERVER_MODE=process to run the server outside the test interpreter.
+    """
+    external_url = os.environ.get("HTTPIE_TEST_BASE_URL")
+    if external_url:
+        yield external_url.rstrip("/")
+        return
+
+    server = LocalServer(mode=os.environ.get("HTTPIE_TEST_SERVER_MODE", "thread"))
+    server.start()
+    try:
+        yield server.base_url
+    finally:
+        server.stop()
+
+
+@pytest.fixture(scope="session")
+def httpbin_url(flask_server):
+    """
+    Return the base URL for httpbin-style requests.
+
+    The Flask app serves local httpbin-compatible routes, so by default no test leaves
+    the machine. Set HTTPIE_TEST_HTTPBIN_URL=https://httpbin.org to use the real service.
+    """
+    return os.environ.get("HTTPIE_TEST_HTTPBIN_URL", flask_server).rstrip("/")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def base_url(request, flask_server, httpbin_url):
+    """
+    Point the module-level BASE_URL and HTTPBIN_URL of every test module at the
+    session server (or the configured httpbin service).
+    """
+    request.module.BASE_URL = flask_server
+    request.module.HTTPBIN_URL = httpbin_url
+    return flask_server
+
+
+# Per-test durations, collected when tests/parallel_runner.py asks for them.
+_test_durations = {}
+
+
+def pytest_runtest_logreport(report):
+    """
+    Add up setup, call and teardown time per test when HTTPIE_TEST_DURATIONS_OUT is set.
+    """
+    if type(report) is pytest.TestReport and os.environ.get("HTTPIE_TEST_DURATIONS_OUT"):
+        _test_durations[report.nodeid] = round(_test_durations.get(report.nodeid, 0.0) + report.duration, 4)
+
+
+def pytest_sessionfinish(session):
+    """
+    Write the collected durations to HTTPIE_TEST_DURATIONS_OUT for the parallel runner.
+    """
+    path = os.environ.get("HTTPIE_TEST_DURATIONS_OUT")
+    if path:
+        with open(path, "w") as f:
+            json.dump(_test_durations, f)
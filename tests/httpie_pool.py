@@ -0,0 +1,165 @@
+import multiprocessing
+import os
+import queue
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from tests.httpie_runner import HTTPieResult
+
+# Modules imported once in the forkserver so every worker forked from it starts warm.
+PRELOAD_MODULES = [
+    "requests",
+    "rich.console",
+    "httpie.core",
+    "httpie.cli.definition",
+    "tests.httpie_runner",
+]
+
+# Pool size and recycle-after-N-requests defaults, overridable per pool.
+DEFAULT_POOL_SIZE = int(os.environ.get("HTTPIE_POOL_SIZE", os.cpu_count() or 4))
+DEFAULT_MAX_REQUESTS = int(os.environ.get("HTTPIE_POOL_MAX_REQUESTS", 0)) or None
+
+
+def _get_context():
+    """
+    Return a forkserver multiprocessing context with HTTPie preloaded, or spawn where
+    forkserver is unavailable.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(PRELOAD_MODULES)
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _worker_main(conn):
+    """
+    Worker loop: receive (args, stdin, env) over the pipe, run HTTPie in-process and
+    send back the captured result. A None message tells the worker to exit.
+    """
+    from tests.httpie_runner import run_httpie
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        args, stdin, env = message
+        try:
+            conn.send(("ok", tuple(run_httpie(args, stdin=stdin, env=env, mode="inprocess"))))
+        except Exception:
+            conn.send(("error", traceback.format_exc()))
+    conn.close()
+
+
+class _Worker:
+    """
+    A single pre-warmed worker process and the parent end of its pipe.
+    """
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.served = 0
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class HTTPiePool:
+    """
+    A pool of worker processes that run HTTPie commands with their imports already done.
+
+    Each worker is forked from a forkserver that has imported HTTPie, requests and rich,
+    so a command only pays for the request itself. Workers are replaced after serving
+    `max_requests_per_worker` commands to bound any state they accumulate.
+
+    Attributes:
+        size (int): Number of worker processes.
+        max_requests_per_worker (int | None): Recycle a worker after this many commands;
+            None keeps workers for the lifetime of the pool.
+    """
+
+    def __init__(self, size=None, max_requests_per_worker=DEFAULT_MAX_REQUESTS):
+        self.size = size or DEFAULT_POOL_SIZE
+        self.max_requests_per_worker = max_requests_per_worker
+        self._context = _get_context()
+        self._idle = queue.Queue()
+        self._workers = []
+        for _ in range(self.size):
+            self._add_worker()
+
+    def _add_worker(self):
+        worker = _Worker(self._context)
+        self._workers.append(worker)
+        self._idle.put(worker)
+
+    def _retire_worker(self, worker):
+        self._workers.remove(worker)
+        worker.stop()
+        self._add_worker()
+
+    def run(self, args, stdin=None, env=None):
+        """
+        Run one HTTPie command on the next idle worker.
+
+        Args:
+            args (list): The full command line, starting with 'http'.
+            stdin (bytes | str | None): Data fed to HTTPie's standard input.
+            env (dict | None): Extra environment variables for this command only.
+
+        Returns:
+            HTTPieResult: The decoded stdout, stderr and the integer exit status.
+        """
+        if isinstance(stdin, str):
+            stdin = stdin.encode()
+        worker = self._idle.get()
+        try:
+            worker.conn.send((list(args), stdin, env))
+            status, payload = worker.conn.recv()
+        except (EOFError, BrokenPipeError, OSError):
+            self._retire_worker(worker)
+            raise RuntimeError("HTTPie pool worker exited unexpectedly")
+        worker.served += 1
+        if self.max_requests_per_worker and worker.served >= self.max_requests_per_worker:
+            self._retire_worker(worker)
+        else:
+            self._idle.put(worker)
+        if status == "error":
+            raise RuntimeError(f"HTTPie pool worker failed:\n{payload}")
+        return HTTPieResult(*payload)
+
+    def map(self, commands):
+        """
+        Run many HTTPie commands concurrently, one per idle worker.
+
+        Returns:
+            list: An HTTPieResult for each command, in the order given.
+        """
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(self.run, commands))
+
+    def close(self):
+        """
+        Stop every worker process.
+        """
+        while self._workers:
+            self._workers.pop().stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
@@ -0,0 +1,230 @@
+import io
+import os
+import subprocess
+import threading
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import NamedTuple
+
+# Set HTTPIE_RUNNER=subprocess to run every command in a fresh `http` process
+# (the original behaviour), e.g. to compare results against the in-process runner.
+RUNNER_MODE = os.environ.get("HTTPIE_RUNNER", "inprocess")
+
+# HTTPie reads os.environ and writes to sys.stdout in a few places, so only one
+# in-process invocation may run at a time inside a single interpreter.
+_INPROCESS_LOCK = threading.Lock()
+
+
+class HTTPieResult(NamedTuple):
+    """
+    Captured output of a single HTTPie invocation.
+
+    Unpacks as ``stdout, stderr, exit_status`` so it can be used anywhere the
+    helpers previously returned a plain tuple.
+    """
+    stdout: str
+    stderr: str
+    exit_status: int
+
+
+def run_httpie(args, stdin=None, env=None, mode=None, timeout=None):
+    """
+    Run an HTTPie command and capture its output.
+
+    Args:
+        args (list): The full command line, starting with the program name ('http').
+        stdin (bytes | str | file-like | iterable of bytes | None): Data fed to HTTPie's
+            standard input. An iterable (e.g. a generator) is streamed chunk by chunk
+            without being held in memory; combine it with --chunked, as HTTPie otherwise
+            reads all of stdin to compute Content-Length. When None, standard input is
+            treated as closed.
+        env (dict | None): Extra environment variables for this invocation only.
+        mode (str | None): 'inprocess' or 'subprocess'; defaults to RUNNER_MODE.
+        timeout (float | None): Subprocess timeout in seconds (subprocess mode only).
+
+    Returns:
+        HTTPieResult: The decoded stdout, stderr and the integer exit status.
+    """
+    mode = mode or RUNNER_MODE
+    if mode == "subprocess":
+        return _run_subprocess(args, stdin, env, timeout)
+    if mode == "inprocess":
+        return _run_inprocess(args, stdin, env)
+    raise ValueError(f"Unknown HTTPie runner mode: {mode!r}")
+
+
+def _run_subprocess(args, stdin, env, timeout):
+    """
+    Run HTTPie in a fresh interpreter via subprocess.run.
+    """
+    if isinstance(stdin, str):
+        stdin = stdin.encode()
+    elif _is_chunk_iterable(stdin):
+        return _run_subprocess_streaming(args, stdin, env, timeout)
+    elif stdin is not None and not isinstance(stdin, bytes):
+        stdin = stdin.read()
+    result = subprocess.run(
+        args,
+        input=stdin,
+        stdin=subprocess.DEVNULL if stdin is None else None,
+        capture_output=True,
+        env={**os.environ, **env} if env else None,
+        timeout=timeout,
+    )
+    return HTTPieResult(
+        result.stdout.decode("utf-8", "replace"),
+        result.stderr.decode("utf-8", "replace"),
+        result.returncode,
+    )
+
+
+def _run_subprocess_streaming(args, chunks, env, timeout):
+    """
+    Run HTTPie in a fresh interpreter, writing `chunks` to its stdin from a thread.
+    """
+    process = subprocess.Popen(
+        args,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env={**os.environ, **env} if env else None,
+    )
+    # Detach stdin from the Popen object so communicate() only collects the output.
+    pipe, process.stdin = process.stdin, None
+
+    def feed():
+        try:
+            for chunk in chunks:
+                pipe.write(chunk)
+        except BrokenPipeError:
+            pass
+        finally:
+            try:
+                pipe.close()
+            except BrokenPipeError:
+                pass
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        raise
+    writer.join()
+    return HTTPieResult(
+        stdout.decode("utf-8", "replace"),
+        stderr.decode("utf-8", "replace"),
+        process.returncode,
+    )
+
+
+def _run_inprocess(args, stdin, env):
+    """
+    Run HTTPie's main() inside the current interpreter with captured streams.
+    """
+    from httpie.context import Environment
+    from httpie.core import main
+
+    if isinstance(stdin, str):
+        stdin = stdin.encode()
+    if isinstance(stdin, bytes):
+        stdin = io.BytesIO(stdin)
+    elif _is_chunk_iterable(stdin):
+        stdin = io.BufferedReader(_ChunkReader(stdin))
+
+    stdout = _capture_stream()
+    stderr = _capture_stream()
+
+    with _INPROCESS_LOCK, _patched_environ(env or {}):
+        environment = Environment(
+            stdin=stdin,
+            stdin_isatty=False,
+            stdout=stdout,
+            stdout_isatty=False,
+            stderr=stderr,
+            stderr_isatty=False,
+            **_config_dir_override(),
+        )
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            exit_status = main(args=list(args), env=environment)
+
+    return HTTPieResult(
+        _captured_text(stdout),
+        _captured_text(stderr),
+        int(getattr(exit_status, "value", exit_status)),
+    )
+
+
+def _is_chunk_iterable(stdin):
+    """
+    Whether stdin is an iterable of byte chunks rather than data or a file-like object.
+    """
+    return (stdin is not None and not isinstance(stdin, (bytes, str))
+            and not hasattr(stdin, "read") and hasattr(stdin, "__iter__"))
+
+
+class _ChunkReader(io.RawIOBase):
+    """
+    A read-only raw stream over an iterable of byte chunks.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            # A view, so that handing out a large chunk piece by piece copies each byte once.
+            self._pending = memoryview(chunk).cast("B")
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def _capture_stream():
+    """
+    Create a text stream backed by bytes, as HTTPie writes to both layers.
+    """
+    return io.TextIOWrapper(io.BytesIO(), encoding="utf-8", write_through=True)
+
+
+def _captured_text(stream):
+    """
+    Return everything written to a stream created by _capture_stream().
+    """
+    stream.flush()
+    return stream.buffer.getvalue().decode("utf-8", "replace")
+
+
+def _config_dir_override():
+    """
+    Honour HTTPIE_CONFIG_DIR, which HTTPie otherwise only reads at import time.
+    """
+    config_dir = os.environ.get("HTTPIE_CONFIG_DIR")
+    return {"config_dir": Path(config_dir)} if config_dir else {}
+
+
+@contextmanager
+def _patched_environ(overrides):
+    """
+    Temporarily apply environment variable overrides to os.environ.
+    """
+    saved = {key: os.environ.get(key) for key in overrides}
+    os.environ.update({key: str(value) for key, value in overrides.items()})
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
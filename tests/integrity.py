@@ -0,0 +1,204 @@
+import hashlib
+import mmap
+import os
+import subprocess
+import threading
+import time
+import zlib
+
+# Digests computed when no algorithms are given.
+DEFAULT_ALGORITHMS = ("md5", "sha256", "crc32")
+
+# Bytes hashed per step. Large blocks keep the per-call overhead negligible, and
+# hashlib and zlib release the GIL while they work on them.
+BUFFER_SIZE = 4 * 1024 * 1024
+
+# How long a tailer sleeps when it has caught up with the writer.
+POLL_INTERVAL = 0.005
+
+
+class _CRC32:
+    """
+    zlib.crc32 behind the update()/hexdigest() interface of hashlib objects.
+    """
+
+    name = "crc32"
+
+    def __init__(self):
+        self._value = 0
+
+    def update(self, data):
+        self._value = zlib.crc32(data, self._value)
+
+    def hexdigest(self):
+        return f"{self._value:08x}"
+
+
+class MultiDigest:
+    """
+    Computes several digests over the same data in a single pass.
+
+    Any hashlib algorithm name is accepted, plus 'crc32'.
+
+    Attributes:
+        size (int): Number of bytes hashed so far.
+    """
+
+    def __init__(self, algorithms=DEFAULT_ALGORITHMS):
+        self._digests = {
+            name: _CRC32() if name == "crc32" else hashlib.new(name) for name in algorithms
+        }
+        self.size = 0
+
+    def update(self, data):
+        for digest in self._digests.values():
+            digest.update(data)
+        self.size += len(data)
+
+    def hexdigests(self):
+        """
+        Returns:
+            dict: Algorithm name -> hex digest of the data so far.
+        """
+        return {name: digest.hexdigest() for name, digest in self._digests.items()}
+
+
+def digest_chunks(chunks, algorithms=DEFAULT_ALGORITHMS):
+    """
+    Hash an iterable of byte chunks, e.g. a generated payload.
+
+    Returns:
+        dict: Algorithm name -> hex digest.
+    """
+    digest = MultiDigest(algorithms)
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigests()
+
+
+def digest_file(path, algorithms=DEFAULT_ALGORITHMS, buffer_size=BUFFER_SIZE):
+    """
+    Hash a complete file in one pass over a memory map, without copying it into Python.
+
+    Returns:
+        dict: Algorithm name -> hex digest.
+    """
+    digest = MultiDigest(algorithms)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, "madvise"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                with memoryview(mapped) as view:
+                    for offset in range(0, size, buffer_size):
+                        digest.update(view[offset:offset + buffer_size])
+    return digest.hexdigests()
+
+
+def digest_stream(stream, algorithms=DEFAULT_ALGORITHMS, sink=None, buffer_size=BUFFER_SIZE):
+    """
+    Hash a binary stream until EOF, such as HTTPie's stdout pipe, reusing one buffer.
+
+    Args:
+        sink (file-like | None): Also write the data here, so a download can be saved
+            and verified in the same pass.
+
+    Returns:
+        dict: Algorithm name -> hex digest.
+    """
+    digest = MultiDigest(algorithms)
+    buffer = bytearray(buffer_size)
+    with memoryview(buffer) as view:
+        while True:
+            read = stream.readinto(view)
+            if not read:
+                break
+            digest.update(view[:read])
+            if sink is not None:
+                sink.write(view[:read])
+    return digest.hexdigests()
+
+
+def digest_growing_file(path, is_done, algorithms=DEFAULT_ALGORITHMS, buffer_size=BUFFER_SIZE,
+                        poll_interval=POLL_INTERVAL):
+    """
+    Hash a file while another process writes it, following it like `tail -f`.
+
+    Hashing overlaps the transfer, so the digests are ready almost as soon as the
+    writer finishes. The writer must append to the file, as `http --download` does.
+
+    Args:
+        is_done (callable): Returns True once the writer has finished. Data written
+            before that is always hashed.
+
+    Returns:
+        dict | None: Algorithm name -> hex digest, or None when the file never appeared.
+    """
+    while not os.path.exists(path):
+        if is_done() and not os.path.exists(path):
+            return None
+        time.sleep(poll_interval)
+
+    digest = MultiDigest(algorithms)
+    buffer = bytearray(buffer_size)
+    with open(path, "rb", buffering=0) as f, memoryview(buffer) as view:
+        while True:
+            finished = is_done()
+            read = f.readinto(view)
+            if read:
+                digest.update(view[:read])
+            elif finished:
+                break
+            else:
+                time.sleep(poll_interval)
+    return digest.hexdigests()
+
+
+def download_with_digests(url, path, algorithms=DEFAULT_ALGORITHMS, extra_args=()):
+    """
+    Run `http --download -o path url` and hash the file as it is written.
+
+    Returns:
+        tuple: (exit status, stderr text, digests or None).
+    """
+    if os.path.exists(path) and "--continue" not in extra_args:
+        os.remove(path)
+    process = subprocess.Popen(
+        ["http", "--ignore-stdin", "--download", *extra_args, "-o", str(path), "GET", url],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    # Drain stderr on a thread so a chatty HTTPie cannot block on a full pipe.
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+    reader.start()
+    digests = digest_growing_file(str(path), lambda: process.poll() is not None, algorithms)
+    process.wait()
+    reader.join()
+    return process.returncode, stderr[0].decode(errors="replace"), digests
+
+
+def pipe_with_digests(args, algorithms=DEFAULT_ALGORITHMS, output_path=None):
+    """
+    Run an HTTPie command and hash the response body it writes to its stdout pipe.
+
+    When stdout is not a terminal HTTPie writes only the raw body, so the digests are
+    those of the response. With `output_path` the body is saved in the same pass.
+
+    Returns:
+        tuple: (exit status, stderr text, digests).
+    """
+    process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE)
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+    reader.start()
+    if output_path is None:
+        digests = digest_stream(process.stdout, algorithms)
+    else:
+        with open(output_path, "wb") as sink:
+            digests = digest_stream(process.stdout, algorithms, sink=sink)
+    process.stdout.close()
+    process.wait()
+    reader.join()
+    return process.returncode, stderr[0].decode(errors="replace"), digests
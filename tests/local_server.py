@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from werkzeug.serving import make_server
+
+from flask_app.serve import make_request_handler
+
+READINESS_PATH = "/status/200"
+
+
+def _serve_in_process(conn, host):
+    """
+    Child-process entry point: bind an ephemeral port, report it, then serve forever.
+    """
+    from flask_app.app import app
+
+    server = make_server(host, 0, app, threaded=True, request_handler=make_request_handler())
+    conn.send(server.port)
+    conn.close()
+    server.serve_forever()
+
+
+class LocalServer:
+    """
+    Runs the Flask app from flask_app/app.py on an ephemeral port for the test suite.
+
+    The server runs either in a background thread of the current interpreter or in a
+    separate process, which keeps the server off the test process's GIL.
+
+    Attributes:
+        host (str): Interface the server binds to.
+        mode (str): 'thread' or 'process'.
+        port (int | None): The port chosen by the operating system once started.
+    """
+
+    def __init__(self, host="127.0.0.1", mode="thread"):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown server mode: {mode!r}")
+        self.host = host
+        self.mode = mode
+        self.port = None
+        self._server = None
+        self._thread = None
+        self._process = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def pid(self):
+        """
+        Process ID serving requests: the child in process mode, otherwise this process.
+        """
+        return self._process.pid if self._process is not None else os.getpid()
+
+    def start(self, timeout=10.0):
+        """
+        Start the server and block until it answers the readiness probe.
+        """
+        if self.mode == "thread":
+            from flask_app.app import app
+
+            self._server = make_server(self.host, 0, app, threaded=True,
+                                       request_handler=make_request_handler())
+            self.port = self._server.port
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+        else:
+            context = multiprocessing.get_context("spawn")
+            parent_conn, child_conn = context.Pipe()
+            self._process = context.Process(
+                target=_serve_in_process, args=(child_conn, self.host), daemon=True
+            )
+            self._process.start()
+            if not parent_conn.poll(timeout):
+                self.stop()
+                raise RuntimeError("Local Flask server did not report its port in time")
+            self.port = parent_conn.recv()
+        wait_until_ready(self.base_url, timeout=timeout)
+        return self
+
+    def stop(self):
+        """
+        Shut the server down and release its port.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+
+
+def wait_until_ready(base_url, timeout=10.0, path=READINESS_PATH):
+    """
+    Poll the server until it returns 200 for `path`, with a short exponential backoff.
+
+    Raises:
+        RuntimeError: If the server is not ready before `timeout` seconds elapse.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    while True:
+        try:
+            with urllib.request.urlopen(base_url + path, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        if time.monotonic() >= deadline:
+            raise RuntimeError(f"Local Flask server at {base_url} was not ready after {timeout}s")
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
@@ -0,0 +1,200 @@
+import argparse
+import heapq
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Per-test durations recorded by previous runs, used to balance the shards.
+DEFAULT_DURATIONS_PATH = os.path.join(REPO_ROOT, "tests", ".test_durations.json")
+
+# Assumed duration of a test that has never been timed, when nothing else is known.
+DEFAULT_TEST_SECONDS = 1.0
+
+
+def collect_tests(pytest_args=()):
+    """
+    List the node IDs pytest would run, relative to the repository root.
+    """
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "--collect-only", "-q", *pytest_args],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    node_ids = [line for line in result.stdout.splitlines() if "::" in line]
+    if result.returncode not in (0, 5) or (not node_ids and result.returncode != 5):
+        raise RuntimeError(f"Test collection failed:\n{result.stdout}{result.stderr}")
+    return node_ids
+
+
+def load_durations(path=DEFAULT_DURATIONS_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_durations(durations, path=DEFAULT_DURATIONS_PATH):
+    with open(path, "w") as f:
+        json.dump(dict(sorted(durations.items())), f, indent=1)
+        f.write("\n")
+
+
+def schedule(node_ids, durations, shards):
+    """
+    Split tests into `shards` groups of roughly equal total duration.
+
+    Uses the longest-processing-time-first rule: tests are taken from slowest to
+    fastest and each goes to the currently lightest shard. Tests without a recorded
+    time are assumed to take the average of the recorded ones.
+
+    Returns:
+        list: One (estimated seconds, [node IDs in collection order]) tuple per shard.
+    """
+    known = [durations[node_id] for node_id in node_ids if node_id in durations]
+    default = sum(known) / len(known) if known else DEFAULT_TEST_SECONDS
+    order = {node_id: index for index, node_id in enumerate(node_ids)}
+
+    heap = [(0.0, shard, []) for shard in range(shards)]
+    for node_id in sorted(node_ids, key=lambda n: -durations.get(n, default)):
+        total, shard, assigned = heapq.heappop(heap)
+        assigned.append(node_id)
+        heapq.heappush(heap, (total + durations.get(node_id, default), shard, assigned))
+
+    return [
+        (round(total, 3), sorted(assigned, key=order.get))
+        for total, _, assigned in sorted(heap, key=lambda item: item[1])
+        if assigned
+    ]
+
+
+def worker_environment(worker_dir, index):
+    """
+    Build the environment of one worker: its own HTTPie config, sessions and temp area.
+
+    Each worker is a separate pytest process, so the session fixture in conftest.py
+    also gives it its own mock server on its own ephemeral port.
+    """
+    config_dir = os.path.join(worker_dir, "httpie")
+    temp_dir = os.path.join(worker_dir, "tmp")
+    work_dir = os.path.join(worker_dir, "work")
+    for directory in (config_dir, temp_dir, work_dir):
+        os.makedirs(directory, exist_ok=True)
+
+    env = dict(os.environ)
+    env.update({
+        "HTTPIE_TEST_WORKER": str(index),
+        "HTTPIE_CONFIG_DIR": config_dir,
+        "TMPDIR": temp_dir,
+        "HTTPIE_TEST_DURATIONS_OUT": os.path.join(worker_dir, "durations.json"),
+        "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")])),
+    })
+    return env, work_dir
+
+
+def run_shards(shards, base_dir, pytest_args=()):
+    """
+    Run each shard in its own pytest process and wait for all of them.
+
+    Relative paths written by the tests (such as ./test_session.json) land in the
+    worker's own working directory.
+
+    Returns:
+        list: One dict per shard with its exit code, wall time, log path and measured durations.
+    """
+    workers = []
+    for index, (estimate, node_ids) in enumerate(shards):
+        worker_dir = os.path.join(base_dir, f"worker-{index}")
+        env, work_dir = worker_environment(worker_dir, index)
+        log_path = os.path.join(worker_dir, "output.log")
+        args = [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider",
+                f"--rootdir={REPO_ROOT}", *pytest_args,
+                *(os.path.join(REPO_ROOT, node_id) for node_id in node_ids)]
+        with open(log_path, "w") as log:
+            process = subprocess.Popen(args, cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        workers.append({
+            "worker": index,
+            "tests": len(node_ids),
+            "estimated_seconds": estimate,
+            "log": log_path,
+            "process": process,
+            "started": time.monotonic(),
+            "durations_path": os.path.join(worker_dir, "durations.json"),
+        })
+
+    results = []
+    pending = list(workers)
+    while pending:
+        for worker in list(pending):
+            returncode = worker["process"].poll()
+            if returncode is None:
+                continue
+            pending.remove(worker)
+            results.append({
+                "worker": worker["worker"],
+                "tests": worker["tests"],
+                "estimated_seconds": worker["estimated_seconds"],
+                "seconds": round(time.monotonic() - worker["started"], 3),
+                "returncode": returncode,
+                "log": worker["log"],
+                "durations": load_durations(worker["durations_path"]),
+            })
+        time.sleep(0.05)
+    results.sort(key=lambda result: result["worker"])
+    return results
+
+
+def main(argv=None):
+    """
+    Run the test suite sharded across worker processes, balanced by recorded test durations.
+
+    Arguments after `--` are passed to every pytest process, e.g. `-- -k cookie`.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("-n", "--workers", default="auto",
+                        help="Number of worker processes, or 'auto' for one per CPU.")
+    parser.add_argument("--durations-file", default=DEFAULT_DURATIONS_PATH,
+                        help="Recorded per-test durations, updated after every run.")
+    parser.add_argument("--keep", action="store_true", help="Keep the worker directories and logs.")
+    parser.add_argument("--plan", action="store_true", help="Print the shard plan without running it.")
+    parser.add_argument("pytest_args", nargs=argparse.REMAINDER)
+    options = parser.parse_args(argv)
+    pytest_args = [arg for arg in options.pytest_args if arg != "--"]
+    workers = (os.cpu_count() or 1) if options.workers == "auto" else int(options.workers)
+
+    node_ids = collect_tests(pytest_args)
+    durations = load_durations(options.durations_file)
+    shards = schedule(node_ids, durations, max(1, workers))
+    if options.plan:
+        print(json.dumps([{"estimated_seconds": estimate, "tests": ids} for estimate, ids in shards], indent=2))
+        return 0
+
+    base_dir = tempfile.mkdtemp(prefix="httpie-tests-")
+    started = time.monotonic()
+    results = []
+    try:
+        results = run_shards(shards, base_dir, pytest_args)
+        for result in results:
+            durations.update(result.pop("durations"))
+            status = "passed" if result["returncode"] == 0 else f"FAILED (exit {result['returncode']})"
+            print(f"worker {result['worker']}: {result['tests']} tests in {result['seconds']}s "
+                  f"(estimated {result['estimated_seconds']}s) {status}")
+            if result["returncode"] != 0:
+                with open(result["log"]) as f:
+                    sys.stdout.write(f.read())
+        save_durations(durations, options.durations_file)
+        print(f"{len(node_ids)} tests on {len(shards)} worker(s) in {time.monotonic() - started:.1f}s")
+    finally:
+        if options.keep:
+            print(f"Worker directories kept in {base_dir}")
+        else:
+            shutil.rmtree(base_dir, ignore_errors=True)
+    return 0 if results and all(result["returncode"] == 0 for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+import atexit
+import hashlib
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+
+# Payloads are generated in blocks of this size, so memory use does not grow with size.
+BLOCK_SIZE = 1024 * 1024
+
+# File extension of each payload kind, so HTTPie can guess a content type for form uploads.
+EXTENSIONS = {"repeated": ".txt", "random": ".bin", "json": ".json", "csv": ".csv"}
+
+_JSON_PREFIX = b'{"records":['
+_JSON_SUFFIX = (b'],"padding":"', b'"}')
+
+
+def _repeated(size, pattern=b"a"):
+    """
+    Yield `size` bytes of `pattern` repeated.
+    """
+    if isinstance(pattern, str):
+        pattern = pattern.encode()
+    block = pattern * max(1, BLOCK_SIZE // len(pattern))
+    remaining = size
+    while remaining > 0:
+        chunk = block[:remaining]
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _random(size, seed=0):
+    """
+    Yield `size` pseudo-random bytes determined by `seed`.
+    """
+    rng = random.Random(seed)
+    remaining = size
+    while remaining > 0:
+        chunk = rng.randbytes(min(BLOCK_SIZE, remaining))
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _buffered(pieces):
+    """
+    Join small byte strings into blocks of about BLOCK_SIZE.
+    """
+    buffer, buffered = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= BLOCK_SIZE:
+            yield b"".join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def _json_pieces(size, seed):
+    rng = random.Random(seed)
+    minimum = len(_JSON_PREFIX) + len(_JSON_SUFFIX[0]) + len(_JSON_SUFFIX[1])
+    if size < minimum:
+        raise ValueError(f"A JSON payload needs at least {minimum} bytes")
+    yield _JSON_PREFIX
+    written = minimum
+    i = 0
+    while True:
+        record = b'%s{"id":%d,"name":"user-%d","value":%d}' % (
+            b"," if i else b"", i, i, rng.randrange(1000000))
+        if written + len(record) > size:
+            break
+        yield record
+        written += len(record)
+        i += 1
+    # Pad the document to exactly `size` bytes.
+    yield _JSON_SUFFIX[0] + b"x" * (size - written) + _JSON_SUFFIX[1]
+
+
+def _csv_pieces(size, seed):
+    rng = random.Random(seed)
+    header = b"id,name,value\n"
+    if size < len(header) + len(b"0,,0\n"):
+        raise ValueError(f"A CSV payload needs at least {len(header) + 5} bytes")
+    yield header
+    written = len(header)
+    i = 0
+    while True:
+        row = b"%d,user-%d,%d\n" % (i, i, rng.randrange(1000000))
+        if written + len(row) + len(b"%d,,0\n" % (i + 1)) > size:
+            break
+        yield row
+        written += len(row)
+        i += 1
+    # A last row whose name column pads the file to exactly `size` bytes.
+    last = b"%d,,0\n" % i
+    yield b"%d,%s,0\n" % (i, b"x" * (size - written - len(last)))
+
+
+def _json(size, seed=0):
+    """
+    Yield a JSON document of exactly `size` bytes: {"records": [...], "padding": "x..."}.
+    """
+    return _buffered(_json_pieces(size, seed))
+
+
+def _csv(size, seed=0):
+    """
+    Yield CSV rows (id,name,value with a header) totalling exactly `size` bytes.
+    """
+    return _buffered(_csv_pieces(size, seed))
+
+
+GENERATORS = {"repeated": _repeated, "random": _random, "json": _json, "csv": _csv}
+
+
+class PayloadFactory:
+    """
+    Builds deterministic test payloads once and caches them on disk by content hash.
+
+    A payload is described by its kind ('repeated', 'random', 'json' or 'csv'), its
+    size in bytes and the kind's parameters (`pattern` for repeated, `seed` for the
+    others). The same description always yields the same bytes, so a payload is
+    generated once per cache directory and reused by every test that asks for it;
+    identical content requested under different descriptions is stored only once.
+
+    Attributes:
+        cache_dir (str): Where payload files live. By default a temporary directory
+            that is removed at interpreter exit; set HTTPIE_PAYLOAD_CACHE (or pass
+            cache_dir) to keep payloads between runs.
+    """
+
+    def __init__(self, cache_dir=None):
+        cache_dir = cache_dir or os.environ.get("HTTPIE_PAYLOAD_CACHE")
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        else:
+            cache_dir = tempfile.mkdtemp(prefix="httpie-payloads-")
+            atexit.register(shutil.rmtree, cache_dir, ignore_errors=True)
+        self.cache_dir = cache_dir
+        self._index_path = os.path.join(cache_dir, "index.json")
+        self._lock = threading.Lock()
+        self._index = {}
+        if os.path.exists(self._index_path):
+            with open(self._index_path) as f:
+                self._index = json.load(f)
+
+    @staticmethod
+    def _key(kind, size, params):
+        if kind not in GENERATORS:
+            raise ValueError(f"Unknown payload kind {kind!r}; expected one of {sorted(GENERATORS)}")
+        params = {name: value.decode("latin-1") if isinstance(value, bytes) else value
+                  for name, value in params.items()}
+        return json.dumps([kind, size, params], sort_keys=True)
+
+    def iter_chunks(self, kind, size, **params):
+        """
+        Generate a payload block by block without touching the disk, e.g. to pipe it
+        to HTTPie's stdin through run_httpie(..., stdin=factory.iter_chunks(...)).
+        """
+        self._key(kind, size, params)
+        return GENERATORS[kind](size, **params)
+
+    def path(self, kind, size, **params):
+        """
+        Return the path of a cached payload file, generating it on first use.
+        """
+        key = self._key(kind, size, params)
+        with self._lock:
+            name = self._index.get(key)
+            if name is None or not os.path.exists(os.path.join(self.cache_dir, name)):
+                name = self._build(kind, size, params)
+                self._index[key] = name
+                self._save_index()
+        return os.path.join(self.cache_dir, name)
+
+    def sha256(self, kind, size, **params):
+        """
+        Return the SHA-256 hex digest of a payload; cached files are named after it.
+        """
+        return os.path.basename(self.path(kind, size, **params)).split(".")[0]
+
+    def _build(self, kind, size, params):
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".partial")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in GENERATORS[kind](size, **params):
+                    digest.update(chunk)
+                    f.write(chunk)
+            name = digest.hexdigest() + EXTENSIONS[kind]
+            os.replace(temp_path, os.path.join(self.cache_dir, name))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return name
+
+    def _save_index(self):
+        temp_path = self._index_path + ".partial"
+        with open(temp_path, "w") as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, self._index_path)
+
+
+_default_factory = None
+
+
+def payloads():
+    """
+    Return the process-wide PayloadFactory, creating it on first use.
+    """
+    global _default_factory
+    if _default_factory is None:
+        _default_factory = PayloadFactory()
+    return _default_factory
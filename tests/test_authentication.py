@@ -1,38 +1,45 @@
 import unittest
-import subprocess
+import json
+from unittest import mock
+
+from flask_app.app import app
+from flask_app.credentials import CredentialStore, VerifiedCredentialCache, hash_password, verify_password
+from flask_app.tokens import RegistryFull, TokenRegistry
+from tests.httpie_runner import run_httpie
+
+BASE_URL = "http://127.0.0.1:5001"  # Replaced by the session server fixture in conftest.py
 
 class TestAuthentication(unittest.TestCase):
-    BASE_URL = "http://localhost:5001"
 
     def run_httpie_command(self, command):
         """
-        Helper function to run HTTPie commands via subprocess.
+        Helper function to run HTTPie commands via the shared HTTPie runner.
         """
-        return subprocess.run(command, capture_output=True, text=True)
+        return run_httpie(command)
 
     def test_status_102(self):
-        command = ["http", "--check-status", "GET", f"{self.BASE_URL}/status/102"]
+        command = ["http", "--check-status", "GET", f"{BASE_URL}/status/102"]
         process = self.run_httpie_command(command)
         self.assertIn("processing", process.stdout.strip().lower(), "Failed: Expected 102 no content")
 
     def test_status_200(self):
-        command = ["http", "--check-status", "GET", f"{self.BASE_URL}/status/200"]
+        command = ["http", "--check-status", "GET", f"{BASE_URL}/status/200"]
         process = self.run_httpie_command(command)
         self.assertIn('SUCCESS', process.stdout.upper(), "Failed: Expected Success JSON message in response")
 
     def test_status_302(self):
-        command = ["http", "--follow", "GET", f"{self.BASE_URL}/status/302"]
+        command = ["http", "--follow", "GET", f"{BASE_URL}/status/302"]
         process = self.run_httpie_command(command)
         self.assertIn('SUCCESS', process.stdout.upper(), "Failed: Expected success message in the redirected response")
 
     def test_status_404(self):
-        command = ["http", "--check-status", "GET", f"{self.BASE_URL}/status/404"]
+        command = ["http", "--check-status", "GET", f"{BASE_URL}/status/404"]
         process = self.run_httpie_command(command)
         self.assertIn('NOT FOUND', process.stdout.upper(), "Failed: Expected 'NOT FOUND' error message in response")
         self.assertIn('404', process.stderr.upper(), "Failed: Expected '404' error message in response")
 
     def test_status_500(self):
-        command = ["http", "--check-status", "GET", f"{self.BASE_URL}/status/500"]
+        command = ["http", "--check-status", "GET", f"{BASE_URL}/status/500"]
         process = self.run_httpie_command(command)
         self.assertIn('INTERNAL SERVER ERROR', process.stdout.upper(), "Failed: Expected 'INTERNAL SERVER ERROR' error message in response")
         self.assertIn('500', process.stderr.upper(), "Failed: Expected '500' error message in response")
@@ -41,17 +48,124 @@ class TestAuthentication(unittest.TestCase):
         """
         Tests HTTPie's support for Basic Authentication.
         """
-        url = f"{self.BASE_URL}/test/basic-auth"
+        url = f"{BASE_URL}/test/basic-auth"
 
         # Test correct credentials
         result = self.run_httpie_command(["http", "--auth", "user1:password", "GET", url])
-        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.exit_status, 0)
         self.assertIn("Basic Auth successful", result.stdout)
 
         # Test incorrect credentials
         result = self.run_httpie_command(["http", "--auth", "wrong:creds", "GET", url])
-        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.exit_status, 0)
+        self.assertIn("Unauthorized", result.stdout)
+
+    def test_credential_cache(self):
+        """
+        Tests the hashed credential store and its cache of verified credentials.
+
+        - PBKDF2 and scrypt records verify only the right password.
+        - Repeated valid credentials are answered from the cache; wrong passwords are
+          never cached, a changed password invalidates the entry, and entries expire
+          and are evicted least recently used first.
+        - Through HTTPie, only the first of three Basic Auth requests misses the cache.
+        """
+        for algorithm in ("pbkdf2_sha256", "scrypt"):
+            record = hash_password("secret", algorithm, iterations=1000)
+            self.assertTrue(verify_password("secret", record))
+            self.assertFalse(verify_password("Secret", record))
+        self.assertFalse(verify_password("secret", "pbkdf2_sha256$broken"))
+
+        store = CredentialStore(cache=VerifiedCredentialCache(max_entries=1))
+        store.add_user("alice", "a-pass", iterations=1000)
+        store.add_user("bob", "b-pass", iterations=1000)
+        self.assertFalse(store.verify("alice", "wrong"))
+        self.assertFalse(store.verify("nobody", "a-pass"))
+        self.assertTrue(store.verify("alice", "a-pass"))
+        self.assertTrue(store.verify("alice", "a-pass"))
+        self.assertEqual((store.cache.hits, store.cache.misses), (1, 2))
+        self.assertTrue(store.verify("bob", "b-pass"))  # Evicts alice.
+        self.assertTrue(store.verify("alice", "a-pass"))
+        self.assertEqual(store.cache.hits, 1)
+        store.add_user("alice", "new-pass", iterations=1000)
+        self.assertFalse(store.verify("alice", "a-pass"))
+
+        # Unknown users are checked against a record as costly as the stored ones.
+        scrypt_store = CredentialStore({"carol": hash_password("c-pass", "scrypt")})
+        self.assertTrue(scrypt_store._dummy_record.startswith("scrypt$16384$8$1$"))
+        self.assertFalse(store.verify("nobody", ""))
+        self.assertTrue(store._dummy_record.startswith("pbkdf2_sha256$1000$"))
+
+        store = CredentialStore(cache=VerifiedCredentialCache(ttl=0))
+        store.add_user("alice", "a-pass", iterations=1000)
+        self.assertTrue(store.verify("alice", "a-pass"))
+        self.assertTrue(store.verify("alice", "a-pass"))
+        self.assertEqual((store.cache.hits, store.cache.expired), (0, 1))
+
+        self.run_httpie_command(["http", "POST", f"{BASE_URL}/debug/auth-cache/reset"])
+        for _ in range(3):
+            result = self.run_httpie_command(["http", "--auth", "user1:password", "GET", f"{BASE_URL}/test/basic-auth"])
+            self.assertIn("Basic Auth successful", result.stdout)
+        result = self.run_httpie_command(["http", "--auth", "user1:wrong", "GET", f"{BASE_URL}/test/basic-auth"])
         self.assertIn("Unauthorized", result.stdout)
+        stats = json.loads(self.run_httpie_command(["http", "--body", "GET", f"{BASE_URL}/debug/auth-cache"]).stdout)
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
+
+    def test_bearer_tokens(self):
+        """
+        Tests issuing, expiring and revoking bearer tokens for /test/headers.
+
+        - With a controlled clock, tokens expire after their ttl: lazily when looked up
+          and in bulk when swept. Revoked, malformed and unknown tokens are rejected,
+          expired tokens cannot be revoked, and issuing beyond the capacity fails.
+        - Through HTTPie, a token from POST /tokens is accepted by /test/headers until
+          it is revoked; a ttl or count that is not an integer is a 400.
+        - /tokens is refused on a server with several worker processes.
+        """
+        now = [1000000.0]
+        registry = TokenRegistry(capacity=5, clock=lambda: now[0])
+        registry.add_static("sampletoken")
+        (short,), _ = registry.issue(ttl=10)
+        long_lived, expires = registry.issue(ttl=100, count=3)
+        self.assertEqual(expires, 1000100)
+        self.assertEqual(len(registry), 4)
+        self.assertTrue(all(registry.is_valid(token) for token in [short, *long_lived, "sampletoken"]))
+        self.assertFalse(registry.is_valid(("B" if short[0] == "A" else "A") + short[1:]))
+        self.assertFalse(registry.is_valid("not-a-token"))
+        with self.assertRaises(RegistryFull):
+            registry.issue(count=2)
+        with self.assertRaises(ValueError):
+            registry.issue(ttl=0)
+
+        now[0] += 10
+        self.assertFalse(registry.is_valid(short))
+        self.assertEqual((len(registry), registry.evicted), (3, 1))
+        self.assertTrue(registry.revoke(long_lived[0]))
+        self.assertFalse(registry.revoke(long_lived[0]))
+        self.assertFalse(registry.is_valid(long_lived[0]))
+        now[0] += 100
+        self.assertFalse(registry.revoke(long_lived[1]))  # Expired, not yet swept.
+        self.assertEqual(registry.sweep(), 2)
+        self.assertEqual(len(registry), 0)
+        self.assertTrue(registry.is_valid("sampletoken"))
+
+        result = self.run_httpie_command(["http", "--body", "POST", f"{BASE_URL}/tokens", "ttl==60"])
+        token = json.loads(result.stdout)["access_token"]
+        url = f"{BASE_URL}/test/headers"
+        result = self.run_httpie_command(["http", "--check-status", "GET", url, f"Authorization:Bearer {token}"])
+        self.assertEqual(result.exit_status, 0, result.stderr)
+        result = self.run_httpie_command(["http", "--check-status", "DELETE", f"{BASE_URL}/tokens/{token}"])
+        self.assertEqual(result.exit_status, 0, result.stderr)
+        result = self.run_httpie_command(["http", "--check-status", "GET", url, f"Authorization:Bearer {token}"])
+        self.assertEqual(result.exit_status, 4)
+        for query in ("ttl=soon", "count=2.5"):
+            self.assertEqual(app.test_client().post(f"/tokens?{query}").status_code, 400, query)
+
+        # A token would only be known to the worker process that issued it.
+        with mock.patch("flask_app.serve._workers", 4):
+            client = app.test_client()
+            self.assertEqual(client.post("/tokens").status_code, 501)
+            self.assertEqual(client.delete(f"/tokens/{token}").status_code, 501)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,10 @@
 import unittest
-import subprocess
 import json
+from urllib.parse import urlparse
+
+from tests.httpie_runner import run_httpie
+
+HTTPBIN_URL = "https://httpbin.org"  # Replaced by the session server fixture in conftest.py
 
 
 class TestCommandLineArguments(unittest.TestCase):
@@ -12,15 +16,15 @@ class TestCommandLineArguments(unittest.TestCase):
     def run_httpie_command(self, args):
         """Helper function to run an HTTPie command and parse JSON response.
 
-        - Uses subprocess to execute HTTPie CLI commands.
+        - Uses the shared HTTPie runner (in-process unless HTTPIE_RUNNER=subprocess).
         - Parses the response as JSON if possible; otherwise, returns the raw output.
         """
-        result = subprocess.run(args, capture_output=True, text=True)
+        stdout, stderr, exit_status = run_httpie(args)
         # Check if result is JSON and only then parse, else return raw output
         try:
-            return json.loads(result.stdout) if result.returncode == 0 else result.stderr
+            return json.loads(stdout) if exit_status == 0 else stderr
         except json.JSONDecodeError:
-            return result.stdout  # Return raw text for non-JSON responses
+            return stdout  # Return raw text for non-JSON responses
 
     def test_01_get_request(self):
         """Test a basic GET request to verify response structure.
@@ -28,9 +32,9 @@ class TestCommandLineArguments(unittest.TestCase):
         - Uses HTTPie to perform a GET request to a test URL.
         - Confirms that the request URL in the response matches the intended URL.
         """
-        response = self.run_httpie_command(['http', 'GET', 'https://httpbin.org/get'])
+        response = self.run_httpie_command(['http', 'GET', f'{HTTPBIN_URL}/get'])
         if isinstance(response, dict):
-            self.assertEqual(response['url'], 'https://httpbin.org/get')
+            self.assertEqual(response['url'], f'{HTTPBIN_URL}/get')
 
     def test_02_post_request_with_json(self):
         """Test a POST request with JSON payload.
@@ -39,7 +43,7 @@ class TestCommandLineArguments(unittest.TestCase):
         - Verifies that the JSON data received matches the sent data.
         """
         response = self.run_httpie_command([
-            'http', 'POST', 'https://httpbin.org/post',
+            'http', 'POST', f'{HTTPBIN_URL}/post',
             'name=John', 'age:=30', 'married:=true'
         ])
         if isinstance(response, dict) and 'json' in response:
@@ -52,7 +56,7 @@ class TestCommandLineArguments(unittest.TestCase):
         - Verifies that the headers in the response match the expected values.
         """
         response = self.run_httpie_command([
-            'http', 'GET', 'https://httpbin.org/headers',
+            'http', 'GET', f'{HTTPBIN_URL}/headers',
             'X-API-Token:123', 'Authorization:Bearer token123'
         ])
         if isinstance(response, dict) and 'headers' in response:
@@ -66,7 +70,7 @@ class TestCommandLineArguments(unittest.TestCase):
         - Confirms that authentication succeeds and returns the expected response.
         """
         response = self.run_httpie_command([
-            'http', '-a', 'user:password', 'https://httpbin.org/basic-auth/user/password'
+            'http', '-a', 'user:password', f'{HTTPBIN_URL}/basic-auth/user/password'
         ])
         if isinstance(response, dict):
             self.assertTrue(response.get('authenticated', False))
@@ -78,12 +82,12 @@ class TestCommandLineArguments(unittest.TestCase):
         - Checks for expected HTTP request headers in verbose output.
         """
         result = self.run_httpie_command([
-            'http', '--verbose', 'GET', 'https://httpbin.org/get'
+            'http', '--verbose', 'GET', f'{HTTPBIN_URL}/get'
         ])
         # Ensure raw output mode for non-JSON verbose response
         if isinstance(result, str):  # Verbose mode outputs text, not JSON
             self.assertIn('GET /get HTTP/1.1', result)
-            self.assertIn('Host: httpbin.org', result)
+            self.assertIn(f'Host: {urlparse(HTTPBIN_URL).netloc}', result)
         else:
             self.fail("Verbose mode output not as expected")
 
@@ -94,7 +98,7 @@ class TestCommandLineArguments(unittest.TestCase):
         - Verifies that session data is stored correctly across requests.
         """
         response = self.run_httpie_command([
-            'http', '--session=test_session', '--ignore-stdin', 'POST', 'https://httpbin.org/post',
+            'http', '--session=test_session', '--ignore-stdin', 'POST', f'{HTTPBIN_URL}/post',
             'key=value'
         ])
         if isinstance(response, dict) and 'json' in response:
@@ -110,7 +114,7 @@ class TestCommandLineArguments(unittest.TestCase):
         - Confirms the correct structure of the HTTP request without network transmission.
         """
         result = self.run_httpie_command([
-            'http', '--offline', '--ignore-stdin', '--json', 'POST', 'https://httpbin.org/post', 'name=OfflineUser'
+            'http', '--offline', '--ignore-stdin', '--json', 'POST', f'{HTTPBIN_URL}/post', 'name=OfflineUser'
         ])
 
         # Check for correct HTTP structure in offline mode
@@ -127,7 +131,7 @@ class TestCommandLineArguments(unittest.TestCase):
         - Verifies that the stream completes successfully and contains valid JSON.
         """
         result = self.run_httpie_command([
-            'http', '--stream', 'GET', 'https://httpbin.org/stream/20'
+            'http', '--stream', 'GET', f'{HTTPBIN_URL}/stream/20'
         ])
 
         if isinstance(result, str):  # Streaming outputs raw text
@@ -150,19 +154,19 @@ class TestCommandLineArguments(unittest.TestCase):
         - Verifies that the final redirected URL matches the expected endpoint.
         """
         response = self.run_httpie_command([
-            'http', '--follow', 'https://httpbin.org/redirect/3'
+            'http', '--follow', f'{HTTPBIN_URL}/redirect/3'
         ])
         if isinstance(response, dict):
-            self.assertEqual(response['url'], 'https://httpbin.org/get')  # Final URL after redirects
+            self.assertEqual(response['url'], f'{HTTPBIN_URL}/get')  # Final URL after redirects
 
     def test_10_empty_json_payload(self):
         """Test a POST request with an empty JSON object."""
-        response = self.run_httpie_command(['http', 'POST', 'https://httpbin.org/post', '{}'])
+        response = self.run_httpie_command(['http', 'POST', f'{HTTPBIN_URL}/post', '{}'])
         self.assertIn('{}', response)  # Adjust assertion to expected response content
 
     def test_11_no_headers(self):
         """Test a GET request with no headers."""
-        response = self.run_httpie_command(['http', 'GET', 'https://httpbin.org/headers'])
+        response = self.run_httpie_command(['http', 'GET', f'{HTTPBIN_URL}/headers'])
         self.assertNotIn('Authorization', response)  # Ensure no headers are sent
 
     def test_12_header_count_below_limit(self):
@@ -173,7 +177,7 @@ class TestCommandLineArguments(unittest.TestCase):
           with a moderate number of headers.
         """
         headers = ['Header{}:Value{}'.format(i, i) for i in range(1, 15)]  # 14 headers
-        response = self.run_httpie_command(['http', 'GET', 'https://httpbin.org/headers'] + headers)
+        response = self.run_httpie_command(['http', 'GET', f'{HTTPBIN_URL}/headers'] + headers)
         if isinstance(response, dict) and 'headers' in response:
             self.assertEqual(response['headers'].get('Header14'), 'Value14')  # Check the last header
 
@@ -185,7 +189,7 @@ class TestCommandLineArguments(unittest.TestCase):
           This tests the boundary of header handling without exceeding typical server limits.
         """
         headers = ['Header{}:Value{}'.format(i, i) for i in range(1, 21)]  # 20 headers (assumed limit)
-        response = self.run_httpie_command(['http', 'GET', 'https://httpbin.org/headers'] + headers)
+        response = self.run_httpie_command(['http', 'GET', f'{HTTPBIN_URL}/headers'] + headers)
         if isinstance(response, dict) and 'headers' in response:
             self.assertEqual(response['headers'].get('Header20'), 'Value20')  # Check the last header
 
@@ -198,7 +202,7 @@ class TestCommandLineArguments(unittest.TestCase):
         error_detected = False
         for count in range(10, 101, 10):  # Incrementing header count from 10 to 100
             headers = ['Header{}:Value{}'.format(i, i) for i in range(1, count + 1)]
-            response = self.run_httpie_command(['http', 'GET', 'https://httpbin.org/headers'] + headers)
+            response = self.run_httpie_command(['http', 'GET', f'{HTTPBIN_URL}/headers'] + headers)
 
             # Check for error response
             if "error" in response or isinstance(response, str):
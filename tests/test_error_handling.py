@@ -1,6 +1,15 @@
 import unittest
-import subprocess
 import json
+import socket
+import time
+import urllib.request
+
+from flask import Flask
+
+from flask_app.shaping import PARK_BODY_LIMIT, ResponseShaper
+from tests.httpie_runner import run_httpie
+
+BASE_URL = "http://127.0.0.1:5001"  # Replaced by the session server fixture in conftest.py
 
 
 class TestHTTPieIntegration(unittest.TestCase):
@@ -10,28 +19,22 @@ class TestHTTPieIntegration(unittest.TestCase):
 
     def run_httpie(self, method, url, allow_redirects=True):
         """
-        Helper to run HTTPie commands via subprocess.
+        Helper to run HTTPie commands via the shared HTTPie runner.
         """
         try:
             args = ['http', method, url]
             if not allow_redirects:
                 # Do not include --follow if redirects should not be followed
                 args.append('--headers')  # Adds extra detail to verify status codes
-            result = subprocess.run(
-                args,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            return result.stdout, result.stderr, result.returncode
-        except FileNotFoundError:
+            return run_httpie(args)
+        except (FileNotFoundError, ImportError):
             self.fail("HTTPie is not installed or not in PATH")
 
     def test_100_informational_httpie(self):
         """
         Test 102 Processing response using HTTPie.
         """
-        stdout, stderr, returncode = self.run_httpie('GET', 'http://localhost:5001/status/102')
+        stdout, stderr, returncode = self.run_httpie('GET', f'{BASE_URL}/status/102')
 
         # HTTPie should succeed in sending the request (returncode = 0)
         self.assertEqual(returncode, 0)
@@ -44,7 +47,7 @@ class TestHTTPieIntegration(unittest.TestCase):
         """
         Test 200 OK response using HTTPie.
         """
-        stdout, stderr, returncode = self.run_httpie('GET', 'http://localhost:5001/status/200')
+        stdout, stderr, returncode = self.run_httpie('GET', f'{BASE_URL}/status/200')
         self.assertEqual(returncode, 0)
         response_json = json.loads(stdout)
         self.assertEqual(response_json, {"message": "Success"})
@@ -53,7 +56,7 @@ class TestHTTPieIntegration(unittest.TestCase):
         """
         Test 302 Found response using HTTPie without following redirects.
         """
-        stdout, stderr, returncode = self.run_httpie('GET', 'http://localhost:5001/status/302', allow_redirects=False)
+        stdout, stderr, returncode = self.run_httpie('GET', f'{BASE_URL}/status/302', allow_redirects=False)
 
         # HTTPie should succeed in sending the request
         self.assertEqual(returncode, 0)
@@ -66,7 +69,7 @@ class TestHTTPieIntegration(unittest.TestCase):
         """
         Test 404 Not Found response using HTTPie.
         """
-        stdout, stderr, returncode = self.run_httpie('GET', 'http://localhost:5001/status/404')
+        stdout, stderr, returncode = self.run_httpie('GET', f'{BASE_URL}/status/404')
         self.assertEqual(returncode, 0)
         response_json = json.loads(stdout)
         self.assertEqual(response_json, {"error": "Not Found"})
@@ -75,7 +78,7 @@ class TestHTTPieIntegration(unittest.TestCase):
         """
         Test 500 Internal Server Error response using HTTPie.
         """
-        stdout, stderr, returncode = self.run_httpie('GET', 'http://localhost:5001/status/500')
+        stdout, stderr, returncode = self.run_httpie('GET', f'{BASE_URL}/status/500')
 
         # HTTPie should succeed in sending the request
         self.assertEqual(returncode, 0)
@@ -84,6 +87,116 @@ class TestHTTPieIntegration(unittest.TestCase):
         response_json = json.loads(stdout)
         self.assertEqual(response_json, {"error": "Internal Server Error"})
 
+    def test_retry_after_statuses_httpie(self):
+        """
+        Test 429 Too Many Requests and 503 Service Unavailable responses advertise Retry-After.
+        """
+        for code, phrase in ((429, 'too many requests'), (503, 'service unavailable')):
+            with self.subTest(status=code):
+                stdout, stderr, returncode = self.run_httpie('GET', f'{BASE_URL}/status/{code}', allow_redirects=False)
+                self.assertEqual(returncode, 0)
+                response_output = stdout.lower()
+                self.assertIn(f'{code} {phrase}', response_output)
+                self.assertIn('retry-after: 1', response_output)
+
+    def test_unknown_status_code_httpie(self):
+        """
+        Test that a non-standard status code is rejected with a 400 error.
+        """
+        stdout, stderr, returncode = self.run_httpie('GET', f'{BASE_URL}/status/999')
+        self.assertEqual(returncode, 0)
+        self.assertEqual(json.loads(stdout), {"error": "Unknown status code"})
+
+    def test_slow_responses_httpie(self):
+        """
+        Test the /delay and /drip routes and the X-Shape-* headers against HTTPie's --timeout.
+
+        - A delay longer than --timeout makes HTTPie exit with its timeout status (2).
+        - /drip sends exactly numbytes bytes, at most PARK_BODY_LIMIT; shaping headers
+          delay any route.
+        - A hundred delayed responses held at once all complete.
+        - Without the pooled server's scheduler, the app sleeps in the request thread.
+        """
+        stdout, stderr, returncode = run_httpie(['http', '--ignore-stdin', '--timeout=0.3', f'{BASE_URL}/delay/2'])
+        self.assertEqual(returncode, 2)
+        self.assertIn('timed out', stderr)
+
+        stdout, stderr, returncode = run_httpie(['http', '--ignore-stdin', '--timeout=5', f'{BASE_URL}/delay/0.2', 'a==1'])
+        self.assertEqual(returncode, 0, stderr)
+        self.assertEqual(json.loads(stdout)['args'], {'a': '1'})
+
+        stdout, stderr, returncode = run_httpie(['http', '--ignore-stdin', '--stream', '--body', f'{BASE_URL}/drip',
+                                                 'numbytes==5', 'duration==0.2', 'delay==0'])
+        self.assertEqual((returncode, stdout), (0, '*****'), stderr)
+        url = f'{BASE_URL}/drip?numbytes={2 * PARK_BODY_LIMIT}&duration=0&delay=0'
+        with urllib.request.urlopen(url, timeout=10) as response:
+            self.assertEqual(len(response.read()), PARK_BODY_LIMIT)
+
+        start = time.perf_counter()
+        stdout, stderr, returncode = run_httpie(['http', '--ignore-stdin', '--body', f'{BASE_URL}/stream/3',
+                                                 'X-Shape-Latency:0.2', 'X-Shape-Bandwidth:4096'])
+        self.assertEqual(returncode, 0, stderr)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+        self.assertEqual([json.loads(line)['id'] for line in stdout.splitlines()], [0, 1, 2])
+
+        for header in ('X-Shape-Latency:soon', 'X-Shape-Bandwidth:inf', 'X-Shape-Latency:nan'):
+            with self.subTest(header=header):
+                stdout, stderr, returncode = run_httpie(['http', '--ignore-stdin', '--check-status', f'{BASE_URL}/get', header])
+                self.assertEqual(returncode, 4, stdout)
+                self.assertIn(f'{header.split(":")[0]} must be a number', stdout)
+
+        host, port = BASE_URL.split("//")[1].rsplit(":", 1)
+        connections = []
+        try:
+            for _ in range(100):
+                connection = socket.create_connection((host, int(port)), timeout=30)
+                connection.sendall(b"GET /delay/0.5 HTTP/1.1\r\nHost: test\r\n\r\n")
+                connections.append(connection)
+            for connection in connections:
+                response = b"".join(iter(lambda: connection.recv(65536), b""))
+                self.assertTrue(response.startswith(b"HTTP/1.1 200 OK\r\n"), response[:100])
+                self.assertIn(b"Connection: close\r\n", response)
+        finally:
+            for connection in connections:
+                connection.close()
+
+        app = Flask(__name__)
+        app.add_url_rule('/hello', 'hello', lambda: 'hello')
+        ResponseShaper(app)
+        start = time.perf_counter()
+        response = app.test_client().get('/hello', headers={'X-Shape-Latency': '0.1', 'X-Shape-Bandwidth': '50'})
+        self.assertEqual(response.data, b'hello')
+        self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+
+    def test_shaped_streamed_routes_httpie(self):
+        """
+        Test that the X-Shape-* headers slow down streamed routes without breaking them.
+
+        - /test/csv streams rows from a request context and, with stream=duplex, reads
+          the request body while it responds; both must return every row.
+        - A streamed body larger than what is parked is paced from the request thread.
+        """
+        rows = 5000
+        csv_body = "id,name\n" + "".join(f"{i},name-{i}\n" for i in range(rows))
+        for mode in ('1', 'duplex'):
+            with self.subTest(stream=mode):
+                start = time.perf_counter()
+                stdout, stderr, returncode = run_httpie(
+                    ['http', '--body', 'POST', f'{BASE_URL}/test/csv', f'stream=={mode}',
+                     'Content-Type:text/csv', 'X-Shape-Latency:0.2'],
+                    stdin=csv_body,
+                )
+                self.assertEqual(returncode, 0, stderr)
+                self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+                lines = stdout.splitlines()
+                self.assertEqual(len(lines), rows)
+                self.assertEqual(json.loads(lines[-1]), {"id": str(rows - 1), "name": f"name-{rows - 1}"})
+
+        request = urllib.request.Request(f'{BASE_URL}/bytes/{PARK_BODY_LIMIT * 2}',
+                                         headers={'X-Shape-Bandwidth': str(PARK_BODY_LIMIT * 50)})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            self.assertEqual(len(response.read()), PARK_BODY_LIMIT * 2)
+
 
 if __name__ == "__main__":
     unittest.main()
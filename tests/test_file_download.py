@@ -1,9 +1,23 @@
 import unittest
-import hashlib
 import shutil
+import os
 import subprocess
+import tempfile
 from pathlib import Path
 
+from flask_app.downloads import files_directory, iter_pattern, write_pattern_file
+from tests.httpie_runner import run_httpie
+from tests.integrity import (
+    digest_chunks, digest_file, download_with_digests, pipe_with_digests
+)
+
+BASE_URL = "http://127.0.0.1:5001"  # Replaced by the session server fixture in conftest.py
+HTTPBIN_URL = "https://httpbin.org"  # Replaced by the session server fixture in conftest.py
+
+# MD5 of the /image/jpeg served by httpbin.org and by the local Flask app
+REMOTE_JPEG_MD5 = 'a27095e7727c70909c910cefe16d30de'
+LOCAL_JPEG_MD5 = 'c3f42bc0d773ba06d98abcc3bf633fc3'
+
 
 class TestFileDownloadWithHTTPie(unittest.TestCase):
     """
@@ -11,21 +25,10 @@ class TestFileDownloadWithHTTPie(unittest.TestCase):
     and then cleaning up the temporary directory.
     """
 
-    def calculate_md5(self, file_path):
-        """Helper function to calculate the MD5 checksum of a file.
-        This is used to verify the integrity of the downloaded file.
-        """
-        md5_hash = hashlib.md5()
-        with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                md5_hash.update(byte_block)
-        return md5_hash.hexdigest()
-
     def setUp(self):
-        # Set up the temporary directory path within the test directory
-        # This ensures isolation for each test run and easy cleanup.
-        self.temp_dir = Path(__file__).parent / "temp_download"
-        self.temp_dir.mkdir(exist_ok=True)
+        # A fresh directory per test, under the worker's TMPDIR when run by
+        # tests/parallel_runner.py, so concurrent runs never share or delete each other's files.
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="temp_download-"))
 
     def test_download_file_with_md5_check(self):
         """Test downloading a file using HTTPie, verifying it, and cleaning up.
@@ -35,7 +38,7 @@ class TestFileDownloadWithHTTPie(unittest.TestCase):
         - After the download, the test checks if the file exists and verifies its MD5 checksum
           against an expected hash value to ensure integrity.
         """
-        url = 'https://httpbin.org/image/jpeg'  # Replace with the actual URL of the image
+        url = f'{HTTPBIN_URL}/image/jpeg'
         download_path = self.temp_dir / "jpeg.jpg"
 
         # Use HTTPie to perform a GET request and download the file
@@ -50,10 +53,92 @@ class TestFileDownloadWithHTTPie(unittest.TestCase):
         self.assertTrue(download_path.exists(), "Downloaded file does not exist.")
 
         # Verify the downloaded file's MD5 checksum for data integrity
-        expected_md5sum = 'a27095e7727c70909c910cefe16d30de'  # MD5 of the uploaded image
-        downloaded_md5sum = self.calculate_md5(download_path)
+        expected_md5sum = REMOTE_JPEG_MD5 if HTTPBIN_URL == 'https://httpbin.org' else LOCAL_JPEG_MD5
+        downloaded_md5sum = digest_file(download_path, ['md5'])['md5']
         self.assertEqual(downloaded_md5sum, expected_md5sum, "MD5 checksum does not match.")
 
+    def test_download_bytes_and_resume(self):
+        """Test downloading generated bytes and resuming a partial download.
+
+        - /bytes/<n> streams a deterministic body, so the expected MD5 is computed locally.
+        - A file holding the first part of the body is completed with `--download --continue`,
+          which sends a Range request and appends the 206 response.
+        """
+        size = 3 * 1024 * 1024 + 17
+        url = f'{BASE_URL}/bytes/{size}?seed=7'
+        expected = digest_chunks(iter_pattern(0, size, seed=7))
+
+        download_path = self.temp_dir / "bytes.bin"
+        _, stderr, exit_status = run_httpie(['http', '--download', '-o', str(download_path), 'GET', url])
+        self.assertEqual(exit_status, 0, f"HTTPie download failed: {stderr}")
+        self.assertEqual(digest_file(download_path), expected)
+
+        partial_path = self.temp_dir / "partial.bin"
+        with open(partial_path, "wb") as f:
+            f.write(b"".join(iter_pattern(0, 1024 * 1024 + 5, seed=7)))
+        _, stderr, exit_status = run_httpie(
+            ['http', '--download', '--continue', '-o', str(partial_path), 'GET', url])
+        self.assertEqual(exit_status, 0, f"HTTPie resume failed: {stderr}")
+        self.assertEqual(os.path.getsize(partial_path), size)
+        self.assertEqual(digest_file(partial_path), expected)
+
+    def test_file_range_requests(self):
+        """Test Range, If-Range and resumed downloads against /files/<name>.
+
+        - A satisfiable range returns 206 with Content-Range; one past the end returns 416.
+        - A stale If-Range validator returns the whole file with 200.
+        """
+        size = 2 * 1024 * 1024 + 3
+        name = f"range-{os.getpid()}.bin"
+        path = write_pattern_file(os.path.join(files_directory(), name), size, seed=1)
+        self.addCleanup(os.remove, path)
+        url = f'{BASE_URL}/files/{name}'
+
+        stdout, _, _ = run_httpie(['http', '--headers', 'GET', url, 'Range:bytes=100-199'])
+        self.assertIn('206 PARTIAL CONTENT', stdout)
+        self.assertIn(f'Content-Range: bytes 100-199/{size}', stdout)
+        self.assertIn('Content-Length: 100', stdout)
+        self.assertIn('Accept-Ranges: bytes', stdout)
+
+        stdout, _, _ = run_httpie(['http', '--headers', 'GET', url, f'Range:bytes={size}-'])
+        self.assertIn('416 REQUESTED RANGE NOT SATISFIABLE', stdout)
+        self.assertIn(f'Content-Range: bytes */{size}', stdout)
+
+        stdout, _, _ = run_httpie(['http', '--headers', 'GET', url, 'Range:bytes=0-9', 'If-Range:"stale"'])
+        self.assertIn('200 OK', stdout)
+        self.assertIn(f'Content-Length: {size}', stdout)
+
+        download_path = self.temp_dir / name
+        with open(path, "rb") as source, open(download_path, "wb") as f:
+            f.write(source.read(size // 3))
+        _, stderr, exit_status = run_httpie(
+            ['http', '--download', '--continue', '-o', str(download_path), 'GET', url])
+        self.assertEqual(exit_status, 0, f"HTTPie resume failed: {stderr}")
+        self.assertEqual(digest_file(download_path), digest_file(path))
+
+    def test_digests_while_downloading(self):
+        """Test verifying a download while it streams in.
+
+        - The output file of `http --download` is hashed as HTTPie writes it.
+        - The body HTTPie writes to a stdout pipe is hashed and saved in the same pass.
+        - Both must match the MD5, SHA-256 and CRC32 of the generated content.
+        """
+        size = 5 * 1024 * 1024 + 11
+        url = f'{BASE_URL}/bytes/{size}?seed=3'
+        expected = digest_chunks(iter_pattern(0, size, seed=3))
+
+        download_path = self.temp_dir / "tailed.bin"
+        exit_status, stderr, digests = download_with_digests(url, download_path)
+        self.assertEqual(exit_status, 0, f"HTTPie download failed: {stderr}")
+        self.assertEqual(digests, expected)
+
+        piped_path = self.temp_dir / "piped.bin"
+        exit_status, stderr, digests = pipe_with_digests(
+            ['http', '--ignore-stdin', 'GET', url], output_path=piped_path)
+        self.assertEqual(exit_status, 0, f"HTTPie request failed: {stderr}")
+        self.assertEqual(digests, expected)
+        self.assertEqual(digest_file(piped_path), expected)
+
     def tearDown(self):
         # Clean up by deleting the temporary directory and its contents.
         # This ensures no leftover files between tests.
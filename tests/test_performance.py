@@ -1,10 +1,54 @@
-import subprocess
 import unittest
-import multiprocessing
+import gzip
+import http.client
+import io
 import json
+import os
+import socket
 import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+from unittest import mock
 
-BASE_URL = "http://127.0.0.1:5001"  # URL of the running Flask app
+from flask import Flask
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.test import Client
+
+from benchmarks.bench_keepalive import scrape_connections
+from benchmarks.history import append_record, compare_records, load_history
+from benchmarks.loadgen import run_load
+from flask_app.compression import INFLATE_OUTPUT_SIZE, DecompressingInput, RequestDecompressor
+from flask_app.downloads import files_directory, write_pattern_file
+from flask_app.profiling import RequestProfiler
+from flask_app.serve import PooledWSGIServer, make_request_handler
+from tests.httpie_runner import run_httpie
+from tests.payloads import payloads
+
+BASE_URL = "http://127.0.0.1:5001"  # Replaced by the session server fixture in conftest.py
+HTTPBIN_URL = "https://httpbin.org"  # Replaced by the session server fixture in conftest.py
+
+
+@contextmanager
+def pooled_server(app, threads=2, keep_alive=5.0):
+    """
+    Serve a WSGI app on an ephemeral port with the pooled server, in a background thread.
+
+    Yields:
+        tuple: (host, port) of the server.
+    """
+    server = PooledWSGIServer("127.0.0.1", 0, app, make_request_handler(keep_alive), threads=threads)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def read_until_closed(sock):
+    return b"".join(iter(lambda: sock.recv(65536), b""))
 
 
 class TestPerformance(unittest.TestCase):
@@ -15,78 +59,61 @@ class TestPerformance(unittest.TestCase):
     def run_httpie_command(self, args):
         """Helper function to run an HTTPie command and parse JSON response.
 
-        - Uses subprocess to execute HTTPie CLI commands.
+        - Uses the shared HTTPie runner (in-process unless HTTPIE_RUNNER=subprocess).
         - Parses the response as JSON if possible; otherwise, returns the raw output.
         """
-        result = subprocess.run(args, capture_output=True, text=True)
+        stdout, stderr, exit_status = run_httpie(args)
         # Check if result is JSON and only then parse, else return raw output
         try:
-            return json.loads(result.stdout) if result.returncode == 0 else result.stderr
+            return json.loads(stdout) if exit_status == 0 else stderr
         except json.JSONDecodeError:
-            return result.stdout  # Return raw text for non-JSON responses
+            return stdout  # Return raw text for non-JSON responses
 
     def test_high_volume_requests(self):
         """
-        Sends 100 concurrent GET requests to the /status/200 endpoint using HTTPie.
-        Ensures all responses are 200 OK.
+        Drives the /status/200 endpoint with the asyncio load generator and ensures every
+        response is 200 OK with no connection errors.
+
+        - A raw keep-alive run sends 2000 requests over 50 concurrent connections.
+        - An HTTPie run sends 100 requests through 10 pre-warmed HTTPie worker processes.
+        - Each report carries throughput and p50/p90/p99/max latency from the histogram.
         """
         url = f"{BASE_URL}/status/200"
-
-        def send_request():
-            # Use the helper method to execute the HTTPie command
-            result = self.run_httpie_command(["http", "GET", url])
-            if isinstance(result, dict):
-                self.assertEqual(result.get("message", ""), "Success")  # Check JSON content
-            else:
-                self.assertIn("200 OK", result)  # Check raw output
-
-        # Run 100 requests concurrently
-        processes = []
-        for _ in range(100):
-            p = multiprocessing.Process(target=send_request)
-            processes.append(p)
-            p.start()
-
-        for p in processes:
-            p.join()
+        runs = {
+            "raw": dict(mode="raw", concurrency=50, requests=2000),
+            "httpie": dict(mode="httpie", concurrency=10, requests=100),
+        }
+        for mode, options in runs.items():
+            with self.subTest(mode=mode):
+                report = run_load(url, **options)
+                self.assertEqual(report["errors"], {})
+                self.assertEqual(report["status_codes"], {"200": options["requests"]})
+                self.assertEqual(report["latency_ms"]["count"], options["requests"])
+                self.assertGreater(report["throughput_rps"], 0)
 
     def test_file_upload_size_limits(self):
         """Test a POST request with payload sizes increasing in increments of 5 MB, up to 20 MB. This hasw been tested
         to 500 MB incrementing in 250 MB chunks just for giggles and to see if Github Issue #35 was reproducible.
 
-        - This test writes the payload to a temporary file in chunks and uses HTTPie's @ notation
-          to avoid exceeding the argument list length limit imposed by the operating system.
+        - Payload files come from the shared payload factory, which generates each size once, caches it by
+          content hash and removes it at exit; HTTPie's @ notation reads the file, avoiding the argument list
+          length limit imposed by the operating system.
         """
         error_detected = False
         max_size_mb = 20  # Maximum payload size in MB
         step_size_mb = 5  # Step size in MB
-        chunk_size_mb = 1  # Chunk size in MB
 
         # Convert MB to characters (1 MB = 1,000,000 characters)
         max_size = max_size_mb * 1000000
         step_size = step_size_mb * 1000000
-        chunk_size = chunk_size_mb * 1000000
 
         for size in range(step_size, max_size + 1, step_size):
             with self.subTest(payload_size=f"{size // 1000000} MB"):
-                # Create a temporary file and write the payload in chunks
-                with tempfile.NamedTemporaryFile(mode='w+', delete=False) as temp_file:
-                    chunks = size // chunk_size
-                    remainder = size % chunk_size
-
-                    # Write full chunks of 1 MB each
-                    for _ in range(chunks):
-                        temp_file.write('a' * chunk_size)
-
-                    # Write any remaining characters
-                    if remainder:
-                        temp_file.write('a' * remainder)
-
-                    temp_file_name = temp_file.name
+                payload_path = payloads().path("repeated", size, pattern="a")
 
                 # Use the @ notation to read the payload from the file
                 response = self.run_httpie_command([
-                    'http', '--ignore-stdin', 'POST', 'https://httpbin.org/post', f'@{temp_file_name}'
+                    'http', '--ignore-stdin', 'POST', f'{HTTPBIN_URL}/post', f'@{payload_path}'
                 ])
 
                 # Check if the response contains an error message or an indication of failure
@@ -99,5 +126,248 @@ class TestPerformance(unittest.TestCase):
         self.assertFalse(error_detected,
                          "No error encountered: HTTPie handled all payload sizes up to 200 MB successfully.")
 
+    def test_streamed_large_payload(self):
+        """Test the streaming mode of /test/large_payload with raw, chunked, form-encoded and piped bodies.
+
+        - The server reads the body in fixed-size chunks and reports its size and SHA-256 digest.
+        - The piped case streams the payload generator straight into HTTPie's stdin, with no file.
+        - Verifies the reported size and digest match the 5 MB payload that was sent.
+        """
+        size = 5 * 1000000
+        expected_digest = payloads().sha256("repeated", size, pattern="a")
+        payload_path = payloads().path("repeated", size, pattern="a")
+        url = f"{BASE_URL}/test/large_payload"
+
+        cases = {
+            "raw": (['http', '--ignore-stdin', 'POST', url, 'stream==1', f'@{payload_path}'], None),
+            "chunked": (['http', '--ignore-stdin', '--chunked', 'POST', url, 'stream==1', f'@{payload_path}'], None),
+            "form": (['http', '--ignore-stdin', '-f', 'POST', url, 'stream==1', f'payload=@{payload_path}'], None),
+            "stdin": (['http', '--chunked', 'POST', url, 'stream==1', 'Content-Type:text/plain'],
+                      payloads().iter_chunks("repeated", size, pattern="a")),
+            "compressed": (['http', '--ignore-stdin', '--compress', 'POST', url, 'stream==1', f'@{payload_path}'], None),
+            "compressed_form": (['http', '--ignore-stdin', '--compress', '-f', 'POST', url, 'stream==1',
+                                 f'payload=@{payload_path}'], None),
+        }
+        for body_type, (args, stdin) in cases.items():
+            with self.subTest(body_type=body_type):
+                stdout, stderr, exit_status = run_httpie(args, stdin=stdin)
+                self.assertEqual(exit_status, 0, stderr)
+                response = json.loads(stdout)
+                self.assertEqual(response["mode"], "stream")
+                self.assertEqual(response["payload_size"], size)
+                self.assertEqual(response["digest"]["value"], expected_digest)
+                if body_type.startswith("compressed"):
+                    encoding = response["request_encoding"]
+                    self.assertEqual(encoding["encoding"], "deflate")
+                    self.assertLess(encoding["compressed_bytes"], encoding["decompressed_bytes"] // 100)
+
+    def test_compressed_upload_limits(self):
+        """Test the limits of request body decompression.
+
+        - A body that inflates past the cap fails with 413 before it is fully inflated.
+        - An unknown Content-Encoding is rejected with 415, and a corrupt body or a
+          malformed Content-Length with 400.
+        """
+        bomb = zlib.compress(b"\0" * (8 * 1024 * 1024), 9)
+        body = DecompressingInput(io.BytesIO(bomb), "deflate", len(bomb), max_size=1024 * 1024)
+        with self.assertRaises(RequestEntityTooLarge):
+            body.read()
+        self.assertLessEqual(body.decompressed, 1024 * 1024 + INFLATE_OUTPUT_SIZE)
+
+        body = DecompressingInput(io.BytesIO(gzip.compress(b"line 1\nline 2\n")), "x-gzip")
+        self.assertEqual(list(body), [b"line 1\n", b"line 2\n"])
+
+        url = f"{BASE_URL}/test/json"
+        stdout, _, _ = run_httpie(['http', '--ignore-stdin', '--headers', 'POST', url, 'Content-Encoding:compress', 'a=1'])
+        self.assertIn('415 UNSUPPORTED MEDIA TYPE', stdout)
+        stdout, _, _ = run_httpie(['http', '--ignore-stdin', '--headers', 'POST', url, 'Content-Encoding:gzip', 'a=1'])
+        self.assertIn('400 BAD REQUEST', stdout)
+        client = Client(RequestDecompressor().middleware(lambda environ, start_response: []))
+        for length in ("ten", "-1"):
+            response = client.post("/", data=b"x", headers={"Content-Encoding": "gzip"},
+                                   environ_overrides={"CONTENT_LENGTH": length})
+            self.assertEqual(response.status_code, 400, length)
+
+    def test_metrics_endpoint(self):
+        """Test the Prometheus /metrics endpoint and its reset route through HTTPie.
+
+        - Resets the metrics window, then sends 5 requests to /status/418.
+        - Verifies the per-endpoint counter, in-flight gauge and latency histogram count.
+        """
+        stdout, stderr, exit_status = run_httpie(['http', '--ignore-stdin', 'POST', f'{BASE_URL}/metrics/reset'])
+        self.assertEqual(exit_status, 0, stderr)
+        for _ in range(5):
+            run_httpie(['http', '--ignore-stdin', 'GET', f'{BASE_URL}/status/418'])
+
+        stdout, stderr, exit_status = run_httpie(['http', '--ignore-stdin', '--body', 'GET', f'{BASE_URL}/metrics'])
+        self.assertEqual(exit_status, 0, stderr)
+        samples = dict(line.rsplit(" ", 1) for line in stdout.splitlines() if line and not line.startswith("#"))
+        self.assertEqual(samples['flask_app_requests_total{endpoint="status",status="418"}'], "5")
+        self.assertEqual(samples['flask_app_requests_in_flight{endpoint="status"}'], "0")
+        self.assertEqual(samples['flask_app_request_duration_seconds_bucket{endpoint="status",le="+Inf"}'], "5")
+
+    def test_keep_alive_connections(self):
+        """Test that the server keeps connections open and counts them.
+
+        - Sends header, cookie, unread-body, chunked, HEAD and sendfile() download requests
+          over one connection, which must stay open throughout.
+        - The server counts one connection per request for clients that do not reuse
+          them, and one per worker for keep-alive clients.
+        """
+        host, port = BASE_URL.split("//")[1].rsplit(":", 1)
+        connection = http.client.HTTPConnection(host, int(port), timeout=10)
+        write_pattern_file(os.path.join(files_directory(), 'keep_alive.bin'), 200000)
+        requests = [
+            ('GET', '/test/headers', None, {'Authorization': 'Bearer sampletoken'}),
+            ('POST', '/status/201', b'x' * 32 * 1024, {}),  # Body never read by the view.
+            ('GET', '/stream/3', None, {}),
+            ('HEAD', '/bytes/10', None, {}),
+            ('GET', '/files/keep_alive.bin', None, {}),
+            ('GET', '/check-cookie', None, {'Cookie': 'test_cookie=cookie_value'}),
+        ]
+        sock = None
+        try:
+            for method, path, body, headers in requests:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                self.assertFalse(response.will_close, path)
+                self.assertIs(connection.sock, sock or connection.sock, path)
+                sock = connection.sock
+            self.assertEqual(json.loads(data)["cookie_value"], "cookie_value")
+        finally:
+            connection.close()
+
+        for mode, expected in (("per-request", 20), ("keep-alive", 2)):
+            run_httpie(['http', '--ignore-stdin', 'POST', f'{BASE_URL}/metrics/reset'])
+            report = run_load(f'{BASE_URL}/check-cookie', concurrency=2, requests=20,
+                              headers={'Cookie': 'test_cookie=cookie_value'}, connections=mode)
+            self.assertEqual(report['errors'], {})
+            self.assertEqual(report['status_codes'], {'200': 20})
+            # The scrape's own connection is counted too.
+            self.assertEqual(scrape_connections(BASE_URL)['accepted'], expected + 1, mode)
+
+    def test_keep_alive_closes_after_failed_body(self):
+        """Test that a response whose body fails partway closes its keep-alive connection.
+
+        - The app promises 10 bytes, sends 3 and raises; a pipelined request on the same
+          socket must not be answered as if it were the rest of that body.
+        """
+        def app(environ, start_response):
+            start_response("200 OK", [("Content-Type", "text/plain"), ("Content-Length", "10")])
+            if environ["PATH_INFO"] == "/ok":
+                return [b"0123456789"]
+
+            def body():
+                yield b"abc"
+                raise RuntimeError("body failed")
+            return body()
+
+        with pooled_server(app) as address, mock.patch("werkzeug.serving._log"):
+            with socket.create_connection(address, timeout=10) as sock:
+                sock.sendall(b"GET /ok HTTP/1.1\r\nHost: test\r\n\r\n"
+                             b"GET /fail HTTP/1.1\r\nHost: test\r\n\r\n"
+                             b"GET /ok HTTP/1.1\r\nHost: test\r\n\r\n")
+                received = read_until_closed(sock)
+        # The first response keeps the connection; the failed one ends it.
+        self.assertEqual(received.count(b"HTTP/1.1 200 OK"), 2)
+        self.assertTrue(received.split(b"\r\n\r\n", 2)[2].startswith(b"abc"))
+
+    def test_idle_keep_alive_connections_yield_threads(self):
+        """Test that idle keep-alive clients do not starve new connections of pool threads.
+
+        - Two clients hold both threads of the pool with idle keep-alive connections.
+        - A third client is still answered well before the keep-alive timeout, and an
+          idle connection is closed to make room.
+        """
+        def app(environ, start_response):
+            start_response("200 OK", [("Content-Type", "text/plain"), ("Content-Length", "2")])
+            return [b"ok"]
+
+        with pooled_server(app, threads=2, keep_alive=30.0) as address:
+            idle = [http.client.HTTPConnection(*address, timeout=10) for _ in range(2)]
+            try:
+                for connection in idle:
+                    connection.request("GET", "/")
+                    self.assertEqual(connection.getresponse().read(), b"ok")
+                with socket.create_connection(address, timeout=5) as sock:
+                    sock.sendall(b"GET / HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n")
+                    self.assertTrue(read_until_closed(sock).endswith(b"\r\n\r\nok"))
+                closed = 0
+                for connection in idle:
+                    connection.sock.settimeout(0.5)
+                    try:
+                        closed += connection.sock.recv(1) == b""
+                    except TimeoutError:
+                        pass
+                self.assertGreaterEqual(closed, 1)
+            finally:
+                for connection in idle:
+                    connection.close()
+
+    def test_request_profiler(self):
+        """Test the opt-in request profiler.
+
+        - The shared server runs without FLASK_APP_PROFILE, so the debug route reports it is disabled.
+        - On a separate app with profiling on, only requests carrying the trigger header are
+          profiled, and the merged report names the view function.
+        - A triggered request that cannot get the profiler in time is served unprofiled.
+        """
+        stdout, stderr, exit_status = run_httpie(['http', '--ignore-stdin', '--check-status', 'GET', f'{BASE_URL}/debug/profile'])
+        self.assertEqual(exit_status, 4, stderr)
+
+        app = Flask(__name__)
+
+        @app.route('/slow')
+        def slow():
+            # The loop runs in the view's own frame, so the view leads the report by tottime.
+            total = 0
+            for i in range(200000):
+                total += i * i
+            return str(total)
+
+        with mock.patch.dict('os.environ', {"FLASK_APP_PROFILE": "1", "FLASK_APP_PROFILE_SAMPLE": "0",
+                                            "FLASK_APP_PROFILE_WAIT": "0.1"}):
+            profiler = RequestProfiler(app)
+        client = app.test_client()
+        client.get('/slow')
+        client.get('/slow', headers={"X-Profile": "1"})
+
+        self.assertEqual(profiler.summary()["slow"]["requests"], 1)
+        self.assertIn("(slow)", profiler.report("slow", sort="tottime"))
+
+        # An unread streamed response keeps its turn until it is closed.
+        held = client.get('/slow', headers={"X-Profile": "1"}, buffered=False)
+        response = client.get('/slow', headers={"X-Profile": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(profiler.summary()["slow"]["requests"], 1)
+        held.close()
+        self.assertEqual(profiler.summary()["slow"]["requests"], 2)
+
+    def test_benchmark_history_flags_regressions(self):
+        """Test that the benchmark history records runs and flags only significant regressions.
+
+        - Appends a baseline and a candidate run with a 20% throughput drop and unchanged latency.
+        - Verifies throughput is flagged as a regression and latency is unchanged.
+        """
+        baseline = {
+            "throughput_rps": {"better": "higher", "samples": [1000, 1010, 990, 1005, 995]},
+            "latency_p99_ms": {"better": "lower", "samples": [5.0, 5.2, 4.9, 5.1, 5.0]},
+        }
+        candidate = {
+            "throughput_rps": {"better": "higher", "samples": [800, 810, 790, 805, 795]},
+            "latency_p99_ms": {"better": "lower", "samples": [5.1, 4.9, 5.0, 5.2, 5.0]},
+        }
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = f"{temp_dir}/history.jsonl"
+            append_record("example", baseline, path)
+            append_record("example", candidate, path)
+            records = load_history(path, "example")
+
+        self.assertEqual(len(records), 2)
+        self.assertIn("python", records[0])
+        statuses = {m["metric"]: m["status"] for m in compare_records(records[0], records[1])}
+        self.assertEqual(statuses, {"throughput_rps": "regression", "latency_p99_ms": "unchanged"})
+
 if __name__ == "__main__":
     unittest.main()
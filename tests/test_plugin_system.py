@@ -2,6 +2,8 @@ import unittest
 import subprocess
 from unittest.mock import patch
 
+HTTPBIN_URL = "https://httpbin.org"  # Replaced by the session server fixture in conftest.py
+
 
 class TestAuthPluginCLI(unittest.TestCase):
     """
@@ -22,7 +24,7 @@ class TestAuthPluginCLI(unittest.TestCase):
         mock_plugin_instance.get_auth.return_value = ("Authorization", "Bearer test_token")
 
         # Target URL for testing (httpbin.org/get will echo back the headers it receives)
-        url = 'https://httpbin.org/get'
+        url = f'{HTTPBIN_URL}/get'
 
         # Run HTTPie with a real GET request, including the mocked Authorization header
         result = subprocess.run([
@@ -49,7 +51,7 @@ class TestAuthPluginCLI(unittest.TestCase):
         mock_plugin_instance.get_auth.return_value = ("Authorization", f"Basic {username}:{password}")
 
         # Use a URL that requires Basic Authentication (httpbin.org/basic-auth/user/passwd)
-        url = f'https://httpbin.org/basic-auth/{username}/{password}'
+        url = f'{HTTPBIN_URL}/basic-auth/{username}/{password}'
 
         # Execute HTTPie with the explicit GET method, URL, and Basic Auth flag in the correct order
         result = subprocess.run([
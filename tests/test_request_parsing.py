@@ -1,7 +1,7 @@
 import unittest
 import subprocess
 
-BASE_URL = "http://127.0.0.1:5001"  # URL of the running Flask app
+BASE_URL = "http://127.0.0.1:5001"  # Replaced by the session server fixture in conftest.py
 
 class TestRequestParsing(unittest.TestCase):
     """
@@ -2,8 +2,15 @@ import unittest
 import subprocess
 import tempfile
 import os
+import json
+import gzip
 
-BASE_URL = "http://127.0.0.1:5001"  # URL of the running Flask app
+from werkzeug.test import Client
+
+from flask_app.compression import CACHE_MAX_BODY, CompressionCache, ResponseCompressor, compress, negotiate
+from tests.httpie_runner import run_httpie
+
+BASE_URL = "http://127.0.0.1:5001"  # Replaced by the session server fixture in conftest.py
 
 
 class TestRequestParsing(unittest.TestCase):
@@ -91,6 +98,39 @@ class TestRequestParsing(unittest.TestCase):
         finally:
             os.remove(temp_file_path)
 
+    def test_post_request_with_nested_xml_file_streamed(self):
+        """
+        Test POST request with nested, repeated XML parsed incrementally, as records and as a summary.
+        """
+        url = f"{BASE_URL}/test/xml"
+        xml_payload = ("<notes>"
+                       + "".join(f'<note id="{i}"><to>Bob</to><tag>a</tag><tag>b</tag></note>' for i in range(100))
+                       + "</notes>")
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".xml") as temp_file:
+            temp_file.write(xml_payload.encode())
+            temp_file_path = temp_file.name
+
+        try:
+            stdout, stderr, exit_status = run_httpie(
+                ["http", "POST", url, "stream==1", f"@{temp_file_path}", "--ignore-stdin"]
+            )
+            self.assertEqual(exit_status, 0, stderr)
+            records = [json.loads(line) for line in stdout.splitlines()]
+            self.assertEqual(len(records), 100, "Every child of the root should be one NDJSON record.")
+            self.assertEqual(records[0], {"note": {"@id": "0", "to": "Bob", "tag": ["a", "b"]}})
+
+            stdout, stderr, exit_status = run_httpie(
+                ["http", "POST", url, "stream==summary", f"@{temp_file_path}", "--ignore-stdin"]
+            )
+            self.assertEqual(exit_status, 0, stderr)
+            summary = json.loads(stdout)["summary"]
+            self.assertEqual(summary["bytes"], len(xml_payload))
+            self.assertEqual(summary["max_depth"], 3)
+            self.assertEqual(summary["tags"], {"notes": 1, "note": 100, "to": 100, "tag": 200})
+        finally:
+            os.remove(temp_file_path)
+
     def test_post_request_with_csv_file(self):
         """
         Test POST request with CSV data from a file.
@@ -129,6 +169,31 @@ class TestRequestParsing(unittest.TestCase):
         finally:
             os.remove(temp_file_path)
 
+    def test_post_request_with_csv_file_streamed(self):
+        """
+        Test POST request with a larger CSV file parsed incrementally and returned as NDJSON.
+        """
+        url = f"{BASE_URL}/test/csv"
+        row_count = 10000
+        csv_payload = "id,name,location\n" + "".join(f"{i},user{i},USA\n" for i in range(row_count))
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as temp_file:
+            temp_file.write(csv_payload.encode())
+            temp_file_path = temp_file.name
+
+        try:
+            stdout, stderr, exit_status = run_httpie(
+                ["http", "--stream", "POST", url, "stream==1", f"@{temp_file_path}", "--ignore-stdin"]
+            )
+
+            self.assertEqual(exit_status, 0, stderr)
+            lines = stdout.splitlines()
+            self.assertEqual(len(lines), row_count, "Every CSV row should be returned as one NDJSON line.")
+            self.assertEqual(json.loads(lines[0]), {"id": "0", "name": "user0", "location": "USA"})
+            self.assertEqual(json.loads(lines[-1])["id"], str(row_count - 1))
+        finally:
+            os.remove(temp_file_path)
+
     def test_post_request_with_html_file(self):
         """
         Test POST request with HTML data from a file.
@@ -170,6 +235,80 @@ class TestRequestParsing(unittest.TestCase):
         finally:
             os.remove(temp_file_path)
 
+    def test_compressed_responses(self):
+        """
+        Test that responses are compressed according to Accept-Encoding.
+
+        - HTTPie sends Accept-Encoding: gzip, deflate by default and decodes the body.
+        - Streamed bodies are compressed as they stream, without a Content-Length.
+        - Small bodies, byte ranges and identity requests are sent unchanged.
+        """
+        url = f"{BASE_URL}/stream/40"
+        stdout, stderr, exit_status = run_httpie(["http", "--print=hb", "GET", url])
+        self.assertEqual(exit_status, 0, stderr)
+        self.assertIn("Content-Encoding: gzip", stdout)
+        self.assertIn("Transfer-Encoding: chunked", stdout)
+        self.assertIn("Vary: Accept-Encoding", stdout)
+        self.assertEqual(stdout.count('"id":'), 40, "The decoded body should hold every streamed line.")
+
+        stdout, _, _ = run_httpie(["http", "--headers", "GET", url, "Accept-Encoding:deflate"])
+        self.assertIn("Content-Encoding: deflate", stdout)
+        stdout, _, _ = run_httpie(["http", "--headers", "GET", url, "Accept-Encoding:identity"])
+        self.assertNotIn("Content-Encoding", stdout)
+        stdout, _, _ = run_httpie(["http", "--headers", "GET", f"{BASE_URL}/stream/1"])
+        self.assertNotIn("Content-Encoding", stdout, "Bodies below the size threshold stay uncompressed.")
+        stdout, _, _ = run_httpie(["http", "--headers", "GET", f"{BASE_URL}/bytes/100000", "Range:bytes=0-99"])
+        self.assertNotIn("Content-Encoding", stdout, "Byte ranges refer to the identity body.")
+
+        stdout, _, _ = run_httpie(["http", "--headers", "GET", f"{BASE_URL}/bytes/100000"])
+        self.assertNotIn("Content-Encoding", stdout, "Generated bytes do not compress.")
+
+        self.assertEqual(negotiate("gzip;q=0.5, deflate", ("gzip", "deflate")), "deflate")
+        self.assertEqual(negotiate("*", ("gzip", "deflate")), "gzip")
+        self.assertIsNone(negotiate("identity, gzip;q=0", ("gzip", "deflate")))
+
+        cache = CompressionCache()
+        body = b"static body " * 200
+        first = cache.get(body, "gzip", lambda: body)
+        self.assertIs(cache.get(body, "gzip", lambda: body), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(first, compress(body, "gzip", 9))
+
+    def test_compression_middleware(self):
+        """
+        Test the compression middleware on apps outside the shared server.
+
+        - Data passed to the WSGI write() callable is compressed with the rest of the body.
+        - Static bodies are cached and tagged per encoding up to CACHE_MAX_BODY; larger
+          ones are only compressed when their content type is.
+        """
+        text = b"written line\n" * 200
+        large = b"\0" * (CACHE_MAX_BODY + 1)
+
+        def app(environ, start_response):
+            path = environ["PATH_INFO"]
+            if path == "/write":
+                write = start_response("200 OK", [("Content-Type", "text/plain")])
+                write(text[:100])
+                return [text[100:]]
+            body = large if path == "/large" else text
+            environ["flask_app.compression.static"] = path
+            start_response("200 OK", [("Content-Type", "application/octet-stream"),
+                                      ("Content-Length", str(len(body))), ("ETag", '"static"')])
+            return [body]
+
+        client = Client(ResponseCompressor().middleware(app))
+        response = client.get("/write", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.data), text)
+
+        response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["ETag"], '"static-gzip"')
+        self.assertEqual(gzip.decompress(response.data), text)
+        response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(len(response.data), len(large))
+
 
 if __name__ == "__main__":
     unittest.main()
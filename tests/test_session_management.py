@@ -1,6 +1,11 @@
 import unittest
-import subprocess
+import json
 import os
+import tempfile
+
+from tests.httpie_runner import run_httpie
+
+BASE_URL = "http://127.0.0.1:5001"  # Replaced by the session server fixture in conftest.py
 
 class TestSessionManagement(unittest.TestCase):
     """
@@ -28,51 +33,54 @@ class TestSessionManagement(unittest.TestCase):
             - self.base_url: The base URL of the Flask app.
             - self.session_path: Path for storing session data during tests.
             - self.named_session_path: Path for storing named session data.
+            - self.anon_session_path: Path for the anonymous session, in the temp directory
+              (per worker when run with tests/parallel_runner.py).
 
         This method is called before each test to ensure a clean setup.
         """
-        self.base_url = 'http://localhost:5001'
+        self.base_url = BASE_URL
         self.session_path = './test_session.json'
         self.named_session_path = './named_session_user1.json'
+        self.anon_session_path = os.path.join(tempfile.gettempdir(), 'anon_session.json')
 
     def test_header_persistence_cli(self):
         """
         Test header persistence using the HTTPie CLI.
         """
-        subprocess.run(['http', '--session=' + self.session_path, f'{self.base_url}/test/headers', f'Authorization:Bearer {self.tokenValue}'])
-        result = subprocess.run(['http', '--session=' + self.session_path, f'{self.base_url}/test/headers'], capture_output=True)
-        self.assertIn('"Authorization header received"', result.stdout.decode())
+        run_httpie(['http', '--session=' + self.session_path, f'{self.base_url}/test/headers', f'Authorization:Bearer {self.tokenValue}'])
+        result = run_httpie(['http', '--session=' + self.session_path, f'{self.base_url}/test/headers'])
+        self.assertIn('"Authorization header received"', result.stdout)
 
     def test_session_reuse_cli(self):
         """
         Test session reuse and authentication using the HTTPie CLI.
         """
-        subprocess.run(['http', '--session=' + self.session_path, f'{self.base_url}/test/headers', f'Authorization:Bearer {self.tokenValue}'])
-        result = subprocess.run(['http', '--session=' + self.session_path, f'{self.base_url}/test/headers'], capture_output=True)
-        self.assertIn('"Authorization header received"', result.stdout.decode())
+        run_httpie(['http', '--session=' + self.session_path, f'{self.base_url}/test/headers', f'Authorization:Bearer {self.tokenValue}'])
+        result = run_httpie(['http', '--session=' + self.session_path, f'{self.base_url}/test/headers'])
+        self.assertIn('"Authorization header received"', result.stdout)
 
     def test_named_session_cli(self):
         """
         Test named session management using the HTTPie CLI.
         """
-        subprocess.run(['http', '--session=' + self.named_session_path, '-a', 'user1:password', f'{self.base_url}/test/headers'])
+        run_httpie(['http', '--session=' + self.named_session_path, '-a', 'user1:password', f'{self.base_url}/test/headers'])
         self.assertTrue(os.path.exists(self.named_session_path))
 
     def test_anonymous_session_cli(self):
         """
         Test anonymous session handling using the HTTPie CLI.
         """
-        subprocess.run(['http', '--session=/tmp/anon_session.json', f'{self.base_url}/test/headers', f'Authorization:Bearer {self.userValue}'])
-        result = subprocess.run(['http', '--session=/tmp/anon_session.json', f'{self.base_url}/test/headers'], capture_output=True)
-        self.assertIn('"Authorization header received"', result.stdout.decode())
+        run_httpie(['http', '--session=' + self.anon_session_path, f'{self.base_url}/test/headers', f'Authorization:Bearer {self.userValue}'])
+        result = run_httpie(['http', '--session=' + self.anon_session_path, f'{self.base_url}/test/headers'])
+        self.assertIn('"Authorization header received"', result.stdout)
 
     def test_readonly_session_cli(self):
         """
         Test read-only session handling using the HTTPie CLI.
         """
-        subprocess.run(['http', '--session=' + self.session_path, f'{self.base_url}/test/headers', f'Authorization:Bearer {self.tokenValue}'])
-        result = subprocess.run(['http', '--session-read-only=' + self.session_path, f'{self.base_url}/test/headers'], capture_output=True)
-        self.assertIn('"Authorization header received"', result.stdout.decode())
+        run_httpie(['http', '--session=' + self.session_path, f'{self.base_url}/test/headers', f'Authorization:Bearer {self.tokenValue}'])
+        result = run_httpie(['http', '--session-read-only=' + self.session_path, f'{self.base_url}/test/headers'])
+        self.assertIn('"Authorization header received"', result.stdout)
 
     def test_large_payload_session_headers(self):
         """
@@ -84,10 +92,10 @@ class TestSessionManagement(unittest.TestCase):
             with self.subTest(payload_size=f"{size_kb} KB"):
                 large_payload = 'x' * (size_kb * 1024)  # Generate payload of specified size
                 # Use --form (-f) to send data as form-encoded in the body
-                result = subprocess.run([
+                result = run_httpie([
                     'http', '--session=' + self.session_path, '--ignore-stdin', '-f', 'POST',
                     f'{self.base_url}/test/large_payload', f'payload={large_payload}'
-                ], capture_output=True, text=True)
+                ])
 
                 # Check that the response confirms receipt of the payload
                 self.assertIn("Payload received", result.stdout, f"Failed to receive payload of size {size_kb} KB")
@@ -99,10 +107,8 @@ class TestSessionManagement(unittest.TestCase):
         Ensures that malformed headers are either rejected or handled gracefully without crashing.
         """
         malformed_header = 'Authorization:Bearer invalid@token!'  # Use an invalid format instead of a null byte
-        result = subprocess.run(
-            ['http', '--session=' + self.session_path, f'{self.base_url}/test/headers', malformed_header],
-            capture_output=True,
-            text=True
+        result = run_httpie(
+            ['http', '--session=' + self.session_path, f'{self.base_url}/test/headers', malformed_header]
         )
 
         # Check that the response contains an error indicating an issue with the Authorization header
@@ -113,7 +119,7 @@ class TestSessionManagement(unittest.TestCase):
         """
         Test the behavior of non-persistent sessions by ensuring no session file is created.
         """
-        result = subprocess.run(['http', f'{self.base_url}/test/headers', f'Authorization:Bearer sampletoken'], capture_output=True)
+        result = run_httpie(['http', f'{self.base_url}/test/headers', f'Authorization:Bearer sampletoken'])
         self.assertNotIn('session', os.listdir('.'))  # Confirm that no session file was created.
 
     def test_cookie_persistence(self):
@@ -124,15 +130,15 @@ class TestSessionManagement(unittest.TestCase):
         when using a session.
         """
         # First request to set a cookie
-        set_cookie_result = subprocess.run([
+        set_cookie_result = run_httpie([
             'http', '--session=' + self.session_path, f'{self.base_url}/set-cookie'
-        ], capture_output=True, text=True)
+        ])
         self.assertIn("Cookie set successfully", set_cookie_result.stdout)
 
         # Second request to verify the cookie is sent
-        verify_cookie_result = subprocess.run([
+        verify_cookie_result = run_httpie([
             'http', '--session=' + self.session_path, f'{self.base_url}/check-cookie'
-        ], capture_output=True, text=True)
+        ])
         self.assertIn("Cookie received", verify_cookie_result.stdout)
 
     def test_expired_cookie_handling(self):
@@ -142,18 +148,18 @@ class TestSessionManagement(unittest.TestCase):
         Verifies that expired cookies are not sent in subsequent requests.
         """
         # Set a cookie with a short expiration time
-        subprocess.run([
+        run_httpie([
             'http', '--session=' + self.session_path, f'{self.base_url}/set-expired-cookie'
-        ], capture_output=True, text=True)
+        ])
 
         # Wait for the cookie to expire (if expiration is time-based)
         import time
         time.sleep(2)  # Simulate waiting for expiration
 
         # Verify the expired cookie is not sent
-        verify_expired_result = subprocess.run([
+        verify_expired_result = run_httpie([
             'http', '--session=' + self.session_path, f'{self.base_url}/check-cookie'
-        ], capture_output=True, text=True)
+        ])
         self.assertIn("No valid cookies", verify_expired_result.stdout)
 
     def test_multiple_cookies(self):
@@ -163,14 +169,14 @@ class TestSessionManagement(unittest.TestCase):
         Ensures that all cookies set by the server are sent in subsequent requests.
         """
         # First request to set multiple cookies
-        subprocess.run([
+        run_httpie([
             'http', '--session=' + self.session_path, f'{self.base_url}/set-multiple-cookies'
-        ], capture_output=True, text=True)
+        ])
 
         # Second request to verify all cookies are sent
-        verify_multiple_cookies_result = subprocess.run([
+        verify_multiple_cookies_result = run_httpie([
             'http', '--session=' + self.session_path, f'{self.base_url}/check-multiple-cookies'
-        ], capture_output=True, text=True)
+        ])
         self.assertIn("All cookies received", verify_multiple_cookies_result.stdout)
 
     def test_cookie_deletion(self):
@@ -180,21 +186,44 @@ class TestSessionManagement(unittest.TestCase):
         Verifies that cookies deleted by the server are no longer sent in future requests.
         """
         # First request to set a cookie
-        subprocess.run([
+        run_httpie([
             'http', '--session=' + self.session_path, f'{self.base_url}/set-cookie'
-        ], capture_output=True, text=True)
+        ])
 
         # Request to delete the cookie
-        subprocess.run([
+        run_httpie([
             'http', '--session=' + self.session_path, f'{self.base_url}/delete-cookie'
-        ], capture_output=True, text=True)
+        ])
 
         # Verify the cookie is not sent
-        verify_deleted_cookie_result = subprocess.run([
+        verify_deleted_cookie_result = run_httpie([
             'http', '--session=' + self.session_path, f'{self.base_url}/check-cookie'
-        ], capture_output=True, text=True)
+        ])
         self.assertIn("No valid cookies", verify_deleted_cookie_result.stdout)
 
+    def test_bulk_cookies(self):
+        """
+        Test a session that accumulates many cookies with a spread of paths.
+
+        Sets 120 cookies in two batches, one in three on a path the check route is not
+        under, and verifies that the session stores all of them and sends back exactly
+        the 80 whose path matches.
+        """
+        spread = 'size==32 path==/ path==/check-cookies path==/elsewhere'.split()
+        for start in (0, 60):
+            result = run_httpie([
+                'http', '--session=' + self.session_path, f'{self.base_url}/set-cookies/60', f'start=={start}', *spread
+            ])
+            self.assertEqual(result.exit_status, 0, result.stderr)
+        with open(self.session_path) as f:
+            self.assertEqual(len(json.load(f)['cookies']), 120)
+
+        result = run_httpie([
+            'http', '--session=' + self.session_path, '--body', f'{self.base_url}/check-cookies/120', *spread
+        ])
+        self.assertIn("All cookies received", result.stdout)
+        self.assertEqual(json.loads(result.stdout)['received'], 80)
+
     def tearDown(self):
         """
         Cleanup method to remove session files after each test.
@@ -203,8 +232,8 @@ class TestSessionManagement(unittest.TestCase):
             os.remove(self.session_path)
         if os.path.exists(self.named_session_path):
             os.remove(self.named_session_path)
-        if os.path.exists('/tmp/anon_session.json'):
-            os.remove('/tmp/anon_session.json')
+        if os.path.exists(self.anon_session_path):
+            os.remove(self.anon_session_path)
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file